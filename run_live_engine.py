@@ -1,53 +1,167 @@
+import time
+from contextlib import contextmanager
+
 import torch
 from src.surface_extractor import extract_live_spx_surface
-from src.regime_encoder import RegimeEncoder, multi_maturity_vol_features
-from src.portfolio_generator import PortfolioGenerator, decode_portfolio_tensor, capital_filter
+from src.grids import make_moneyness_grid
+from src.real_vol import live_surface_features
+from src.regime_encoder import RegimeEncoder
+from src.portfolio_generator import (
+    PortfolioGenerator,
+    capital_filter,
+    decode_portfolio_tensor,
+    load_checkpoint,
+)
 from src.session_logger import LiveSessionLogger
 from src.pnl_engine import portfolio_payoff
+from src.margin_cache import MarginCache
+
+CHECKPOINT = "checkpoints/generator.pt"
+
+# Training grid (train.py); streamed surfaces must be built on it too
+K_GRID = make_moneyness_grid(-1.0, 1.0, 41)
+
+
+class LiveEngine:
+    """
+    Long-lived decision engine: models are built and the checkpoint
+    is deserialized once, every decision runs under inference_mode,
+    and per-stage latencies are reported in each record's latency_ms.
+
+    propose / assess each fill their own timings dict, so the two
+    stages can run concurrently (LiveLoop) without sharing state.
+
+    The checkpoint must hold the regime encoder the generator was
+    trained against (train.py saves both); a fresh encoder would make
+    every decision depend on the process's RNG.
+    """
+
+    def __init__(self, checkpoint=CHECKPOINT, feature_dim=6, latent_dim=8, logger=None,
+                 k_grid=K_GRID):
+        self.k_grid = k_grid
+        state = load_checkpoint(checkpoint)
+        if "encoder" not in state:
+            raise ValueError(f"{checkpoint}: no encoder weights; retrain with train.py")
+
+        self.encoder = RegimeEncoder(input_dim=feature_dim, latent_dim=latent_dim)
+        self.encoder.load_state_dict(state["encoder"])
+        self.encoder.eval()
+
+        self.generator = PortfolioGenerator(latent_dim=latent_dim)
+        self.generator.load_state_dict(state["generator"])
+        self.generator.eval()
+
+        self.logger = logger if logger is not None else LiveSessionLogger()
+        self.margin_cache = MarginCache()
+        self.last_structure = None
+
+    @staticmethod
+    @contextmanager
+    def _stage(timings, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[name] = time.perf_counter() - t0
+
+    def decide(self, surface):
+        """
+        One decision from a live surface (extract_live_spx_surface format).
+        """
+        legs, timings = self.propose(surface)
+        return self.assess(surface, legs, timings)
+
+    def propose(self, surface):
+        """
+        Encode the surface and generate candidate legs.
+
+        Returns:
+            (legs, timings) with per-stage latencies in seconds
+        """
+        spot = float(surface["spot"])
+        timings = {}
+
+        with torch.inference_mode():
+            # Build regime features (streamed surfaces carry their own,
+            # refreshed incrementally on the same k_grid)
+            with self._stage(timings, "features"):
+                if "features" in surface:
+                    feats = surface["features"].unsqueeze(0)
+                else:
+                    feats = live_surface_features(surface, self.k_grid).unsqueeze(0)
+
+            with self._stage(timings, "encode"):
+                z = self.encoder(feats)
+
+            with self._stage(timings, "generate"):
+                raw = self.generator(z)[0]
+                legs = decode_portfolio_tensor(raw, spot)
+
+        return legs, timings
+
+    def assess(self, surface, legs, timings=None):
+        """
+        Capital / PnL checks on proposed legs, then log the decision.
+        timings from propose are merged into the record's latency_ms.
+        """
+        spot = float(surface["spot"])
+        timings = dict(timings or {})
+
+        with self._stage(timings, "capital"):
+            feasible, acct = capital_filter(legs, spot, cache=self.margin_cache)
+
+        # PnL tracking
+        with self._stage(timings, "pnl"):
+            pnl = None
+            if self.last_structure is not None:
+                pnl = portfolio_payoff(spot, self.last_structure)
+
+        if feasible:
+            self.last_structure = legs
+
+        timings["total"] = sum(timings.values())
+
+        record = {
+            "spot": spot,
+            "legs": legs,
+            "margin_used": acct.init_margin_used,
+            "buying_power": acct.buying_power,
+            "feasible": feasible,
+            "pnl": pnl,
+            "latency_ms": {k: round(v * 1e3, 3) for k, v in timings.items()},
+        }
+        self.logger.log(record)
+        return record
+
+    def step(self):
+        """
+        Fetch the live surface and decide.
+        """
+        t0 = time.perf_counter()
+        surface = extract_live_spx_surface()
+        fetch = time.perf_counter() - t0
+
+        record = self.decide(surface)
+        record["latency_ms"]["fetch"] = round(fetch * 1e3, 3)
+        return record
+
 
 logger = LiveSessionLogger()
-last_structure = None
+_engine = None
+
 
 def main_step():
-    global last_structure
-
-    surface = extract_live_spx_surface()
-    spot = float(surface["spot"])
-
-    # Build regime features
-    k_grid = surface["strikes"][0]
-    vols = surface["implied_vol"]
-    feats = multi_maturity_vol_features(k_grid, vols).unsqueeze(0)
-
-    enc = RegimeEncoder(input_dim=feats.shape[-1])
-    z = enc(feats)
-
-    gen = PortfolioGenerator(latent_dim=z.shape[-1])
-    gen.load_state_dict(torch.load("checkpoints/generator.pt"))
-
-    raw = gen(z)[0]
-    legs = decode_portfolio_tensor(raw, spot)
-    feasible, acct = capital_filter(legs, spot)
-
-    # PnL tracking
-    pnl = None
-    if last_structure is not None:
-        pnl = portfolio_payoff(spot, last_structure)
-
-    if feasible:
-        last_structure = legs
-
-    logger.log({
-        "spot": spot,
-        "legs": legs,
-        "margin_used": acct.init_margin_used,
-        "buying_power": acct.buying_power,
-        "feasible": feasible,
-        "pnl": pnl
-    })
-
-    print("\nSpot:", spot)
-    print("PnL:", pnl)
-    print("Buying Power:", round(acct.buying_power, 2))
-    for l in legs:
+    global _engine
+    if _engine is None:
+        _engine = LiveEngine(logger=logger)
+
+    print_record(_engine.step())
+
+
+def print_record(record):
+    print("\nSpot:", record["spot"])
+    print("PnL:", record["pnl"])
+    print("Buying Power:", round(record["buying_power"], 2))
+    print("Latency (ms):", record["latency_ms"])
+    for l in record["legs"]:
         print(l)
@@ -1,12 +1,189 @@
+import asyncio
+import inspect
+import math
+import sys
 import time
-from run_live_engine import main_step, logger
 
-print("Live engine running — press Ctrl+C to stop and save report.\n")
+import torch
 
-try:
-    while True:
-        main_step()
-        time.sleep(60)   # one decision per minute
-except KeyboardInterrupt:
-    fname = logger.dump()
-    print(f"\nSession report saved to {fname}")
+from run_live_engine import LiveEngine, logger, print_record
+
+
+def atm_vol(surface):
+    """
+    Front-slice implied vol at the quoted strike nearest spot (streamed
+    slots without a quote yet are NaN and skipped); NaN if none is.
+    """
+    strikes = torch.as_tensor(surface["strikes"][0], dtype=torch.float64)
+    vols = torch.as_tensor(surface["implied_vol"][0], dtype=torch.float64)
+    quoted = torch.isfinite(vols)
+    if not quoted.any():
+        return math.nan
+    distance = (strikes - float(surface["spot"])).abs().masked_fill(~quoted, math.inf)
+    return float(vols[distance.argmin()])
+
+
+def print_fetch_error(error):
+    print(f"Feed fetch failed, retrying: {error!r}", file=sys.stderr)
+
+
+class LiveLoop:
+    """
+    Event-driven live scheduler.
+
+    Overlapping tasks share a latest-snapshot slot:
+      fetch  : polls the feed every `poll` seconds and publishes each
+               snapshot, waking the pipeline when spot moved by
+               spot_move (relative) or ATM vol by iv_move (absolute)
+               since the last snapshot taken, or every `interval` seconds;
+               a failed fetch goes to on_fetch_error and polling goes on
+      encode : LiveEngine.propose on the newest snapshot only
+      risk   : LiveEngine.assess on the latest finished proposal; a
+               proposal is only dropped when a newer one finishes
+               before risk picks it up, so every risk pass decides
+
+    Older snapshots and proposals are overwritten, never queued, so a
+    slow decision delays at most one cycle instead of every later one,
+    and a busy tape still yields a decision per risk pass.
+    """
+
+    def __init__(
+        self,
+        engine,
+        fetch,
+        spot_move=0.0005,
+        iv_move=0.005,
+        interval=60.0,
+        poll=1.0,
+        on_decision=print_record,
+        on_fetch_error=print_fetch_error,
+    ):
+        self.engine = engine
+        self.fetch = fetch
+        self.spot_move = spot_move
+        self.iv_move = iv_move
+        self.interval = interval
+        self.poll = poll
+        self.on_decision = on_decision
+        self.on_fetch_error = on_fetch_error
+
+        self._snapshot = None
+        self._reference = None
+        self._proposal = None
+
+        self.decisions = 0
+        self.dropped = 0
+        self.fetch_errors = 0
+
+    def _triggered(self, snapshot):
+        ref = self._reference
+        if ref is None:
+            return True
+        if abs(float(snapshot["spot"]) / float(ref["spot"]) - 1.0) >= self.spot_move:
+            return True
+        # NaN (no quote on either side) never triggers
+        return abs(atm_vol(snapshot) - atm_vol(ref)) >= self.iv_move
+
+    def offer(self, snapshot):
+        """
+        Publish a snapshot; replaces any not-yet-encoded one.
+        """
+        self._snapshot = snapshot
+        if self._triggered(snapshot):
+            self._wake.set()
+
+    async def _fetch_loop(self):
+        while True:
+            t0 = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(self.fetch):
+                    snapshot = await self.fetch()
+                else:
+                    snapshot = await asyncio.to_thread(self.fetch)
+            except Exception as error:   # timeouts, disconnects: keep polling
+                self.fetch_errors += 1
+                self.on_fetch_error(error)
+                await asyncio.sleep(self.poll)
+                continue
+            self._fetch_ms = round((time.perf_counter() - t0) * 1e3, 3)
+
+            if snapshot is not None:
+                self.offer(snapshot)
+            await asyncio.sleep(self.poll)
+
+    async def _timer_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self._snapshot is not None:
+                self._wake.set()
+
+    async def _encode_loop(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+
+            snapshot = self._snapshot
+            self._reference = snapshot
+
+            legs, timings = await asyncio.to_thread(self.engine.propose, snapshot)
+            if self._ready.is_set():
+                self.dropped += 1   # previous proposal never reached risk
+            self._proposal = (snapshot, legs, timings, self._fetch_ms)
+            self._ready.set()
+
+    async def _risk_loop(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+
+            snapshot, legs, timings, fetch_ms = self._proposal
+
+            record = await asyncio.to_thread(
+                self.engine.assess, snapshot, legs, timings
+            )
+            record["latency_ms"]["fetch"] = fetch_ms
+            self.decisions += 1
+            self.on_decision(record)
+
+    async def run(self, duration=None):
+        """
+        Run until cancelled, or for `duration` seconds.
+        """
+        self._wake = asyncio.Event()
+        self._ready = asyncio.Event()
+        self._fetch_ms = None
+
+        tasks = [
+            asyncio.create_task(coro)
+            for coro in (
+                self._fetch_loop(),
+                self._timer_loop(),
+                self._encode_loop(),
+                self._risk_loop(),
+            )
+        ]
+        try:
+            if duration is None:
+                await asyncio.gather(*tasks)
+            else:
+                done, _ = await asyncio.wait(tasks, timeout=duration)
+                for t in done:
+                    t.result()   # surface task errors
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    from src.surface_extractor import extract_live_spx_surface
+
+    print("Live engine running — press Ctrl+C to stop and save report.\n")
+
+    loop = LiveLoop(LiveEngine(logger=logger), extract_live_spx_surface)
+
+    try:
+        asyncio.run(loop.run())
+    except KeyboardInterrupt:
+        fname = logger.dump()
+        print(f"\nSession report saved to {fname}")
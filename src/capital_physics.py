@@ -3,39 +3,64 @@ IBKR Reg-T margin physics for SPX 0-DTE
 Supports verticals, butterflies, iron condors.
 """
 
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import torch
+
+try:
+    from src.leg_book import LegBook, canonicalize_legs, canonicalize_batch
+    from src.physics import CALL, PUT
+except ModuleNotFoundError:
+    from leg_book import LegBook, canonicalize_legs, canonicalize_batch
+    from physics import CALL, PUT
+
 ACCOUNT_EQUITY = 25_000.0
 CONTRACT_MULT = 100
 
 
-def net_side(shorts, longs, is_put):
+def net_side(shorts, longs, is_put, presorted=False):
     """
     Net one option side (puts or calls) into max-loss margin.
     shorts / longs = list of (strike, qty)
+    presorted = both lists already strike-ascending (canonical legs)
+
+    Shorts are capped in strike order by the lowest-strike valid
+    longs (below the short for puts, above it for calls). Longs are
+    used up from the front, so one pointer sweep covers every short:
+    O((shorts + longs) log longs) instead of shorts x longs.
     """
-    shorts = sorted(shorts, key=lambda x: x[0])
-    longs = sorted(longs, key=lambda x: x[0])
+    if not presorted:
+        shorts = sorted(shorts, key=lambda x: x[0])
+        longs = sorted(longs, key=lambda x: x[0])
+
+    long_strikes = [l_strike for l_strike, _ in longs]
+    remaining = [l_qty for _, l_qty in longs]
 
     margin = 0.0
+    j = 0   # longs before j are used up
 
     for s_strike, s_qty in shorts:
         qty_left = s_qty
 
-        # Find valid caps
-        for i, (l_strike, l_qty) in enumerate(longs):
-            if qty_left == 0:
-                break
-
-            valid = (l_strike < s_strike) if is_put else (l_strike > s_strike)
-            if not valid:
-                continue
+        # Valid caps: [j, end) for puts, [max(j, start), n) for calls
+        if is_put:
+            i, end = j, bisect_left(long_strikes, s_strike)
+        else:
+            i, end = max(j, bisect_right(long_strikes, s_strike)), len(longs)
 
-            paired = min(qty_left, l_qty)
-            wing = abs(s_strike - l_strike)
+        while qty_left > 0 and i < end:
+            paired = min(qty_left, remaining[i])
+            wing = abs(s_strike - long_strikes[i])
 
             margin += paired * wing * CONTRACT_MULT
 
             qty_left -= paired
-            longs[i] = (l_strike, l_qty - paired)
+            remaining[i] -= paired
+            if remaining[i] <= 0:
+                i += 1
+
+        j = max(j, i)
 
         # Any leftover short = naked worst-case
         if qty_left > 0:
@@ -45,7 +70,23 @@ def net_side(shorts, longs, is_put):
     return margin
 
 
-def capital_feasible(legs, spot):
+def _book_sides(book):
+    is_put = book.option_types == PUT
+    is_short = book.weights < 0
+
+    def side(mask):
+        return list(zip(
+            book.strikes[mask].tolist(),
+            np.abs(book.weights[mask]).tolist(),
+        ))
+
+    return (
+        side(is_put & is_short), side(is_put & ~is_short),
+        side(~is_put & is_short), side(~is_put & ~is_short),
+    )
+
+
+def _leg_sides(legs):
     put_shorts, put_longs = [], []
     call_shorts, call_longs = [], []
 
@@ -65,8 +106,80 @@ def capital_feasible(legs, spot):
             else:
                 call_longs.append((strike, qty))
 
+    return put_shorts, put_longs, call_shorts, call_longs
+
+
+def capital_feasible(legs, spot, cache=None):
+    """
+    legs = list of leg dicts or a single-structure LegBook
+    cache = optional MarginCache for repeat structures
+    """
+    if cache is not None:
+        return cache.get_or_compute(
+            legs,
+            lambda: capital_feasible(legs, spot),
+            spot=spot,
+            equity=ACCOUNT_EQUITY,
+        )
+
+    # Canonical legs are netted and strike-sorted per side
+    legs = canonicalize_legs(legs)
+
+    if isinstance(legs, LegBook):
+        put_shorts, put_longs, call_shorts, call_longs = _book_sides(legs)
+    else:
+        put_shorts, put_longs, call_shorts, call_longs = _leg_sides(legs)
+
     margin = 0.0
-    margin += net_side(put_shorts, put_longs, is_put=True)
-    margin += net_side(call_shorts, call_longs, is_put=False)
+    margin += net_side(put_shorts, put_longs, is_put=True, presorted=True)
+    margin += net_side(call_shorts, call_longs, is_put=False, presorted=True)
+
+    return margin <= ACCOUNT_EQUITY, margin
+
+
+def _net_side_batch(strikes, option_types, weights, side):
+    # Same greedy pairing as net_side, vectorized over structures:
+    # one step per short slot, each a masked prefix sum over the longs.
+    on_side = option_types == side
+    short_qty = torch.where(on_side & (weights < 0), -weights, 0.0)
+    remaining = torch.where(on_side & (weights > 0), weights, 0.0)
+
+    margin = torch.zeros_like(strikes[..., 0])
+
+    for i in range(strikes.shape[-1]):
+        s_strike = strikes[..., i : i + 1]
+        s_qty = short_qty[..., i : i + 1]
+
+        valid = (strikes < s_strike) if side == PUT else (strikes > s_strike)
+        avail = remaining * valid
+        before = torch.cumsum(avail, dim=-1) - avail
+
+        paired = torch.minimum(avail, torch.clamp(s_qty - before, min=0.0))
+        remaining = remaining - paired
+
+        wing = (s_strike - strikes).abs()
+        naked = torch.clamp(s_qty.squeeze(-1) - paired.sum(dim=-1), min=0.0)
+
+        margin = margin + (paired * wing).sum(dim=-1) * CONTRACT_MULT
+        margin = margin + naked * s_strike.squeeze(-1) * CONTRACT_MULT
+
+    return margin
+
+
+def capital_feasible_batch(strikes, option_types, weights):
+    """
+    capital_feasible over fixed-width leg tensors.
+
+    strikes / option_types / weights: [B, L]
+    Returns (feasible [B] bool, margin [B] float64).
+    """
+    strikes, option_types, weights, _ = canonicalize_batch(
+        strikes.detach().double(), option_types, weights.detach().double()
+    )
+
+    margin = (
+        _net_side_batch(strikes, option_types, weights, PUT)
+        + _net_side_batch(strikes, option_types, weights, CALL)
+    )
 
     return margin <= ACCOUNT_EQUITY, margin
@@ -16,12 +16,99 @@ def project_delta_neutral(
 ) -> torch.Tensor:
     """
     Projects portfolio weights to enforce delta neutrality.
+
+    leg_deltas / weights are [L] or batched [B, L].
     """
-    numerator = torch.dot(weights, leg_deltas)
-    denominator = torch.dot(leg_deltas, leg_deltas) + 1e-8
+    numerator = (weights * leg_deltas).sum(dim=-1, keepdim=True)
+    denominator = (leg_deltas * leg_deltas).sum(dim=-1, keepdim=True) + 1e-8
     return weights - (numerator / denominator) * leg_deltas
 
 
+# -------------------------------------------------
+# Multi-Greek neutrality
+# -------------------------------------------------
+
+class LinearConstraintProjector:
+    """
+    Euclidean projection of leg weights onto {w : A w = b}.
+
+    The Cholesky factor of A A^T is computed once. A shared [m, L]
+    matrix (fixed leg set) is factorized once for the whole batch;
+    a batched [B, m, L] matrix gets one batched factorization.
+
+    Args:
+        constraints: constraint matrix A [m, L] or [B, m, L], e.g.
+                     greeks.leg_greek_matrix rows (delta, gamma, vega)
+        ridge: diagonal jitter for rank-deficient constraint sets
+    """
+
+    def __init__(self, constraints: torch.Tensor, ridge: float = 1e-10):
+        m = constraints.shape[-2]
+        gram = constraints @ constraints.transpose(-1, -2)
+        eye = torch.eye(m, dtype=gram.dtype, device=gram.device)
+
+        self.constraints = constraints
+        self.chol = torch.linalg.cholesky(gram + ridge * eye)
+
+    def _affine(self, weights, targets):
+        residual = (self.constraints @ weights.unsqueeze(-1)).squeeze(-1)
+        if targets is not None:
+            residual = residual - targets
+
+        multipliers = torch.cholesky_solve(residual.unsqueeze(-1), self.chol)
+        correction = self.constraints.transpose(-1, -2) @ multipliers
+        return weights - correction.squeeze(-1)
+
+    def project(
+        self,
+        weights: torch.Tensor,
+        targets: torch.Tensor = None,
+        lower=None,
+        upper=None,
+        n_iter: int = 200,
+    ) -> torch.Tensor:
+        """
+        Args:
+            weights: leg weights [B, L] (or [L])
+            targets: constraint targets [m] or [B, m] (default: zero)
+            lower / upper: optional per-leg weight bounds
+            n_iter: Dykstra iterations when bounds are given
+
+        Returns:
+            Projected weights, same shape as weights. With bounds the
+            bounds hold exactly and the constraints up to convergence.
+        """
+        if lower is None and upper is None:
+            return self._affine(weights, targets)
+
+        # Dykstra's alternating projections: affine set ∩ box
+        x = weights
+        p = torch.zeros_like(weights)
+        q = torch.zeros_like(weights)
+        for _ in range(n_iter):
+            y = self._affine(x + p, targets)
+            p = x + p - y
+            x = torch.clamp(y + q, min=lower, max=upper)
+            q = y + q - x
+
+        return x
+
+
+def project_greek_neutral(
+    greek_matrix: torch.Tensor,
+    weights: torch.Tensor,
+    targets: torch.Tensor = None,
+    lower=None,
+    upper=None,
+) -> torch.Tensor:
+    """
+    One-shot multi-Greek projection (see LinearConstraintProjector).
+    Reuse a projector directly when the leg set is fixed across calls.
+    """
+    projector = LinearConstraintProjector(greek_matrix)
+    return projector.project(weights, targets, lower=lower, upper=upper)
+
+
 # -------------------------------------------------
 # Vega bounding
 # -------------------------------------------------
@@ -32,62 +119,114 @@ def bound_vega(
 ) -> torch.Tensor:
     """
     Scales vega to enforce ||vega|| <= max_vega.
+
+    vega is [N] or batched [B, N] (one norm per row).
     """
-    norm = torch.linalg.norm(vega, ord=2)
-    if norm <= max_vega:
-        return vega
+    norm = torch.linalg.norm(vega, ord=2, dim=-1, keepdim=True)
 
     scale = max_vega / (norm + 1e-8)
-    return vega * scale
+    return torch.where(norm <= max_vega, vega, vega * scale)
 
 
 # -------------------------------------------------
 # Terminal payoff convexity (non-uniform grid)
 # -------------------------------------------------
 
+class SecondDerivativeStencil:
+    """
+    Three-point second derivative on a fixed non-uniform spot grid.
+
+    Coefficients are computed once per grid; applying the stencil to
+    payoffs [..., N] is a single windowed multiply-add.
+
+    Args:
+        spot: spot grid [N], or per-structure grids [..., N]
+    """
+
+    def __init__(self, spot: torch.Tensor):
+        if spot.shape[-1] < 3:
+            raise ValueError("need at least 3 grid points")
+
+        # Grid spacings
+        dS_forward = spot[..., 2:] - spot[..., 1:-1]
+        dS_backward = spot[..., 1:-1] - spot[..., :-2]
+        dS_total = dS_forward + dS_backward
+
+        # f'' ~ c- f[i-1] + c0 f[i] + c+ f[i+1]: [..., N - 2, 3]
+        self.coeffs = torch.stack([
+            2.0 / (dS_backward * dS_total),
+            -2.0 / (dS_forward * dS_backward),
+            2.0 / (dS_forward * dS_total),
+        ], dim=-1)
+        # Same stencil times dS+ dS-: [1, -2, 1] on a uniform grid
+        self.difference_coeffs = self.coeffs * (dS_forward * dS_backward).unsqueeze(-1)
+        self.spot = spot
+
+    def __call__(self, payoff: torch.Tensor) -> torch.Tensor:
+        """
+        Args:
+            payoff: payoffs on the grid [..., N] (e.g. [B, N], [B, S, N]);
+                    with per-structure grids [B, N], extra payoff dims
+                    (scenarios) sit between B and N
+
+        Returns:
+            Second derivative at interior points [..., N - 2]
+        """
+        return self._apply(self.coeffs, payoff)
+
+    def second_difference(self, payoff: torch.Tensor) -> torch.Tensor:
+        """
+        Second derivative scaled by the local dS+ dS-, i.e. in the units
+        of the undivided f[i+1] - 2 f[i] + f[i-1] (exactly that on a
+        uniform grid). Same shapes as __call__.
+        """
+        return self._apply(self.difference_coeffs, payoff)
+
+    def _apply(self, coeffs, payoff):
+        coeffs = coeffs.to(payoff.dtype)
+
+        extra = payoff.ndim - self.spot.ndim
+        if self.spot.ndim > 1 and extra > 0:
+            # [B, N - 2, 3] -> [B, 1, ..., N - 2, 3]
+            batch = coeffs.shape[:-2]
+            coeffs = coeffs.reshape(*batch, *(1,) * extra, *coeffs.shape[-2:])
+
+        windows = payoff.unfold(-1, 3, 1)
+        return (windows * coeffs).sum(dim=-1)
+
+
 def terminal_convexity_violation(
     payoff: torch.Tensor,
     spot: torch.Tensor,
+    stencil: SecondDerivativeStencil = None,
 ) -> torch.Tensor:
     """
     Computes minimum second derivative of terminal payoff
     on a non-uniform spot grid.
 
+    payoff is [..., N]; pass a prebuilt stencil to reuse the grid
+    coefficients across calls. Returns [...].
+
     Negative values indicate convexity violation.
     """
-    if payoff.ndim != 1 or spot.ndim != 1:
-        raise ValueError("payoff and spot must be 1D tensors")
-
-    if spot.shape[0] < 3:
-        raise ValueError("need at least 3 grid points")
-
-    # Grid spacings
-    dS_forward = spot[2:] - spot[1:-1]
-    dS_backward = spot[1:-1] - spot[:-2]
-
-    # Payoff differences
-    df_forward = payoff[2:] - payoff[1:-1]
-    df_backward = payoff[1:-1] - payoff[:-2]
+    if stencil is None:
+        stencil = SecondDerivativeStencil(spot)
 
-    # Second derivative on non-uniform grid
-    gamma = (
-        2.0
-        * (df_forward / dS_forward - df_backward / dS_backward)
-        / (dS_forward + dS_backward)
-    )
+    gamma = stencil(payoff)
 
-    return gamma.min()
+    return gamma.min(dim=-1).values
 
 
 def convexity_barrier(
     payoff: torch.Tensor,
     spot: torch.Tensor,
     barrier_scale: float = 100.0,
+    stencil: SecondDerivativeStencil = None,
 ) -> torch.Tensor:
     """
     Hard convexity barrier: positive penalty if payoff is concave.
     """
-    min_gamma = terminal_convexity_violation(payoff, spot)
+    min_gamma = terminal_convexity_violation(payoff, spot, stencil)
     return F.softplus(-barrier_scale * min_gamma)
 
 # ============================================================
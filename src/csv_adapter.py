@@ -4,8 +4,14 @@ Robust CSV adapter for implied volatility surfaces.
 
 import pandas as pd
 import torch
+import yfinance as yf
 from typing import Dict, Optional
 
+try:
+    from src.grids import StrikeWindow, expiry_year_fraction
+except ModuleNotFoundError:
+    from grids import StrikeWindow, expiry_year_fraction
+
 
 # ---------------------------------------------
 # Column name heuristics
@@ -122,12 +128,13 @@ def load_vol_surface_from_csv(
 # LIVE SPX OPTION CHAIN (NO BROKER / NO KYC)
 # ============================================================
 
-import yfinance as yf
-
-def load_live_spx_chain():
+def load_live_spx_chain(window: Optional[StrikeWindow] = None, spot: Optional[float] = None):
     """
     Loads the front (0-DTE / nearest) SPX option chain using free OPRA-delayed data.
     Returns a DataFrame compatible with the existing surface extractor.
+
+    window keeps only the strikes inside a StrikeWindow around spot
+    (last SPX close when spot is not given).
     """
     spx = yf.Ticker("^SPX")
 
@@ -146,6 +153,12 @@ def load_live_spx_chain():
 
     df = pd.concat([calls, puts], axis=0)
 
+    if window is not None:
+        if spot is None:
+            spot = float(spx.history(period="1d")["Close"].iloc[-1])
+        keep = window.mask(df["strike"].tolist(), spot, expiry_year_fraction(expiry))
+        df = df[keep.numpy()]
+
     # normalize column names to your surface extractor aliases
     df.rename(columns={
         "strike": "strike",
@@ -0,0 +1,164 @@
+"""
+Local stand-in for the IB endpoint, shared by the live feed, chain
+subscription and combo margin tests.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from eventkit import Event
+
+
+def default_smile(contract):
+    return 0.15 + 0.001 * abs(contract.strike - 5800.0) / 5.0
+
+
+class FakeIB:
+    """
+    Local stand-in for the IB endpoint (ib_insync.IB surface used here).
+
+    Qualify and what-if requests cost `latency` seconds (10x for
+    slow_symbols what-ifs). One conId per listed option, stable across
+    qualifies; combos repeating a conId are rejected. Short legs cost
+    1000 margin, long legs offset 800 inside a combo.
+
+    Market data: with greeks_after set, model greeks (iv(contract))
+    arrive that long after reqMktData, never for dead_strikes; the SPX
+    line shows `spot` after `latency`. tick() / spot_tick() push
+    updates on subscribed lines through pendingTickersEvent, as
+    ib_insync does on every update batch. during_qualify, if set, runs
+    while a qualify request is in flight.
+
+    Args:
+        strikes: listed strikes (reqSecDefOptParams)
+        spot: SPX price the index line settles to (None = stays NaN)
+        latency: qualify / what-if / spot round trip in seconds
+        greeks_after: delay before model greeks arrive (None = only on tick)
+        dead_strikes: strikes that never return greeks
+        iv: contract -> model IV for greeks_after arrivals
+    """
+
+    def __init__(
+        self,
+        strikes=(),
+        spot=None,
+        latency=0.0,
+        greeks_after=None,
+        dead_strikes=(),
+        iv=default_smile,
+    ):
+        self.strikes = strikes
+        self.spot = spot
+        self.latency = latency
+        self.greeks_after = greeks_after
+        self.dead_strikes = set(dead_strikes)
+        self.iv = iv
+
+        self.pendingTickersEvent = Event("pendingTickersEvent")
+        self.con_ids = {}
+        self.tickers = {}      # open option lines by conId
+        self.spot_line = None  # open SPX line
+        self.during_qualify = None
+        self.slow_symbols = set()
+
+        self.qualify_calls = 0
+        self.what_ifs = 0
+        self.requested = 0
+        self.cancelled = 0
+        self.max_open = 0
+        self.request_times = []
+
+    @property
+    def open_lines(self):
+        return len(self.tickers) + (self.spot_line is not None)
+
+    def qualifyContracts(self, *contracts):
+        return list(contracts)
+
+    async def qualifyContractsAsync(self, *contracts):
+        self.qualify_calls += 1
+        await asyncio.sleep(self.latency)
+        if self.during_qualify is not None:
+            self.during_qualify()
+        for c in contracts:
+            key = (c.lastTradeDateOrContractMonth, c.strike, c.right)
+            c.conId = self.con_ids.setdefault(key, len(self.con_ids) + 1)
+        return list(contracts)
+
+    async def reqSecDefOptParamsAsync(self, *args):
+        return [SimpleNamespace(strikes=self.strikes)]
+
+    def reqMktData(self, contract, *args):
+        loop = asyncio.get_running_loop()
+        self.requested += 1
+        self.request_times.append(loop.time())
+
+        if contract.secType == 'IND':
+            ticker = SimpleNamespace(contract=contract, price=float("nan"))
+            ticker.marketPrice = lambda: ticker.price
+            if self.spot is not None:
+                loop.call_later(self.latency, lambda: setattr(ticker, "price", self.spot))
+            self.spot_line = ticker
+            return ticker
+
+        ticker = SimpleNamespace(contract=contract, modelGreeks=None)
+        self.tickers[contract.conId] = ticker
+        self.max_open = max(self.max_open, self.open_lines)
+
+        if self.greeks_after is not None and contract.strike not in self.dead_strikes:
+            greeks = SimpleNamespace(impliedVol=self.iv(contract))
+            loop.call_later(
+                self.greeks_after, lambda: setattr(ticker, "modelGreeks", greeks)
+            )
+        return ticker
+
+    def cancelMktData(self, contract):
+        self.cancelled += 1
+        if contract.secType == 'IND':
+            self.spot_line = None
+        else:
+            self.tickers.pop(contract.conId, None)
+
+    def whatIfOrder(self, contract, order):
+        time.sleep(self.latency)
+        self.what_ifs += 1
+        shorts = order.totalQuantity if order.action == 'SELL' else 0
+        return SimpleNamespace(initMarginChange=1000.0 * shorts)
+
+    async def whatIfOrderAsync(self, contract, order):
+        self.what_ifs += 1
+        slow = contract.symbol in self.slow_symbols
+        await asyncio.sleep(10 * self.latency if slow else self.latency)
+        con_ids = [leg.conId for leg in contract.comboLegs]
+        if len(set(con_ids)) != len(con_ids):
+            raise ValueError("duplicate conId in combo")
+        margin = sum(
+            (1000.0 if leg.action == 'SELL' else -800.0) * leg.ratio
+            for leg in contract.comboLegs
+        )
+        return SimpleNamespace(initMarginChange=str(max(margin, 0.0)))
+
+    def run(self, *awaitables, timeout=None):
+        return asyncio.run(*awaitables)
+
+    def tick(self, tickers, iv):
+        tickers = [t for t in tickers if self.tickers.get(t.contract.conId) is t]
+        for ticker in tickers:
+            ticker.modelGreeks = SimpleNamespace(impliedVol=iv(ticker.contract))
+        self.pendingTickersEvent.emit(tickers)
+
+    def spot_tick(self, spot):
+        if self.spot_line is None:
+            return
+        self.spot_line.price = spot
+        self.pendingTickersEvent.emit([self.spot_line])
+
+    def max_rate(self):
+        """
+        Max reqMktData requests in any 1 s window.
+        """
+        times = self.request_times
+        return max(
+            sum(1 for u in times if t <= u < t + 1.0) for t in times
+        )
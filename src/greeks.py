@@ -0,0 +1,238 @@
+"""
+Closed-form Black–Scholes Greeks.
+
+Analytic counterpart of the autograd Greeks in physics.py.
+Delta, gamma, vega, theta and charm are all derived from a
+single evaluation of d1/d2, without building autograd graphs.
+"""
+
+import contextlib
+import math
+
+import torch
+
+try:
+    from src.physics import bs_d1_d2, legs_to_tensors, resolve_leg_vol
+except ModuleNotFoundError:
+    from physics import bs_d1_d2, legs_to_tensors, resolve_leg_vol
+
+
+GREEK_NAMES = ("delta", "gamma", "vega", "theta", "charm")
+
+
+def leg_greeks(
+    spot: torch.Tensor,
+    strikes: torch.Tensor,
+    option_types: torch.Tensor,
+    vol,
+    maturity,
+    rate=0.0,
+    differentiable: bool = False,
+    k_grid: torch.Tensor = None,
+    vol_grid: torch.Tensor = None,
+    ref_spot: float = None,
+) -> dict:
+    """
+    Unit Greeks of every leg against every spot.
+
+    Args:
+        spot: Tensor of spot prices [N]
+        strikes: Tensor of strikes [L] or [B, L]
+        option_types: Tensor of type codes (CALL/PUT), same shape as strikes
+        vol: Implied volatility, scalar or per-leg tensor shaped like strikes
+        maturity: Time to maturity (years)
+        rate: Risk-free rate
+        differentiable: keep the autograd graph (for training)
+        k_grid, vol_grid, ref_spot: resampled smile (see physics.price_legs)
+
+    Returns:
+        dict of tensors [L, N] or [B, L, N]:
+            delta, gamma, vega, theta (per year), charm (per year)
+    """
+    eps = 1e-8
+    grad_ctx = contextlib.nullcontext() if differentiable else torch.no_grad()
+
+    with grad_ctx:
+        vol = resolve_leg_vol(strikes, vol, k_grid, vol_grid, ref_spot)
+        bs = bs_d1_d2(spot, strikes, vol, maturity, rate)
+        phi = option_types.to(spot.dtype).unsqueeze(-1)
+
+        s, k, v = bs["spot"], bs["strike"], bs["vol"]
+        t, r = bs["maturity"], bs["rate"]
+        d1, d2 = bs["d1"], bs["d2"]
+        sqrt_t = bs["sqrt_t"]
+        vol_sqrt_t = v * sqrt_t + eps
+
+        pdf_d1 = torch.exp(-0.5 * d1 ** 2) / math.sqrt(2.0 * math.pi)
+
+        delta = phi * torch.special.ndtr(phi * d1)
+        gamma = pdf_d1 / (s * vol_sqrt_t)
+        vega = s * pdf_d1 * sqrt_t
+        theta = (
+            -s * pdf_d1 * v / (2.0 * sqrt_t + eps)
+            - phi * r * k * bs["discount"] * torch.special.ndtr(phi * d2)
+        )
+        # Identical for calls and puts without dividends
+        charm = -pdf_d1 * (2.0 * r * t - d2 * v * sqrt_t) / (
+            2.0 * t * vol_sqrt_t + eps
+        )
+
+        greeks = {
+            "delta": delta,
+            "gamma": gamma,
+            "vega": vega,
+            "theta": theta,
+            "charm": charm,
+        }
+
+    return greeks
+
+
+def greeks_legs(
+    spot: torch.Tensor,
+    strikes: torch.Tensor,
+    option_types: torch.Tensor,
+    weights: torch.Tensor,
+    vol,
+    maturity,
+    rate=0.0,
+    differentiable: bool = False,
+    k_grid: torch.Tensor = None,
+    vol_grid: torch.Tensor = None,
+    ref_spot: float = None,
+) -> dict:
+    """
+    Portfolio Greeks from leg tensors.
+
+    Args:
+        spot: Tensor of spot prices [N]
+        strikes: Tensor of strikes [L] or [B, L]
+        option_types: Tensor of type codes (CALL/PUT), same shape as strikes
+        weights: Tensor of leg weights, same shape as strikes
+        vol: Implied volatility, scalar or per-leg tensor shaped like strikes
+        maturity: Time to maturity
+        rate: Risk-free rate
+        differentiable: keep the autograd graph (for training)
+        k_grid, vol_grid, ref_spot: resampled smile (see physics.price_legs)
+
+    Returns:
+        dict of tensors [N] or [B, N]:
+            delta, gamma, vega, theta, charm
+    """
+    per_leg = leg_greeks(
+        spot=spot,
+        strikes=strikes,
+        option_types=option_types,
+        vol=vol,
+        maturity=maturity,
+        rate=rate,
+        differentiable=differentiable,
+        k_grid=k_grid,
+        vol_grid=vol_grid,
+        ref_spot=ref_spot,
+    )
+
+    grad_ctx = contextlib.nullcontext() if differentiable else torch.no_grad()
+
+    with grad_ctx:
+        w = weights.to(spot.dtype).unsqueeze(-1)
+        greeks = {
+            name: (w * per_leg[name]).sum(dim=-2)
+            for name in GREEK_NAMES
+        }
+
+    return greeks
+
+
+def portfolio_greeks(
+    spot: torch.Tensor,
+    legs: list,
+    vol,
+    maturity: float,
+    rate: float = 0.0,
+    differentiable: bool = False,
+    k_grid: torch.Tensor = None,
+    vol_grid: torch.Tensor = None,
+    ref_spot: float = None,
+) -> dict:
+    """
+    Analytic Greeks of a multi-leg option portfolio.
+
+    Same inputs as physics.price_portfolio.
+
+    Args:
+        spot: Tensor of spot prices [N]
+        legs: list of dicts, each with keys:
+              {"option_type", "strike", "weight"}
+        vol: Implied volatility (scalar)
+        maturity: Time to maturity
+        rate: Risk-free rate
+        differentiable: keep the autograd graph (for training)
+        k_grid, vol_grid, ref_spot: resampled smile (see physics.price_legs)
+
+    Returns:
+        dict of tensors [N]: delta, gamma, vega, theta, charm
+    """
+    strikes, option_types, weights = legs_to_tensors(
+        legs, dtype=spot.dtype, device=spot.device
+    )
+
+    return greeks_legs(
+        spot=spot,
+        strikes=strikes,
+        option_types=option_types,
+        weights=weights,
+        vol=vol,
+        maturity=maturity,
+        rate=rate,
+        differentiable=differentiable,
+        k_grid=k_grid,
+        vol_grid=vol_grid,
+        ref_spot=ref_spot,
+    )
+
+
+def leg_greek_matrix(
+    spot,
+    strikes: torch.Tensor,
+    option_types: torch.Tensor,
+    vol,
+    maturity,
+    rate=0.0,
+    greeks=("delta", "gamma", "vega"),
+    k_grid: torch.Tensor = None,
+    vol_grid: torch.Tensor = None,
+    ref_spot: float = None,
+) -> torch.Tensor:
+    """
+    Constraint matrix of unit leg Greeks at one spot per structure.
+
+    Rows are the requested Greeks, columns the legs, so that
+    matrix @ weights gives the portfolio Greeks.
+
+    Args:
+        spot: spot price (float) or per-structure spots [B]
+        strikes: Tensor of strikes [L] or [B, L]
+        greeks: names from GREEK_NAMES, one row each
+
+    Returns:
+        Tensor [m, L] or [B, m, L]
+    """
+    dtype = strikes.dtype if strikes.is_floating_point() else torch.float32
+    spot = torch.as_tensor(spot, dtype=dtype, device=strikes.device)
+
+    per_leg = leg_greeks(
+        spot=spot.unsqueeze(-1),
+        strikes=strikes,
+        option_types=option_types,
+        vol=vol,
+        maturity=maturity,
+        rate=rate,
+        k_grid=k_grid,
+        vol_grid=vol_grid,
+        ref_spot=ref_spot,
+    )
+
+    return torch.stack(
+        [per_leg[name].squeeze(-1) for name in greeks], dim=-2
+    )
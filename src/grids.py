@@ -2,9 +2,14 @@
 Numerical grids for option payoff evaluation.
 
 This module defines deterministic spot and log-moneyness grids
-used throughout the project.
+used throughout the project, and the strike windows that limit
+live chain requests to the strikes those grids consume.
 """
 
+import math
+from datetime import datetime
+from statistics import NormalDist
+
 import torch
 
 
@@ -36,3 +41,102 @@ def make_moneyness_grid(
         Tensor of shape [n_points]
     """
     return torch.linspace(k_min, k_max, n_points)
+
+
+# ---------------------------------------------
+# Live chain strike windows
+# ---------------------------------------------
+
+def delta_moneyness_bounds(
+    delta: float,
+    vol: float,
+    maturity: float,
+) -> tuple:
+    """
+    Log-moneyness band whose Black–Scholes call delta (zero rate)
+    lies in [delta, 1 - delta], i.e. both wings down to delta.
+
+    Returns:
+        (k_min, k_max)
+    """
+    z = NormalDist().inv_cdf(1.0 - delta)
+    vol_sqrt_t = vol * math.sqrt(maturity)
+    center = 0.5 * vol_sqrt_t ** 2
+    return center - z * vol_sqrt_t, center + z * vol_sqrt_t
+
+
+def expiry_year_fraction(expiry, now=None) -> float:
+    """
+    Years from now to expiry ('YYYYMMDD' / 'YYYY-MM-DD' / date),
+    taken at the 16:00 close and floored at one hour.
+    """
+    if isinstance(expiry, str):
+        expiry = datetime.strptime(expiry.replace("-", ""), "%Y%m%d")
+    expiry = datetime(expiry.year, expiry.month, expiry.day, 16)
+    now = now or datetime.now()
+
+    seconds = max((expiry - now).total_seconds(), 3600.0)
+    return seconds / (365.0 * 24 * 3600)
+
+
+class StrikeWindow:
+    """
+    Strike selection policy for live chain requests.
+
+    Keeps strikes whose log-moneyness against the current spot lies
+    in [k_min, k_max] -- or, when delta is set, in the delta band of
+    delta_moneyness_bounds at vol -- and, when stride is set, only
+    strikes on multiples of stride (strike units).
+
+    Args:
+        k_min, k_max: log-moneyness bounds
+        delta: wing delta, overrides k_min / k_max (needs maturity)
+        vol: flat vol for the delta band
+        stride: strike spacing to keep (None = every listed strike)
+    """
+
+    def __init__(
+        self,
+        k_min: float = -0.1,
+        k_max: float = 0.1,
+        delta: float = None,
+        vol: float = 0.2,
+        stride: float = None,
+    ):
+        self.k_min = k_min
+        self.k_max = k_max
+        self.delta = delta
+        self.vol = vol
+        self.stride = stride
+
+    def bounds(self, maturity: float = None) -> tuple:
+        if self.delta is None:
+            return self.k_min, self.k_max
+        if maturity is None:
+            raise ValueError("Delta window needs a maturity")
+        return delta_moneyness_bounds(self.delta, self.vol, maturity)
+
+    def mask(self, strikes, spot: float, maturity: float = None) -> torch.Tensor:
+        """
+        Boolean keep-mask, same shape as strikes.
+        """
+        strikes = torch.as_tensor(strikes, dtype=torch.float64)
+        k_min, k_max = self.bounds(maturity)
+
+        k = torch.log(strikes / spot)
+        keep = (k >= k_min) & (k <= k_max)
+
+        if self.stride is not None:
+            r = torch.remainder(strikes, self.stride)
+            on_grid = torch.minimum(r, self.stride - r) < 1e-6 * self.stride
+            keep &= on_grid
+
+        return keep
+
+    def select(self, strikes, spot: float, maturity: float = None) -> list:
+        """
+        Sorted list of the strikes inside the window.
+        """
+        strikes = torch.as_tensor(strikes, dtype=torch.float64)
+        kept = strikes[self.mask(strikes, spot, maturity)]
+        return sorted(kept.tolist())
@@ -1,5 +1,7 @@
 from ib_insync import *
 
+from src.leg_book import iter_legs
+
 class IBKRContractFactory:
     """
     Factory to create IBKR Option contracts for SPX options."""
@@ -24,3 +26,16 @@ class IBKRContractFactory:
             exchange='CBOE',
             currency='USD'
         )
+
+    def make_contracts(self, legs, expiry):
+        """
+        legs = list of leg dicts or a single-structure LegBook
+        expiry = 'YYYYMMDD'
+
+        Returns (contracts, signed quantities).
+        """
+        contracts, qtys = [], []
+        for leg in iter_legs(legs):
+            contracts.append(self.make_contract(leg, expiry))
+            qtys.append(leg['weight'])
+        return contracts, qtys
@@ -10,13 +10,23 @@ from grids import make_spot_grid, make_moneyness_grid
 from regime_encoder import (
     RegimeEncoder,
     real_vol_features,
-    multi_maturity_vol_features,
+    multi_maturity_vol_features_batched,
 )
-from portfolio_generator import PortfolioGenerator, decode_portfolio_tensor
-from real_vol import resample_vol_surface, normalize_vol_surface
-from physics import terminal_portfolio_payoff
-from stress_engine import spot_shock, aggregate_cvar
-from constraints import convexity_barrier
+from portfolio_generator import (
+    PortfolioGenerator,
+    decode_portfolio_batch,
+    legs_from_batch,
+    load_checkpoint,
+)
+from real_vol import (
+    pad_vol_surfaces,
+    resample_vol_surfaces,
+    normalize_vol_surface,
+)
+from physics import terminal_payoff_legs
+from payoff_geometry import payoff_geometry
+from stress_engine import scenario_cube, aggregate_cvar
+from constraints import SecondDerivativeStencil, convexity_barrier
 
 
 # -------------------------------------------------
@@ -26,13 +36,34 @@ from constraints import convexity_barrier
 _ENCODER_SINGLE = RegimeEncoder(input_dim=3, hidden_dim=16, latent_dim=8)
 _ENCODER_MULTI = RegimeEncoder(input_dim=6, hidden_dim=16, latent_dim=8)
 
+_CHECKPOINT = load_checkpoint("checkpoints/generator.pt")
+if "encoder" in _CHECKPOINT:
+    # train.py's encoder is the multi-maturity one
+    _ENCODER_MULTI.load_state_dict(_CHECKPOINT["encoder"])
+_ENCODER_MULTI.eval()
+
 _GENERATOR = PortfolioGenerator(latent_dim=8, hidden_dim=64)
-_GENERATOR.load_state_dict(
-    torch.load("checkpoints/generator.pt", map_location="cpu")
-)
+_GENERATOR.load_state_dict(_CHECKPOINT["generator"])
 _GENERATOR.eval()
 
 
+# -------------------------------------------------
+# Fixed grids (built once)
+# -------------------------------------------------
+
+_K_GRID = make_moneyness_grid(-1.0, 1.0, 81)
+
+# Spot grid per unit spot; scaled by each surface's spot
+_UNIT_SPOT_GRID = make_spot_grid(
+    spot=1.0,
+    sigma=0.2,
+    n_std=3.0,
+    n_points=81,
+)
+
+_STRESS_SHOCKS = torch.tensor([-0.4, -0.2, 0.2, 0.4])
+
+
 # -------------------------------------------------
 # Inference API
 # -------------------------------------------------
@@ -67,87 +98,112 @@ def infer_structure(vol_surface: dict) -> dict:
         - gamma
         - cvar
         - convex_penalty
+        - max_loss, max_gain, breakevens (exact, from breakpoints)
     """
+    return infer_structures([vol_surface])[0]
 
-    spot = vol_surface["spot"]
-
-    k_grid = make_moneyness_grid(-1.0, 1.0, 81)
-    spot_grid = make_spot_grid(
-        spot=spot,
-        sigma=0.2,
-        n_std=3.0,
-        n_points=81,
-    )
-
-    # ---------- Regime encoding ----------
-    if isinstance(vol_surface["strikes"], list):
-        # Multi-maturity
-        vol_surfaces = []
-
-        for strikes, vol in zip(
-            vol_surface["strikes"],
-            vol_surface["implied_vol"],
-        ):
-            vol_grid = resample_vol_surface(
-                strikes=strikes,
-                vol=vol,
-                spot=spot,
-                k_grid=k_grid,
-            )
-            vol_surfaces.append(normalize_vol_surface(vol_grid))
-
-        features = multi_maturity_vol_features(k_grid, vol_surfaces)
-        latent = _ENCODER_MULTI(features)
-
-    else:
-        # Single maturity
-        vol_grid = resample_vol_surface(
-            strikes=vol_surface["strikes"],
-            vol=vol_surface["implied_vol"],
-            spot=spot,
-            k_grid=k_grid,
+
+def infer_structures(vol_surfaces: list) -> list:
+    """
+    Batched inference over many surfaces.
+
+    Surfaces are padded and stacked, then encoding, generation,
+    payoff, stress and CVaR run as batched tensor ops.
+
+    Parameters
+    ----------
+    vol_surfaces : list of dict
+        Surfaces in the infer_structure format (single and
+        multi-maturity surfaces may be mixed).
+
+    Returns
+    -------
+    list of dicts, one per surface, as returned by infer_structure
+    """
+    if not vol_surfaces:
+        return []
+
+    spots = torch.tensor([float(s["spot"]) for s in vol_surfaces])
+    is_multi = torch.tensor([
+        isinstance(s["strikes"], list) for s in vol_surfaces
+    ])
+
+    with torch.no_grad():
+        # ---------- Regime encoding ----------
+        strikes, vol, mask, slice_mask = pad_vol_surfaces(
+            [s["strikes"] if m else [s["strikes"]]
+             for s, m in zip(vol_surfaces, is_multi)],
+            [s["implied_vol"] if m else [s["implied_vol"]]
+             for s, m in zip(vol_surfaces, is_multi)],
         )
 
-        vol_norm = normalize_vol_surface(vol_grid)
-        features = real_vol_features(k_grid, vol_norm)
-        latent = _ENCODER_SINGLE(features)
+        vol_grids = resample_vol_surfaces(
+            strikes=strikes,
+            vol=vol,
+            spot=spots,
+            k_grid=_K_GRID,
+            mask=mask,
+        )
+        vol_norm = normalize_vol_surface(vol_grids)
 
-    # ---------- Generate structure ----------
-    portfolio_tensor = _GENERATOR(latent)
+        latent = torch.zeros(len(vol_surfaces), _GENERATOR.net[0].in_features)
 
-    legs = decode_portfolio_tensor(
-        portfolio_tensor=portfolio_tensor.squeeze(0),
-        spot=spot,
-    )
+        if is_multi.any():
+            features = multi_maturity_vol_features_batched(
+                _K_GRID,
+                vol_norm[is_multi],
+                slice_mask[is_multi],
+            )
+            latent[is_multi] = _ENCODER_MULTI(features)
 
-    # ---------- Payoff ----------
-    payoff = terminal_portfolio_payoff(spot_grid, legs)
+        if (~is_multi).any():
+            features = real_vol_features(_K_GRID, vol_norm[~is_multi, 0])
+            latent[~is_multi] = _ENCODER_SINGLE(features)
 
-    # ---------- Gamma ----------
-    dS = spot_grid[1:] - spot_grid[:-1]
-    gamma = (
-        payoff[2:] - 2 * payoff[1:-1] + payoff[:-2]
-    ) / (dS[1:] * dS[:-1])
+        # ---------- Generate structures ----------
+        portfolio_tensor = _GENERATOR(latent)
 
-    # ---------- Stress & CVaR ----------
-    stressed = [
-        terminal_portfolio_payoff(
-            spot_shock(spot_grid, s),
-            legs,
+        leg_strikes, leg_types, leg_weights = decode_portfolio_batch(
+            portfolio_tensor, spots
+        )
+
+        # ---------- Payoff ----------
+        spot_grid = spots.unsqueeze(-1) * _UNIT_SPOT_GRID
+
+        payoff = terminal_payoff_legs(
+            spot_grid, leg_strikes, leg_types, leg_weights
+        )
+
+        # ---------- Exact extremes & breakevens ----------
+        geometry = payoff_geometry(leg_strikes, leg_types, leg_weights)
+
+        # ---------- Gamma ----------
+        stencil = SecondDerivativeStencil(spot_grid)
+        gamma = stencil(payoff)
+
+        # ---------- Stress & CVaR ----------
+        stressed = scenario_cube(
+            spot_grid, leg_strikes, leg_types, leg_weights, _STRESS_SHOCKS
         )
-        for s in (-0.4, -0.2, 0.2, 0.4)
-    ]
 
-    cvar = aggregate_cvar(stressed)
+        cvar = aggregate_cvar(stressed)
 
-    # ---------- Convexity ----------
-    convex_penalty = convexity_barrier(payoff, spot_grid)
+        # ---------- Convexity ----------
+        convex_penalty = convexity_barrier(payoff, spot_grid, stencil=stencil)
 
-    return {
-        "legs": legs,
-        "spot_grid": spot_grid,
-        "payoff": payoff,
-        "gamma": gamma,
-        "cvar": cvar,
-        "convex_penalty": convex_penalty,
-    }
+    legs = legs_from_batch(leg_strikes, leg_types, leg_weights)
+
+    return [
+        {
+            "legs": legs[i],
+            "spot_grid": spot_grid[i],
+            "payoff": payoff[i],
+            "gamma": gamma[i],
+            "cvar": cvar[i],
+            "convex_penalty": convex_penalty[i],
+            "max_loss": geometry["max_loss"][i],
+            "max_gain": geometry["max_gain"][i],
+            "breakevens": geometry["breakevens"][i],
+        }
+        for i in range(len(vol_surfaces))
+    ]
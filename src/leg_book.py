@@ -0,0 +1,429 @@
+"""
+Struct-of-arrays storage for option legs.
+
+A LegBook keeps the legs of one or many structures in contiguous
+arrays instead of one dict per leg:
+
+    strikes      float64 [n_legs]
+    option_types int8    [n_legs]  (CALL=+1, PUT=-1)
+    weights      float32 [n_legs]
+    expiry_ids   int32   [n_legs]  (optional, NO_EXPIRY if unknown)
+    offsets      int64   [n_structures + 1]
+
+Structure i owns legs offsets[i]:offsets[i+1].
+"""
+
+import hashlib
+import json
+
+import numpy as np
+import torch
+
+# Module import: physics canonicalizes through leg_book in turn
+try:
+    from src import physics
+except ModuleNotFoundError:
+    import physics
+
+NO_EXPIRY = -1
+
+
+class LegBook:
+    __slots__ = ("strikes", "option_types", "weights", "expiry_ids", "offsets")
+
+    def __init__(self, strikes, option_types, weights, expiry_ids=None, offsets=None):
+        self.strikes = np.ascontiguousarray(strikes, dtype=np.float64)
+        self.option_types = np.ascontiguousarray(option_types, dtype=np.int8)
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+        self.expiry_ids = (
+            None if expiry_ids is None
+            else np.ascontiguousarray(expiry_ids, dtype=np.int32)
+        )
+        self.offsets = (
+            np.array([0, self.strikes.shape[0]], dtype=np.int64)
+            if offsets is None
+            else np.ascontiguousarray(offsets, dtype=np.int64)
+        )
+
+        n = self.strikes.shape[0]
+        if self.option_types.shape[0] != n or self.weights.shape[0] != n:
+            raise ValueError("strikes, option_types and weights must have same length")
+        if self.expiry_ids is not None and self.expiry_ids.shape[0] != n:
+            raise ValueError("expiry_ids must have one entry per leg")
+        if self.offsets[0] != 0 or self.offsets[-1] != n:
+            raise ValueError("offsets must span all legs")
+
+    # --------------------------------------------------------
+    # Construction
+    # --------------------------------------------------------
+
+    @classmethod
+    def from_legs(cls, legs: list, expiry_ids=None) -> "LegBook":
+        """
+        Single structure from a list of {"option_type", "strike", "weight"} dicts.
+        """
+        return cls.from_structures([legs], expiry_ids=expiry_ids)
+
+    @classmethod
+    def from_structures(cls, structures: list, expiry_ids=None) -> "LegBook":
+        """
+        Many structures from a list of leg-dict lists.
+        """
+        legs = [leg for structure in structures for leg in structure]
+        offsets = np.zeros(len(structures) + 1, dtype=np.int64)
+        np.cumsum([len(s) for s in structures], out=offsets[1:])
+
+        if expiry_ids is None and any("expiry" in leg for leg in legs):
+            expiry_ids = [leg.get("expiry", NO_EXPIRY) for leg in legs]
+
+        return cls(
+            strikes=[float(leg["strike"]) for leg in legs],
+            option_types=[physics.OPTION_TYPE_CODES[leg["option_type"]] for leg in legs],
+            weights=[float(leg["weight"]) for leg in legs],
+            expiry_ids=expiry_ids,
+            offsets=offsets,
+        )
+
+    @classmethod
+    def from_tensors(cls, strikes, option_types, weights, expiry_ids=None) -> "LegBook":
+        """
+        Fixed-width book from [B, L] (or single-structure [L]) tensors,
+        e.g. the output of portfolio_generator.decode_portfolio_batch.
+        """
+        if strikes.ndim == 1:
+            strikes, option_types, weights = (
+                strikes.unsqueeze(0), option_types.unsqueeze(0), weights.unsqueeze(0)
+            )
+            if expiry_ids is not None:
+                expiry_ids = torch.as_tensor(expiry_ids).unsqueeze(0)
+
+        n_structures, width = strikes.shape
+
+        return cls(
+            strikes=strikes.detach().cpu().numpy().reshape(-1),
+            option_types=option_types.detach().cpu().numpy().reshape(-1),
+            weights=weights.detach().cpu().numpy().reshape(-1),
+            expiry_ids=(
+                None if expiry_ids is None
+                else torch.as_tensor(expiry_ids).cpu().numpy().reshape(-1)
+            ),
+            offsets=np.arange(n_structures + 1, dtype=np.int64) * width,
+        )
+
+    # --------------------------------------------------------
+    # Shape
+    # --------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self.offsets.shape[0] - 1
+
+    @property
+    def n_legs(self) -> int:
+        return self.strikes.shape[0]
+
+    @property
+    def structure_ids(self) -> np.ndarray:
+        """
+        Index of the owning structure for every leg [n_legs].
+        """
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.strikes, self.option_types, self.weights, self.offsets]
+        if self.expiry_ids is not None:
+            arrays.append(self.expiry_ids)
+        return sum(a.nbytes for a in arrays)
+
+    def __getitem__(self, i: int) -> "LegBook":
+        """
+        Structure i as a single-structure book (array views, no copy).
+        """
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("structure index out of range")
+
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return LegBook(
+            strikes=self.strikes[lo:hi],
+            option_types=self.option_types[lo:hi],
+            weights=self.weights[lo:hi],
+            expiry_ids=None if self.expiry_ids is None else self.expiry_ids[lo:hi],
+        )
+
+    # --------------------------------------------------------
+    # Conversion
+    # --------------------------------------------------------
+
+    def to_numpy(self):
+        """
+        (strikes, option_types, weights) arrays over all legs (no copy).
+        """
+        return self.strikes, self.option_types, self.weights
+
+    def to_torch(self):
+        """
+        (strikes, option_types, weights) tensors over all legs.
+        Zero-copy: the tensors share memory with the book.
+        """
+        return (
+            torch.from_numpy(self.strikes),
+            torch.from_numpy(self.option_types),
+            torch.from_numpy(self.weights),
+        )
+
+    def to_padded(self):
+        """
+        [B, L_max] tensors for batched pricing/payoff.
+
+        Short structures are padded with zero-weight copies of their
+        last leg. Fixed-width books are reshaped without copying.
+        """
+        counts = np.diff(self.offsets)
+        width = int(counts.max()) if len(self) else 0
+        strikes, option_types, weights = self.to_torch()
+
+        if np.all(counts == width):
+            return (
+                strikes.view(len(self), width),
+                option_types.view(len(self), width),
+                weights.view(len(self), width),
+            )
+
+        slot = np.arange(width)
+        last = self.offsets[1:] - 1
+        idx = np.minimum(self.offsets[:-1, None] + slot, last[:, None])
+        live = torch.from_numpy(slot < counts[:, None])
+        idx = torch.from_numpy(idx)
+
+        return (
+            strikes[idx],
+            option_types[idx],
+            torch.where(live, weights[idx], torch.zeros_like(weights[idx])),
+        )
+
+    def as_tensors(self):
+        """
+        [L] tensors for single-structure books, [B, L_max] otherwise.
+        """
+        if len(self) == 1:
+            return self.to_torch()
+        return self.to_padded()
+
+    def to_legs(self) -> list:
+        """
+        Legs of a single-structure book as a list of dicts.
+        """
+        if len(self) != 1:
+            raise ValueError("to_legs needs a single-structure book; use to_structures")
+        return list(iter_legs(self))
+
+    def to_structures(self) -> list:
+        return [self[i].to_legs() for i in range(len(self))]
+
+    def to_dict(self) -> dict:
+        data = {
+            "strikes": self.strikes.tolist(),
+            "option_types": self.option_types.tolist(),
+            "weights": self.weights.tolist(),
+            "offsets": self.offsets.tolist(),
+        }
+        if self.expiry_ids is not None:
+            data["expiry_ids"] = self.expiry_ids.tolist()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LegBook":
+        return cls(
+            strikes=data["strikes"],
+            option_types=data["option_types"],
+            weights=data["weights"],
+            expiry_ids=data.get("expiry_ids"),
+            offsets=data["offsets"],
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text: str) -> "LegBook":
+        return cls.from_dict(json.loads(text))
+
+    def __repr__(self) -> str:
+        return f"LegBook(structures={len(self)}, legs={self.n_legs})"
+
+
+def iter_legs(legs):
+    """
+    Yields {"option_type", "strike", "weight"} dicts from a leg list
+    or a single-structure LegBook.
+    """
+    if not isinstance(legs, LegBook):
+        yield from legs
+        return
+
+    for i, (k, t, w) in enumerate(zip(
+        legs.strikes.tolist(),
+        legs.option_types.tolist(),
+        legs.weights.tolist(),
+    )):
+        leg = {"option_type": physics.OPTION_TYPE_NAMES[t], "strike": k, "weight": w}
+        if legs.expiry_ids is not None:
+            leg["expiry"] = int(legs.expiry_ids[i])
+        yield leg
+
+
+# ============================================================
+# CANONICAL FORM
+# ============================================================
+#
+# Canonical legs are netted per (option_type, strike, expiry),
+# zero weights are dropped, and legs are ordered by
+# (option_type, strike, expiry) with puts first. Each side is
+# therefore strike-ascending, as capital_physics.net_side expects.
+
+def _canonical_key(leg):
+    strike = leg["strike"]
+    if torch.is_tensor(strike):
+        strike = strike.detach()
+    return (
+        physics.OPTION_TYPE_CODES[leg["option_type"]],
+        float(strike),
+        leg.get("expiry", NO_EXPIRY),
+    )
+
+
+def canonicalize_legs(legs):
+    """
+    Canonical form of a leg list (or LegBook).
+
+    Returns a new list of leg dicts, or a LegBook for LegBook input.
+    """
+    if isinstance(legs, LegBook):
+        return canonicalize_book(legs)
+
+    netted = {}
+    templates = {}
+    for leg in legs:
+        key = _canonical_key(leg)
+        netted[key] = netted.get(key, 0.0) + leg["weight"]
+        templates.setdefault(key, leg)
+
+    return [
+        {**templates[key], "weight": netted[key]}
+        for key in sorted(netted)
+        if netted[key] != 0
+    ]
+
+
+def canonicalize_book(book: LegBook) -> LegBook:
+    """
+    Canonical form of every structure in a LegBook, vectorized.
+    """
+    structure = book.structure_ids
+    expiry = (
+        book.expiry_ids if book.expiry_ids is not None
+        else np.full(book.n_legs, NO_EXPIRY, dtype=np.int32)
+    )
+
+    order = np.lexsort((expiry, book.strikes, book.option_types, structure))
+    structure, expiry = structure[order], expiry[order]
+    strikes, types = book.strikes[order], book.option_types[order]
+
+    new_group = np.ones(book.n_legs, dtype=bool)
+    new_group[1:] = (
+        (structure[1:] != structure[:-1])
+        | (types[1:] != types[:-1])
+        | (strikes[1:] != strikes[:-1])
+        | (expiry[1:] != expiry[:-1])
+    )
+    starts = np.flatnonzero(new_group)
+
+    weights = (
+        np.add.reduceat(book.weights[order].astype(np.float64), starts)
+        if book.n_legs else np.zeros(0)
+    )
+    keep = starts[weights != 0]
+    weights = weights[weights != 0]
+
+    offsets = np.zeros(len(book) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(structure[keep], minlength=len(book)), out=offsets[1:])
+
+    return LegBook(
+        strikes=strikes[keep],
+        option_types=types[keep],
+        weights=weights,
+        expiry_ids=None if book.expiry_ids is None else expiry[keep],
+        offsets=offsets,
+    )
+
+
+def canonicalize_batch(strikes, option_types, weights, expiry_ids=None):
+    """
+    Canonical form of fixed-width [B, L] leg tensors.
+
+    Shapes are preserved: netted legs come first in the same
+    (option_type, strike, expiry) order as canonicalize_legs, and
+    freed slots at the end are zero-weight copies of the row's first
+    live canonical leg. Weights stay differentiable.
+
+    Returns (strikes, option_types, weights, n_legs [B]).
+    """
+    keys = [option_types, strikes] + ([] if expiry_ids is None else [expiry_ids])
+
+    # Lexicographic sort: stable sorts from the least significant key
+    order = torch.arange(strikes.shape[-1], device=strikes.device).expand_as(strikes)
+    for key in reversed(keys):
+        idx = torch.sort(torch.gather(key, -1, order), dim=-1, stable=True).indices
+        order = torch.gather(order, -1, idx)
+
+    sorted_keys = [torch.gather(key, -1, order) for key in keys]
+    w = torch.gather(weights, -1, order)
+
+    same = torch.ones_like(strikes[..., 1:], dtype=torch.bool)
+    for key in sorted_keys:
+        same = same & (key[..., 1:] == key[..., :-1])
+    new_group = torch.cat([torch.ones_like(same[..., :1]), ~same], dim=-1)
+    group = torch.cumsum(new_group.long(), dim=-1) - 1
+
+    netted_w = torch.zeros_like(w).scatter_add(-1, group, w)
+    netted_keys = [
+        torch.zeros_like(key).scatter(-1, group, key) for key in sorted_keys
+    ]
+
+    # Compact live slots to the front, keeping canonical order
+    slot = torch.arange(strikes.shape[-1], device=strikes.device)
+    live = (netted_w != 0) & (slot <= group[..., -1:])
+    compact = torch.sort((~live).to(torch.int8), dim=-1, stable=True).indices
+
+    live = torch.gather(live, -1, compact)
+    netted_w = torch.gather(netted_w, -1, compact) * live
+    compacted = [torch.gather(key, -1, compact) for key in netted_keys]
+    netted_keys = [torch.where(live, key, key[..., :1]) for key in compacted]
+
+    out_types, out_strikes = netted_keys[0], netted_keys[1]
+    return out_strikes, out_types, netted_w, live.sum(dim=-1)
+
+
+def structure_key(legs, underlying="", expiry="", decimals=2) -> str:
+    """
+    Stable hash of a structure's canonical form, for caching.
+
+    Strikes are rounded to `decimals`; weights to 1e-8.
+    """
+    canonical = list(iter_legs(canonicalize_legs(legs)))
+    payload = json.dumps([
+        str(underlying),
+        str(expiry),
+        [
+            [
+                leg["option_type"],
+                round(float(leg["strike"]), decimals),
+                round(float(leg["weight"]), 8),
+                leg.get("expiry", NO_EXPIRY),
+            ]
+            for leg in canonical
+        ],
+    ])
+    return hashlib.sha1(payload.encode()).hexdigest()
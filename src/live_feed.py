@@ -1,14 +1,45 @@
+import asyncio
+from collections import deque
+from datetime import datetime
+
 from ib_insync import *
 import pandas as pd
+import torch
+
+from src.grids import expiry_year_fraction
+from src.real_vol import IncrementalSurface
 
 class IBKRLiveFeed:
     """
     Pulls live SPX spot + option chain + IV surface from IBKR.
+
+    ib          : connected IB instance (None = connect to TWS on
+                  host:port); injectable so a fake server can stand in
+    max_lines   : market data lines held open at once
+    msg_rate    : max reqMktData requests per second (IB pacing)
+    window      : StrikeWindow applied to the listed chain strikes,
+                  recomputed from spot on every request (None = all)
     """
 
-    def __init__(self):
-        self.ib = IB()
-        self.ib.connect('127.0.0.1', 7497, clientId=19)
+    def __init__(
+        self,
+        ib=None,
+        host='127.0.0.1',
+        port=7497,
+        client_id=19,
+        max_lines=90,
+        msg_rate=45,
+        poll=0.05,
+        window=None,
+    ):
+        if ib is None:
+            ib = IB()
+            ib.connect(host, port, clientId=client_id)
+        self.ib = ib
+        self.max_lines = max_lines
+        self.msg_rate = msg_rate
+        self.poll = poll
+        self.window = window
 
         self.spx = Index('SPX', 'CBOE')
         self.ib.qualifyContracts(self.spx)
@@ -18,28 +49,318 @@ class IBKRLiveFeed:
         self.ib.sleep(1)
         return ticker.marketPrice()
 
+    async def get_spx_spot_async(self, timeout=2.0):
+        """
+        Spot as soon as a price ticks in (nan after timeout); the
+        spot line is cancelled either way.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        ticker = self.ib.reqMktData(self.spx, '', False, False)
+        try:
+            price = ticker.marketPrice()
+            while price != price and loop.time() < deadline:
+                await asyncio.sleep(self.poll)
+                price = ticker.marketPrice()
+        finally:
+            self.ib.cancelMktData(self.spx)
+        return price
+
+    async def select_strikes_async(self, expiry, spot=None):
+        """
+        Listed strikes for expiry, narrowed by self.window around spot.
+        """
+        strikes = (await self.get_option_chain_async()).strikes
+        if self.window is None:
+            return list(strikes)
+
+        if spot is None:
+            spot = await self.get_spx_spot_async()
+        return self.window.select(strikes, spot, expiry_year_fraction(expiry))
+
     def get_option_chain(self):
         chains = self.ib.reqSecDefOptParams(
             self.spx.symbol, '', self.spx.secType, self.spx.conId
         )
         return chains[0]
 
-    def get_iv_surface(self, expiry):
-        chain = self.get_option_chain()
+    async def get_option_chain_async(self):
+        chains = await self.ib.reqSecDefOptParamsAsync(
+            self.spx.symbol, '', self.spx.secType, self.spx.conId
+        )
+        return chains[0]
+
+    def get_iv_surface(self, expiry, strikes=None, timeout=10.0, spot=None):
+        """
+        Blocking wrapper around get_iv_surface_async.
+        """
+        return self.ib.run(
+            self.get_iv_surface_async(expiry, strikes, timeout, spot)
+        )
+
+    async def get_iv_surface_async(self, expiry, strikes=None, timeout=10.0, spot=None):
+        """
+        IV smile for one expiry.
+
+        All contracts are qualified in one call, then subscribed
+        concurrently within max_lines / msg_rate. Each line is
+        cancelled once its model greeks arrive; returns when every
+        contract has an IV or after timeout seconds, whichever is first.
 
+        strikes defaults to the chain strikes inside self.window around
+        spot (fetched when not given).
+
+        Returns:
+            DataFrame with columns strike, right, iv (sorted by strike)
+        """
+        if strikes is None:
+            strikes = await self.select_strikes_async(expiry, spot)
+
+        options = [
+            Option('SPX', expiry, strike, right, 'CBOE')
+            for strike in strikes
+            for right in ['C', 'P']
+        ]
+        qualified = await self.ib.qualifyContractsAsync(*options)
+        contracts = [c for c in qualified if c.conId]
+
+        rows = await self._collect_greeks(contracts, timeout)
+        return pd.DataFrame(rows, columns=["strike", "right", "iv"]).sort_values(
+            ["strike", "right"], ignore_index=True
+        )
+
+    async def _collect_greeks(self, contracts, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        pending = deque(contracts)
+        active = {}
+        sent = deque()   # request timestamps within the last second
         rows = []
-        for strike in chain.strikes:
-            for right in ['C', 'P']:
-                opt = Option('SPX', expiry, strike, right, 'CBOE')
-                self.ib.qualifyContracts(opt)
-                ticker = self.ib.reqMktData(opt, '', False, False)
-                self.ib.sleep(0.2)
-
-                if ticker.modelGreeks:
+
+        try:
+            while pending or active:
+                now = loop.time()
+                if now >= deadline:
+                    break
+
+                while sent and now - sent[0] >= 1.0:
+                    sent.popleft()
+
+                while pending and len(active) < self.max_lines and len(sent) < self.msg_rate:
+                    contract = pending.popleft()
+                    active[contract.conId] = self.ib.reqMktData(contract, '', False, False)
+                    sent.append(now)
+
+                for con_id, ticker in list(active.items()):
+                    greeks = ticker.modelGreeks
+                    if greeks is None or greeks.impliedVol is None:
+                        continue
                     rows.append({
-                        "strike": strike,
-                        "right": right,
-                        "iv": ticker.modelGreeks.impliedVol
+                        "strike": ticker.contract.strike,
+                        "right": ticker.contract.right,
+                        "iv": greeks.impliedVol,
                     })
+                    self.ib.cancelMktData(ticker.contract)
+                    del active[con_id]
+
+                await asyncio.sleep(self.poll)
+        finally:
+            for ticker in active.values():
+                self.ib.cancelMktData(ticker.contract)
+
+        return rows
+
+
+class ChainSubscription:
+    """
+    Persistent option subscriptions feeding an IncrementalSurface.
+
+    One line per (expiry, strike) on its OTM side (put below spot,
+    call at or above) for the strikes in feed.window, plus one SPX
+    spot line. Lines stay open; each pendingTickersEvent batch is
+    written into the surface in place, so a refresh costs O(ticks) +
+    O(dirty slices). recenter() moves the window with spot and only
+    cancels / opens the lines that changed.
+
+    Unlike the request/cancel snapshots of get_iv_surface, these lines
+    are held for the whole session: expiries x windowed strikes + 1
+    must fit max_lines, i.e. the account's market data line allowance
+    (100 by default, more with quote booster packs). Keep the window /
+    stride coarse enough; open() raises ValueError, with nothing
+    subscribed, when it does not fit.
+
+    Args:
+        feed: IBKRLiveFeed (ib, pacing limits, strike window)
+        expiries: list of 'YYYYMMDD'
+        k_grid: log-moneyness grid the surface is resampled onto
+        spot_band: relative spot move before the window recenters
+        max_lines: persistent line allowance (None = feed.max_lines)
+    """
+
+    def __init__(self, feed, expiries, k_grid, spot_band=0.005, max_lines=None):
+        self.feed = feed
+        self.ib = feed.ib
+        self.expiries = list(expiries)
+        self._expiry_dates = [datetime.strptime(e, "%Y%m%d") for e in self.expiries]
+        self.k_grid = k_grid
+        self.spot_band = spot_band
+        self.max_lines = feed.max_lines if max_lines is None else max_lines
+
+        if self.max_lines < len(self.expiries) + 1:
+            raise ValueError(
+                f"max_lines {self.max_lines} cannot hold one strike for "
+                f"{len(self.expiries)} expiries plus the spot line"
+            )
+
+        self.surface = None
+        self.center = None
+        self._chain = None
+        self._strikes = []
+        self._spot_ticker = None
+        self._lines = {}   # (expiry index, strike, right) -> ticker
+        self._index = {}   # conId -> (expiry index, strike index)
+
+    def _window(self, spot):
+        if self.feed.window is None:
+            return sorted(self._chain)
+        return self.feed.window.select(
+            self._chain, spot, expiry_year_fraction(self.expiries[-1])
+        )
+
+    def _wanted(self, strikes, spot):
+        return {
+            (m, k, 'P' if k < spot else 'C')
+            for m in range(len(self.expiries))
+            for k in strikes
+        }
+
+    async def _sync(self, strikes, spot):
+        """
+        Move subscriptions to the window `strikes` around spot.
+
+        Capacity is checked and new contracts qualified before anything
+        changes; the lines, surface and conId index are then swapped
+        together without yielding, so ticks handled at any await see a
+        consistent (old or new) state. New lines are requested last,
+        within msg_rate.
+        """
+        wanted = self._wanted(strikes, spot)
+        drop = self._lines.keys() - wanted
+        add = sorted(wanted - self._lines.keys())
+
+        if len(wanted) + 1 > self.max_lines:
+            raise ValueError(
+                f"{len(wanted) + 1} lines needed, max_lines is {self.max_lines}"
+            )
+
+        options = [
+            Option('SPX', self.expiries[m], k, right, 'CBOE')
+            for m, k, right in add
+        ]
+        if options:
+            await self.ib.qualifyContractsAsync(*options)
+        pending = [(key, c) for key, c in zip(add, options) if c.conId]
+
+        # --- swap (no awaits) ---
+        for key in drop:
+            self.ib.cancelMktData(self._lines.pop(key).contract)
+
+        if strikes != self._strikes:
+            self.surface = self.surface.reindex(torch.tensor(strikes))
+            self._strikes = strikes
+
+        position = {k: i for i, k in enumerate(strikes)}
+        self._index = {
+            ticker.contract.conId: (m, position[k])
+            for (m, k, _), ticker in self._lines.items()
+        }
+        self._index.update(
+            (c.conId, (m, position[k])) for (m, k, _), c in pending
+        )
+
+        # --- paced requests for the new lines ---
+        for n, (key, contract) in enumerate(pending):
+            if n and n % self.feed.msg_rate == 0:
+                await asyncio.sleep(1.0)   # IB pacing
+            self._lines[key] = self.ib.reqMktData(contract, '', False, False)
+
+    async def open_async(self, spot=None):
+        if spot is None:
+            spot = await self.feed.get_spx_spot_async()
+        self._chain = list((await self.feed.get_option_chain_async()).strikes)
+
+        self.center = spot
+        self.surface = IncrementalSurface(
+            torch.tensor([]), len(self.expiries), spot, self.k_grid,
+            spot_band=self.spot_band,
+        )
+        await self._sync(self._window(spot), spot)
+
+        self._spot_ticker = self.ib.reqMktData(self.feed.spx, '', False, False)
+        self.ib.pendingTickersEvent += self.on_tickers
+
+    def open(self, spot=None):
+        return self.ib.run(self.open_async(spot))
+
+    async def recenter_async(self, spot):
+        """
+        Move the strike window to spot; quotes on kept strikes carry over.
+        """
+        await self._sync(self._window(spot), spot)
+        self.center = spot
+        self.surface.set_spot(spot)
+
+    def on_tickers(self, tickers):
+        surface = self.surface
+        for ticker in tickers:
+            if ticker is self._spot_ticker:
+                price = ticker.marketPrice()
+                if price == price:
+                    surface.set_spot(price)
+                continue
+
+            position = self._index.get(ticker.contract.conId)
+            greeks = ticker.modelGreeks
+            if position is None or greeks is None or greeks.impliedVol is None:
+                continue
+            surface.update(*position, greeks.impliedVol)
+
+    def snapshot(self):
+        """
+        Live surface (extract_live_spx_surface format, NaN = no quote)
+        plus regime "features" from the incremental refresh, equal to
+        live_surface_features(snapshot, k_grid). "ref_spot" is the
+        spot moneyness was taken against.
+        """
+        surface = self.surface
+        features = surface.refresh()
+        now = datetime.now()
+        return {
+            "spot": surface.spot,
+            "ref_spot": surface.ref_spot,
+            "maturities": [expiry_year_fraction(d, now) for d in self._expiry_dates],
+            "strikes": [surface.strikes] * len(self.expiries),
+            "implied_vol": list(surface.iv.clone()),
+            "features": features,
+        }
+
+    async def snapshot_async(self):
+        """
+        snapshot() on the IB event loop, recentering first if spot
+        left spot_band. Pass as LiveLoop's fetch.
+        """
+        if abs(self.surface.spot / self.center - 1.0) > self.spot_band:
+            await self.recenter_async(self.surface.spot)
+        return self.snapshot()
 
-        return pd.DataFrame(rows)
+    def close(self):
+        self.ib.pendingTickersEvent -= self.on_tickers
+        if self._spot_ticker is not None:
+            self.ib.cancelMktData(self.feed.spx)
+            self._spot_ticker = None
+        for ticker in self._lines.values():
+            self.ib.cancelMktData(ticker.contract)
+        self._lines.clear()
+        self._index.clear()
@@ -3,9 +3,15 @@ Capital-aware convex structural objective.
 """
 
 import torch
+import torch.nn.functional as F
 
-from src.stress_engine import aggregate_cvar
+from src.leg_book import iter_legs
+from src.payoff_geometry import payoff_breakpoints
+from src.physics import terminal_payoff_legs
+from src.portfolio_generator import decode_portfolio_batch
+from src.stress_engine import aggregate_cvar, scenario_cube, smooth_cvar
 from src.constraints import (
+    SecondDerivativeStencil,
     VirtualIBKRAccount,
     short_call_init_margin,
     short_put_init_margin,
@@ -21,7 +27,7 @@ def margin_penalty(legs, spot):
     Deterministic Reg-T margin usage proxy.
     """
     total = 0.0
-    for leg in legs:
+    for leg in iter_legs(legs):
         q = leg["weight"]
         if q >= 0:
             continue
@@ -37,12 +43,94 @@ def margin_penalty(legs, spot):
     return total
 
 
-def convexity_reward(payoff: torch.Tensor, spot: torch.Tensor):
+def _relu(x, sharpness):
+    if sharpness is None:
+        return torch.clamp(x, min=0.0)
+    return F.softplus(sharpness * x) / sharpness
+
+
+def _max(a, b, sharpness):
+    if sharpness is None:
+        return torch.maximum(a, b)
+    return torch.logaddexp(sharpness * a, sharpness * b) / sharpness
+
+
+def spread_max_loss(strikes, option_types, weights, sharpness=None):
+    """
+    Max terminal loss per structure from its payoff breakpoints
+    (Reg-T spread margin = max loss). inf if the loss is unbounded.
+    """
+    breakpoints = payoff_breakpoints(strikes, option_types, weights)
+    values = breakpoints["values"]
+
+    if sharpness is None:
+        max_loss = -values.min(dim=-1).values
+    else:
+        max_loss = torch.logsumexp(-sharpness * values, dim=-1) / sharpness
+
+    unbounded = breakpoints["slopes"][..., -1] < 0
+    return torch.where(unbounded, torch.full_like(max_loss, float("inf")), max_loss)
+
+
+def margin_penalty_batched(
+    strikes,
+    option_types,
+    weights,
+    spot,
+    spread: bool = False,
+    sharpness: float = None,
+):
+    """
+    Tensor Reg-T margin usage proxy, one value per structure.
+
+    Same naked short formulas as margin_penalty (zero premium),
+    batched over leg tensors [..., L]; spot is float or [...].
+
+    spread=True caps the naked total at the structure's max loss
+    (spread_init_margin), as for defined-risk structures.
+    sharpness replaces the max / OTM / min kinks with softplus and
+    log-sum-exp of that sharpness (1 / payoff units) so the margin
+    has gradients in strikes and spot; None keeps the exact kinks.
+    """
+    spot = torch.as_tensor(spot, dtype=strikes.dtype, device=strikes.device)
+    spot = spot.unsqueeze(-1) if spot.ndim else spot
+
+    is_call = option_types > 0
+    otm = _relu(torch.where(is_call, strikes - spot, spot - strikes), sharpness)
+    floor = torch.where(is_call, 0.10 * spot, 0.10 * strikes)
+    leg_margin = _max(0.20 * spot - otm, floor, sharpness)
+
+    short_qty = torch.clamp(-weights, min=0.0)
+    naked = (short_qty * leg_margin).sum(dim=-1)
+
+    if not spread:
+        return naked
+
+    max_loss = spread_max_loss(strikes, option_types, weights, sharpness)
+    bounded = torch.isfinite(max_loss)
+    max_loss = torch.where(bounded, max_loss, naked)
+
+    # min(naked, max_loss) = -max(-naked, -max_loss)
+    capped = -_max(-naked, -max_loss, sharpness)
+    return torch.where(bounded, capped, naked)
+
+
+def convexity_reward(
+    payoff: torch.Tensor,
+    spot: torch.Tensor,
+    stencil: SecondDerivativeStencil = None,
+):
     """
     Rewards second-derivative convexity around ATM.
+
+    Measured as the grid second difference (stencil.second_difference),
+    the units alpha / beta in structural_objective are tuned against.
     """
-    d2 = payoff[2:] - 2 * payoff[1:-1] + payoff[:-2]
-    return torch.mean(torch.relu(d2))
+    if stencil is None:
+        stencil = SecondDerivativeStencil(spot)
+
+    d2 = stencil.second_difference(payoff)
+    return torch.mean(torch.relu(d2), dim=-1)
 
 
 # ============================================================
@@ -73,7 +161,7 @@ def structural_objective(
     margin_use = margin_penalty(legs, spot)
 
     # Final scalar objective
-    return convex - alpha * tail_penalty - beta * margin_use - gamma * sum(abs(l["weight"]) for l in legs)
+    return convex - alpha * tail_penalty - beta * margin_use - gamma * sum(abs(l["weight"]) for l in iter_legs(legs))
 
 def differentiable_convex_proxy(raw_tensor, spot):
     """
@@ -89,3 +177,56 @@ def differentiable_convex_proxy(raw_tensor, spot):
     size_penalty = torch.abs(weights)
 
     return - torch.mean(convex_mass * size_penalty)
+
+
+def structural_objective_batched(
+    params: torch.Tensor,
+    spot_grid: torch.Tensor,
+    spot,
+    stress_shocks,
+    alpha: float = 8.0,
+    beta: float = 0.05,
+    q: float = 0.1,
+    temperature: float = 0.01,
+    stencil: SecondDerivativeStencil = None,
+    margin_sharpness: float = 10.0,
+):
+    """
+    Differentiable structural_objective over a batch of generator outputs.
+
+    Decodes with unrounded strikes, so gradients flow from payoff,
+    smooth stress CVaR and margin back into the generator (whose
+    outputs sit inside the decode clamps). Leg size is fixed at one
+    unit by the grammar, so structural_objective's size term would be
+    a constant and is left out.
+
+    Args:
+        params: generator outputs [B, 5]
+        spot_grid: spot grid [N] or per-structure [B, N]
+        spot: float or Tensor [B]
+        stress_shocks: fractional spot shocks [S]
+        stencil: prebuilt SecondDerivativeStencil for spot_grid
+        margin_sharpness: smoothing of the Reg-T margin (see
+                          margin_penalty_batched)
+
+    Returns:
+        Objective per structure [B] (higher is better)
+    """
+    strikes, option_types, weights = decode_portfolio_batch(
+        params, spot, round_strikes=False
+    )
+
+    payoff = terminal_payoff_legs(spot_grid, strikes, option_types, weights)
+    convex = convexity_reward(payoff, spot_grid, stencil)
+
+    stressed = scenario_cube(
+        spot_grid, strikes, option_types, weights, stress_shocks
+    )
+    cvar = smooth_cvar(stressed, q=q, temperature=temperature)
+    tail_penalty = torch.clamp(-cvar, min=0.0)
+
+    margin_use = margin_penalty_batched(
+        strikes, option_types, weights, spot,
+        spread=True, sharpness=margin_sharpness,
+    )
+    return convex - alpha * tail_penalty - beta * margin_use
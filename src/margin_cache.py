@@ -0,0 +1,107 @@
+"""
+Bounded margin result cache keyed by canonical structure signature.
+
+Entries are keyed by structure_key (underlying, expiry and the netted,
+sorted legs), evicted least-recently-used beyond maxsize, and treated
+as stale after ttl seconds, once spot leaves the band it was computed
+in, or when account equity changes.
+"""
+
+import time
+from collections import OrderedDict
+
+from src.leg_book import structure_key
+
+
+class MarginCache:
+    """
+    LRU + TTL cache of margin results.
+
+    Args:
+        maxsize: max number of structures kept
+        ttl: seconds an entry stays valid (None = no expiry)
+        spot_band: relative spot move that invalidates an entry
+        clock: time source in seconds (injectable for tests)
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 4096,
+        ttl: float = 60.0,
+        spot_band: float = 0.005,
+        clock=time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.spot_band = spot_band
+        self.clock = clock
+
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _fresh(self, entry, spot, equity) -> bool:
+        value, stored_at, stored_spot, stored_equity = entry
+
+        if self.ttl is not None and self.clock() - stored_at > self.ttl:
+            return False
+        if equity != stored_equity:
+            return False
+        if spot is not None and stored_spot is not None:
+            if abs(spot / stored_spot - 1.0) > self.spot_band:
+                return False
+        return True
+
+    def get(self, legs, spot=None, equity=None, underlying="", expiry=""):
+        """
+        Cached margin for legs, or None on a miss or stale entry.
+        """
+        key = structure_key(legs, underlying, expiry)
+        entry = self._entries.get(key)
+
+        if entry is None or not self._fresh(entry, spot, equity):
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, legs, value, spot=None, equity=None, underlying="", expiry=""):
+        key = structure_key(legs, underlying, expiry)
+
+        self._entries[key] = (value, self.clock(), spot, equity)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get_or_compute(
+        self, legs, compute, spot=None, equity=None, underlying="", expiry=""
+    ):
+        """
+        Returns the cached value, or compute() stored under legs.
+        """
+        value = self.get(legs, spot, equity, underlying, expiry)
+        if value is None:
+            value = compute()
+            self.put(legs, value, spot, equity, underlying, expiry)
+        return value
+
+    def clear(self):
+        self._entries.clear()
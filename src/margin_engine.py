@@ -1,21 +1,67 @@
+import asyncio
+
 from ib_insync import *
 
 class IBKRMarginEngine:
     """
     IBKR margin requirement for a list of option legs.
+
+    combo=False sums one single-leg what-if per leg (overstates
+    defined-risk spreads); combo=True prices the whole structure as
+    one BAG what-if, so spread offsets are recognised.
     """
 
-    def __init__(self, ib):
+    def __init__(self, ib, cache=None, combo=False, max_concurrency=8, timeout=10.0):
         self.ib = ib
+        self.cache = cache   # optional MarginCache
+        self.combo = combo
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+    @staticmethod
+    def _cache_args(contracts, qtys):
+        legs = [
+            {
+                "option_type": "call" if c.right == 'C' else "put",
+                "strike": c.strike,
+                "weight": qty,
+            }
+            for c, qty in zip(contracts, qtys)
+        ]
+        return legs, {
+            "underlying": contracts[0].symbol if contracts else "",
+            "expiry": contracts[0].lastTradeDateOrContractMonth if contracts else "",
+        }
 
-    def estimate_margin(self, contracts, qtys):
+    def estimate_margin(self, contracts, qtys, spot=None, equity=None):
         """
         contracts : list of IBKR Option contracts
         qtys      : list of signed quantities (negative = short)
+        spot      : underlying spot, for cache spot-band checks
+        equity    : account equity, cached results expire on change
 
         Returns:
             Estimated initial margin change in USD.
+
+        The combo what-if raises asyncio.TimeoutError after timeout.
         """
+        compute = (
+            (lambda: self.ib.run(asyncio.wait_for(
+                self.combo_margin_async(contracts, qtys), self.timeout
+            )))
+            if self.combo
+            else (lambda: self._whatif_margin(contracts, qtys))
+        )
+
+        if self.cache is None:
+            return compute()
+
+        legs, key = self._cache_args(contracts, qtys)
+        return self.cache.get_or_compute(
+            legs, compute, spot=spot, equity=equity, **key
+        )
+
+    def _whatif_margin(self, contracts, qtys):
         total_margin = 0.0
 
         for contract, qty in zip(contracts, qtys):
@@ -26,3 +72,118 @@ class IBKRMarginEngine:
             total_margin += whatif.initMarginChange
 
         return total_margin
+
+    def estimate_legs_margin(self, factory, legs, expiry, spot=None, equity=None):
+        """
+        factory : IBKRContractFactory
+        legs    : list of leg dicts or a single-structure LegBook
+        expiry  : 'YYYYMMDD'
+        """
+        contracts, qtys = factory.make_contracts(legs, expiry)
+        return self.estimate_margin(contracts, qtys, spot=spot, equity=equity)
+
+    # -------------------------------------------------
+    # Combo (BAG) what-if
+    # -------------------------------------------------
+
+    @staticmethod
+    def net_legs(contracts, qtys):
+        """
+        Nets quantities per conId (a butterfly's two body legs become
+        one leg of ratio 2); flat legs are dropped. Leg contracts must
+        be qualified (conId set).
+
+        Returns (contracts, qtys) in first-seen order.
+        """
+        netted = {}
+        first = {}
+        for c, qty in zip(contracts, qtys):
+            netted[c.conId] = netted.get(c.conId, 0) + qty
+            first.setdefault(c.conId, c)
+
+        kept = [con_id for con_id, qty in netted.items() if qty != 0]
+        return [first[i] for i in kept], [netted[i] for i in kept]
+
+    @staticmethod
+    def make_combo(contracts, qtys):
+        """
+        One BAG contract for the whole structure, bought once.
+        Leg contracts must be qualified (conId set); legs are netted
+        first, since a BAG cannot list the same conId twice.
+        """
+        contracts, qtys = IBKRMarginEngine.net_legs(contracts, qtys)
+        bag = Contract(
+            secType='BAG',
+            symbol=contracts[0].symbol,
+            exchange='SMART',
+            currency=contracts[0].currency or 'USD',
+            comboLegs=[
+                ComboLeg(
+                    conId=c.conId,
+                    ratio=abs(int(qty)),
+                    action='SELL' if qty < 0 else 'BUY',
+                    exchange=c.exchange or 'SMART',
+                )
+                for c, qty in zip(contracts, qtys)
+            ],
+        )
+        return bag, MarketOrder('BUY', 1)
+
+    async def combo_margin_async(self, contracts, qtys):
+        """
+        Initial margin change of the structure from one BAG what-if.
+        """
+        if any(not c.conId for c in contracts):
+            await self.ib.qualifyContractsAsync(*contracts)
+
+        bag, order = self.make_combo(contracts, qtys)
+        state = await self.ib.whatIfOrderAsync(bag, order)
+        return float(state.initMarginChange)
+
+    async def estimate_many_async(self, structures, spot=None, equity=None):
+        """
+        structures : list of (contracts, qtys)
+
+        Cache misses are queried concurrently as BAG what-ifs, at most
+        max_concurrency in flight, each bounded by timeout.
+
+        Returns:
+            list of margins (None where the query failed or timed out)
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        margins = [None] * len(structures)
+        pending = []
+
+        for i, (contracts, qtys) in enumerate(structures):
+            if self.cache is not None:
+                legs, key = self._cache_args(contracts, qtys)
+                margins[i] = self.cache.get(legs, spot, equity, **key)
+            if margins[i] is None:
+                pending.append(i)
+
+        async def query(i):
+            contracts, qtys = structures[i]
+            async with semaphore:
+                return await asyncio.wait_for(
+                    self.combo_margin_async(contracts, qtys), self.timeout
+                )
+
+        results = await asyncio.gather(
+            *(query(i) for i in pending), return_exceptions=True
+        )
+
+        for i, result in zip(pending, results):
+            if isinstance(result, Exception):
+                continue
+            margins[i] = result
+            if self.cache is not None:
+                legs, key = self._cache_args(*structures[i])
+                self.cache.put(legs, result, spot, equity, **key)
+
+        return margins
+
+    def estimate_many(self, structures, spot=None, equity=None):
+        """
+        Blocking wrapper around estimate_many_async.
+        """
+        return self.ib.run(self.estimate_many_async(structures, spot, equity))
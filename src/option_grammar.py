@@ -8,18 +8,49 @@ All structures are defined-risk by construction.
 
 import torch
 
+try:
+    from src.physics import CALL, PUT
+except ModuleNotFoundError:
+    from physics import CALL, PUT
+
 CONTRACT_MULT = 100
 
-def iron_condor(spot, center_offset, wing, width, size):
+# Leg layout shared by both grammars: long wing, short body x2, long wing
+GRAMMAR_WEIGHTS = (+1, -1, -1, +1)
+IRON_CONDOR_TYPES = (PUT, PUT, CALL, CALL)
+BUTTERFLY_TYPES = (CALL, CALL, CALL, CALL)
+
+
+def iron_condor_strikes(spot, center_offset, wing, width):
     """
-    K1 < K2 < K3 < K4
-    +1 long put, -1 short put, -1 short call, +1 long call
+    Tensor form of iron_condor: strikes [..., 4] = (K1, K2, K3, K4).
     """
     K2 = spot * torch.exp(center_offset - width/2)
     K3 = spot * torch.exp(center_offset + width/2)
     K1 = K2 * torch.exp(-wing)
     K4 = K3 * torch.exp( wing)
 
+    return torch.stack([K1, K2, K3, K4], dim=-1)
+
+
+def butterfly_strikes(spot, center_offset, wing):
+    """
+    Tensor form of butterfly: strikes [..., 4] = (K1, K2, K2, K3).
+    """
+    K2 = spot * torch.exp(center_offset)
+    K1 = K2 * torch.exp(-wing)
+    K3 = K2 * torch.exp( wing)
+
+    return torch.stack([K1, K2, K2, K3], dim=-1)
+
+
+def iron_condor(spot, center_offset, wing, width, size):
+    """
+    K1 < K2 < K3 < K4
+    +1 long put, -1 short put, -1 short call, +1 long call
+    """
+    K1, K2, K3, K4 = iron_condor_strikes(spot, center_offset, wing, width)
+
     return [
         {"option_type": "put",  "strike": float(K1), "weight": +size},
         {"option_type": "put",  "strike": float(K2), "weight": -size},
@@ -33,9 +64,7 @@ def butterfly(spot, center_offset, wing, size):
     +1 long, -2 short, +1 long (all same type)
     Implemented as 4 legs with duplicated shorts.
     """
-    K2 = spot * torch.exp(center_offset)
-    K1 = K2 * torch.exp(-wing)
-    K3 = K2 * torch.exp( wing)
+    K1, K2, _, K3 = butterfly_strikes(spot, center_offset, wing)
 
     return [
         {"option_type": "call", "strike": float(K1), "weight": +size},
@@ -0,0 +1,197 @@
+"""
+Exact terminal payoff geometry from breakpoints.
+
+Expiry payoffs of call/put portfolios are piecewise-linear with kinks
+only at the strikes, so max/min payoff, breakevens and tail slopes
+follow exactly from the sorted strikes instead of a sampled spot grid.
+Everything is batched over leading dimensions: legs are [..., L].
+"""
+
+import torch
+
+try:
+    from src.leg_book import canonicalize_batch
+except ModuleNotFoundError:
+    from leg_book import canonicalize_batch
+
+
+def payoff_breakpoints(
+    strikes: torch.Tensor,
+    option_types: torch.Tensor,
+    weights: torch.Tensor,
+) -> dict:
+    """
+    Breakpoint representation of terminal payoffs on spot in [0, inf).
+
+    Legs are netted with leg_book.canonicalize_batch first, so each
+    kink carries one netted weight.
+
+    Args:
+        strikes: Tensor of strikes [..., L]
+        option_types: Tensor of type codes (CALL/PUT), same shape as strikes
+        weights: Tensor of leg weights, same shape as strikes
+
+    Returns:
+        dict with
+            nodes:  [..., L + 1] spot 0 followed by the sorted strikes
+            values: [..., L + 1] payoff at each node
+            slopes: [..., L + 1] payoff slope to the right of each node
+                    (the last entry is the right tail slope)
+    """
+    dtype = strikes.dtype if strikes.is_floating_point() else torch.float32
+    strikes = strikes.to(dtype)
+    weights = weights.to(dtype)
+    strikes, option_types, weights, _ = canonicalize_batch(
+        strikes, option_types, weights
+    )
+    is_put = option_types < 0
+
+    # Each leg adds +w to the slope at its strike: calls go 0 -> w,
+    # puts go -w -> 0. Below every strike only the puts are live.
+    left_slope = -(weights * is_put).sum(dim=-1, keepdim=True)
+    value_at_zero = (weights * strikes * is_put).sum(dim=-1, keepdim=True)
+
+    sorted_strikes, order = torch.sort(strikes, dim=-1, stable=True)
+    sorted_weights = torch.gather(weights, -1, order)
+
+    nodes = torch.cat([torch.zeros_like(value_at_zero), sorted_strikes], dim=-1)
+    slopes = torch.cat(
+        [left_slope, left_slope + sorted_weights.cumsum(dim=-1)], dim=-1
+    )
+
+    # Integrate the slopes node to node
+    increments = slopes[..., :-1] * (nodes[..., 1:] - nodes[..., :-1])
+    values = torch.cat(
+        [value_at_zero, value_at_zero + increments.cumsum(dim=-1)], dim=-1
+    )
+
+    return {"nodes": nodes, "values": values, "slopes": slopes}
+
+
+def payoff_at(spot: torch.Tensor, breakpoints: dict) -> torch.Tensor:
+    """
+    Evaluates breakpoint payoffs at arbitrary spots.
+
+    Args:
+        spot: Tensor of spot prices [N] or per-structure [..., N]
+        breakpoints: output of payoff_breakpoints
+
+    Returns:
+        Tensor of payoffs [..., N]
+    """
+    nodes = breakpoints["nodes"]
+    batch = torch.broadcast_shapes(nodes.shape[:-1], spot.shape[:-1])
+
+    nodes = nodes.expand(*batch, nodes.shape[-1]).contiguous()
+    spot = spot.to(nodes.dtype).expand(*batch, spot.shape[-1]).contiguous()
+
+    idx = (torch.searchsorted(nodes, spot, right=True) - 1).clamp(min=0)
+
+    def take(x):
+        return torch.gather(x.expand(*batch, x.shape[-1]), -1, idx)
+
+    return take(breakpoints["values"]) + take(breakpoints["slopes"]) * (
+        spot - take(nodes)
+    )
+
+
+def payoff_extremes(breakpoints: dict):
+    """
+    Exact min and max terminal payoff over spot in [0, inf).
+
+    An unbounded right tail gives -inf / +inf.
+
+    Returns:
+        (min_payoff [...], max_payoff [...])
+    """
+    values = breakpoints["values"]
+    tail = breakpoints["slopes"][..., -1]
+
+    min_payoff = values.min(dim=-1).values
+    max_payoff = values.max(dim=-1).values
+
+    inf = torch.tensor(float("inf"), dtype=values.dtype, device=values.device)
+    min_payoff = torch.where(tail < 0, -inf, min_payoff)
+    max_payoff = torch.where(tail > 0, inf, max_payoff)
+
+    return min_payoff, max_payoff
+
+
+def tail_slopes(breakpoints: dict):
+    """
+    Payoff slopes below the lowest and above the highest strike.
+
+    Returns:
+        (left_slope [...], right_slope [...])
+    """
+    slopes = breakpoints["slopes"]
+    return slopes[..., 0], slopes[..., -1]
+
+
+def breakevens(breakpoints: dict) -> torch.Tensor:
+    """
+    Spots where the terminal payoff crosses or leaves zero.
+
+    Flat zero segments contribute their endpoints, e.g. the short
+    strikes of an iron condor before premium.
+
+    Returns:
+        Tensor [..., L + 1] of ascending breakevens, padded with NaN
+    """
+    nodes = breakpoints["nodes"]
+    values = breakpoints["values"]
+    slopes = breakpoints["slopes"]
+
+    sloped = slopes != 0
+    root = nodes - values / torch.where(sloped, slopes, torch.ones_like(slopes))
+
+    # Segment i covers (nodes[i], nodes[i + 1]]; the last runs to
+    # infinity. A root on nodes[i] itself belongs to segment i only if
+    # nothing sloped ends there, i.e. at spot 0 or after a flat segment.
+    upper = torch.cat(
+        [nodes[..., 1:], torch.full_like(nodes[..., :1], float("inf"))], dim=-1
+    )
+    owns_node = torch.cat(
+        [torch.ones_like(sloped[..., :1]), ~sloped[..., :-1]], dim=-1
+    )
+    # Cumulative values carry rounding noise; compare within a tolerance
+    tol = 64 * torch.finfo(nodes.dtype).eps * (nodes[..., -1:].abs() + 1.0)
+    at_node = (root - nodes).abs() <= tol
+    lower_ok = (root > nodes + tol) | (owns_node & at_node)
+
+    valid = sloped & lower_ok & (root <= upper + tol)
+    root = torch.where(at_node, nodes, torch.minimum(root, upper))
+    roots = torch.where(valid, root, torch.full_like(root, float("nan")))
+
+    return torch.sort(roots, dim=-1).values
+
+
+def payoff_geometry(
+    strikes: torch.Tensor,
+    option_types: torch.Tensor,
+    weights: torch.Tensor,
+) -> dict:
+    """
+    Exact payoff summary for one or many structures.
+
+    Args:
+        strikes: Tensor of strikes [..., L]
+        option_types: Tensor of type codes (CALL/PUT), same shape as strikes
+        weights: Tensor of leg weights, same shape as strikes
+
+    Returns:
+        dict with max_loss (= -min payoff), max_gain, left_slope,
+        right_slope [...] and breakevens [..., L + 1] (NaN padded)
+    """
+    breakpoints = payoff_breakpoints(strikes, option_types, weights)
+
+    min_payoff, max_payoff = payoff_extremes(breakpoints)
+    left_slope, right_slope = tail_slopes(breakpoints)
+
+    return {
+        "max_loss": -min_payoff,
+        "max_gain": max_payoff,
+        "left_slope": left_slope,
+        "right_slope": right_slope,
+        "breakevens": breakevens(breakpoints),
+    }
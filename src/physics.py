@@ -6,7 +6,237 @@ Greeks will be added later via autograd.
 """
 
 import torch
-from torch.distributions.normal import Normal
+
+try:
+    from src import leg_book
+    from src.real_vol import smile_vol
+except ModuleNotFoundError:
+    import leg_book
+    from real_vol import smile_vol
+
+
+# Option type codes used by the tensor kernels: the sign of the payoff.
+CALL = 1
+PUT = -1
+
+OPTION_TYPE_CODES = {"call": CALL, "put": PUT}
+OPTION_TYPE_NAMES = {CALL: "call", PUT: "put"}
+
+
+def encode_option_types(option_types) -> torch.Tensor:
+    """
+    Maps "call"/"put" labels to integer type codes.
+
+    Args:
+        option_types: iterable of "call" or "put"
+
+    Returns:
+        Tensor of type codes [L] (CALL=+1, PUT=-1)
+    """
+    codes = []
+    for t in option_types:
+        if t not in OPTION_TYPE_CODES:
+            raise ValueError("option_type must be 'call' or 'put'")
+        codes.append(OPTION_TYPE_CODES[t])
+    return torch.tensor(codes, dtype=torch.int8)
+
+
+def _stack_values(values, dtype, device) -> torch.Tensor:
+    if any(torch.is_tensor(v) for v in values):
+        return torch.stack([
+            torch.as_tensor(v, dtype=dtype, device=device).reshape(())
+            for v in values
+        ])
+    return torch.tensor(values, dtype=dtype, device=device)
+
+
+def legs_to_tensors(
+    legs: list,
+    dtype: torch.dtype = torch.float32,
+    device=None,
+):
+    """
+    Unpacks a list of leg dicts into tensors.
+
+    Leg lists are canonicalized first (leg_book.canonicalize_legs), so
+    duplicate legs are priced once and flat legs not at all.
+
+    Args:
+        legs: list of dicts, each with keys:
+              {"option_type", "strike", "weight"}
+              or a LegBook (read straight from its arrays)
+
+    Returns:
+        (strikes [L], option_types [L], weights [L]);
+        [B, L_max] for multi-structure LegBooks
+    """
+    if hasattr(legs, "as_tensors"):
+        strikes, option_types, weights = legs.as_tensors()
+        return (
+            strikes.to(dtype=dtype, device=device),
+            option_types.to(device=device),
+            weights.to(dtype=dtype, device=device),
+        )
+
+    legs = leg_book.canonicalize_legs(legs)
+    strikes = _stack_values([leg["strike"] for leg in legs], dtype, device)
+    weights = _stack_values([leg["weight"] for leg in legs], dtype, device)
+    option_types = encode_option_types(
+        [leg["option_type"] for leg in legs]
+    ).to(device)
+    return strikes, option_types, weights
+
+
+def resolve_leg_vol(
+    strikes: torch.Tensor,
+    vol,
+    k_grid: torch.Tensor = None,
+    vol_grid: torch.Tensor = None,
+    ref_spot: float = None,
+):
+    """
+    Returns the vol to price each leg with.
+
+    Flat mode returns vol unchanged. Smile mode (vol_grid given)
+    interpolates a resampled surface at each leg's strike.
+    """
+    if vol_grid is None:
+        return vol
+    if k_grid is None or ref_spot is None:
+        raise ValueError("smile pricing needs k_grid, vol_grid and ref_spot")
+
+    return smile_vol(strikes, ref_spot, k_grid, vol_grid)
+
+
+def bs_d1_d2(
+    spot: torch.Tensor,
+    strikes: torch.Tensor,
+    vol,
+    maturity,
+    rate=0.0,
+):
+    """
+    Shared Black–Scholes terms for every leg against every spot.
+
+    Args:
+        spot: Tensor of spot prices [N] (or [..., N])
+        strikes: Tensor of strikes [L] or [B, L]
+        vol: Implied volatility, scalar or per-leg tensor shaped like strikes
+        maturity: Time to maturity (years)
+        rate: Risk-free rate
+
+    Returns:
+        dict with broadcast tensors [..., L, N] (or broadcastable to it):
+            spot, strike, vol, maturity, rate, sqrt_t, discount, d1, d2
+    """
+    eps = 1e-8
+    dtype, device = spot.dtype, spot.device
+
+    maturity = torch.as_tensor(maturity, dtype=dtype, device=device)
+    rate = torch.as_tensor(rate, dtype=dtype, device=device)
+    vol = torch.as_tensor(vol, dtype=dtype, device=device)
+    if vol.ndim > 0:
+        vol = vol.unsqueeze(-1)
+
+    strike = strikes.to(dtype).unsqueeze(-1)
+    spot = spot.unsqueeze(-2)
+
+    sqrt_t = torch.sqrt(maturity)
+    vol_sqrt_t = vol * sqrt_t
+
+    d1 = (
+        torch.log(spot / strike)
+        + (rate + 0.5 * vol ** 2) * maturity
+    ) / (vol_sqrt_t + eps)
+
+    d2 = d1 - vol_sqrt_t
+
+    return {
+        "spot": spot,
+        "strike": strike,
+        "vol": vol,
+        "maturity": maturity,
+        "rate": rate,
+        "sqrt_t": sqrt_t,
+        "discount": torch.exp(-rate * maturity),
+        "d1": d1,
+        "d2": d2,
+    }
+
+
+def bs_leg_prices(
+    spot: torch.Tensor,
+    strikes: torch.Tensor,
+    option_types: torch.Tensor,
+    vol,
+    maturity,
+    rate=0.0,
+) -> torch.Tensor:
+    """
+    Black–Scholes prices of every leg against every spot in one pass.
+
+    Args:
+        spot: Tensor of spot prices [N] (or [..., N])
+        strikes: Tensor of strikes [L] or [B, L]
+        option_types: Tensor of type codes (CALL/PUT), same shape as strikes
+        vol: Implied volatility, scalar or per-leg tensor shaped like strikes
+        maturity: Time to maturity (years)
+        rate: Risk-free rate
+
+    Returns:
+        Tensor of unit leg prices [L, N] or [B, L, N]
+    """
+    bs = bs_d1_d2(spot, strikes, vol, maturity, rate)
+    phi = option_types.to(spot.dtype).unsqueeze(-1)
+
+    # phi = +1: S N(d1) - K D N(d2);  phi = -1: K D N(-d2) - S N(-d1)
+    return phi * (
+        bs["spot"] * torch.special.ndtr(phi * bs["d1"])
+        - bs["strike"] * bs["discount"] * torch.special.ndtr(phi * bs["d2"])
+    )
+
+
+def price_legs(
+    spot: torch.Tensor,
+    strikes: torch.Tensor,
+    option_types: torch.Tensor,
+    weights: torch.Tensor,
+    vol,
+    maturity,
+    rate=0.0,
+    k_grid: torch.Tensor = None,
+    vol_grid: torch.Tensor = None,
+    ref_spot: float = None,
+) -> torch.Tensor:
+    """
+    Prices one or many multi-leg portfolios from leg tensors.
+
+    Args:
+        spot: Tensor of spot prices [N]
+        strikes: Tensor of strikes [L] or [B, L]
+        option_types: Tensor of type codes (CALL/PUT), same shape as strikes
+        weights: Tensor of leg weights, same shape as strikes
+        vol: Implied volatility, scalar or per-leg tensor shaped like strikes
+             (ignored in smile mode)
+        maturity: Time to maturity
+        rate: Risk-free rate
+        k_grid: log-moneyness grid [K] (smile mode)
+        vol_grid: resampled vol on k_grid, [K] or [B, K] (smile mode)
+        ref_spot: spot the smile was resampled against (smile mode)
+
+    Returns:
+        Tensor of portfolio prices [N] or [B, N]
+    """
+    leg_prices = bs_leg_prices(
+        spot=spot,
+        strikes=strikes,
+        option_types=option_types,
+        vol=resolve_leg_vol(strikes, vol, k_grid, vol_grid, ref_spot),
+        maturity=maturity,
+        rate=rate,
+    )
+    weights = weights.to(leg_prices.dtype).unsqueeze(-1)
+    return (weights * leg_prices).sum(dim=-2)
 
 
 def bs_price(
@@ -16,6 +246,9 @@ def bs_price(
     maturity: float,
     option_type: str,
     rate: float = 0.0,
+    k_grid: torch.Tensor = None,
+    vol_grid: torch.Tensor = None,
+    ref_spot: float = None,
 ) -> torch.Tensor:
     """
     Black–Scholes option price (call or put).
@@ -23,37 +256,30 @@ def bs_price(
     Args:
         spot: Tensor of spot prices [N]
         strike: Strike price
-        vol: Implied volatility (scalar)
+        vol: Implied volatility (scalar, ignored in smile mode)
         maturity: Time to maturity (years)
         option_type: "call" or "put"
         rate: Risk-free rate
+        k_grid: log-moneyness grid [K] (smile mode)
+        vol_grid: resampled vol on k_grid [K] (smile mode)
+        ref_spot: spot the smile was resampled against (smile mode)
 
     Returns:
         Tensor of option prices [N]
     """
-    if option_type not in {"call", "put"}:
-        raise ValueError("option_type must be 'call' or 'put'")
-
-    eps = 1e-8
-    sqrt_t = torch.sqrt(torch.tensor(maturity))
-
-    d1 = (
-        torch.log(spot / strike)
-        + (rate + 0.5 * vol ** 2) * maturity
-    ) / (vol * sqrt_t + eps)
-
-    d2 = d1 - vol * sqrt_t
-
-    normal = Normal(0.0, 1.0)
-
-    discount = torch.exp(torch.tensor(-rate * maturity))
-
-    if option_type == "call":
-        price = spot * normal.cdf(d1) - strike * discount * normal.cdf(d2)
-    else:
-        price = strike * discount * normal.cdf(-d2) - spot * normal.cdf(-d1)
-
-    return price
+    option_types = encode_option_types([option_type]).to(spot.device)
+    strikes = torch.as_tensor(
+        strike, dtype=spot.dtype, device=spot.device
+    ).reshape(1)
+
+    return bs_leg_prices(
+        spot=spot,
+        strikes=strikes,
+        option_types=option_types,
+        vol=resolve_leg_vol(strikes, vol, k_grid, vol_grid, ref_spot),
+        maturity=maturity,
+        rate=rate,
+    )[0]
 
 def price_portfolio(
     spot: torch.Tensor,
@@ -61,6 +287,9 @@ def price_portfolio(
     vol: float,
     maturity: float,
     rate: float = 0.0,
+    k_grid: torch.Tensor = None,
+    vol_grid: torch.Tensor = None,
+    ref_spot: float = None,
 ) -> torch.Tensor:
     """
     Prices a multi-leg option portfolio.
@@ -69,28 +298,32 @@ def price_portfolio(
         spot: Tensor of spot prices [N]
         legs: list of dicts, each with keys:
               {"option_type", "strike", "weight"}
-        vol: Implied volatility (scalar)
+        vol: Implied volatility (scalar, ignored in smile mode)
         maturity: Time to maturity
         rate: Risk-free rate
+        k_grid: log-moneyness grid [K] (smile mode)
+        vol_grid: resampled vol on k_grid [K] (smile mode)
+        ref_spot: spot the smile was resampled against (smile mode)
 
     Returns:
         Tensor of portfolio prices [N]
     """
-    portfolio_price = torch.zeros_like(spot)
-
-    for leg in legs:
-        leg_price = bs_price(
-            spot=spot,
-            strike=leg["strike"],
-            vol=vol,
-            maturity=maturity,
-            option_type=leg["option_type"],
-            rate=rate,
-        )
-
-        portfolio_price += leg["weight"] * leg_price
+    strikes, option_types, weights = legs_to_tensors(
+        legs, dtype=spot.dtype, device=spot.device
+    )
 
-    return portfolio_price
+    return price_legs(
+        spot=spot,
+        strikes=strikes,
+        option_types=option_types,
+        weights=weights,
+        vol=vol,
+        maturity=maturity,
+        rate=rate,
+        k_grid=k_grid,
+        vol_grid=vol_grid,
+        ref_spot=ref_spot,
+    )
 
 def portfolio_delta(
     spot: torch.Tensor,
@@ -184,6 +417,32 @@ def terminal_leg_payoff(
         raise ValueError("option_type must be 'call' or 'put'")
 
 
+def terminal_payoff_legs(
+    spot: torch.Tensor,
+    strikes: torch.Tensor,
+    option_types: torch.Tensor,
+    weights: torch.Tensor,
+) -> torch.Tensor:
+    """
+    Terminal payoff of one or many portfolios from leg tensors.
+
+    Args:
+        spot: Tensor of spot prices [N], or per-structure [..., N]
+        strikes: Tensor of strikes [L] or [..., L]
+        option_types: Tensor of type codes (CALL/PUT), same shape as strikes
+        weights: Tensor of leg weights, same shape as strikes
+
+    Returns:
+        Tensor of payoffs [..., N]
+    """
+    phi = option_types.to(spot.dtype).unsqueeze(-1)
+    strike = strikes.to(spot.dtype).unsqueeze(-1)
+    weight = weights.to(spot.dtype).unsqueeze(-1)
+
+    leg_payoffs = torch.relu(phi * (spot.unsqueeze(-2) - strike))
+    return (weight * leg_payoffs).sum(dim=-2)
+
+
 def terminal_portfolio_payoff(
     spot: torch.Tensor,
     legs: list,
@@ -191,15 +450,8 @@ def terminal_portfolio_payoff(
     """
     Terminal payoff of a multi-leg option portfolio.
     """
-    payoff = torch.zeros_like(spot)
-
-    for leg in legs:
-        leg_payoff = terminal_leg_payoff(
-            spot=spot,
-            option_type=leg["option_type"],
-            strike=leg["strike"],
-        )
-        payoff += leg["weight"] * leg_payoff
-
-    return payoff
+    strikes, option_types, weights = legs_to_tensors(
+        legs, dtype=spot.dtype, device=spot.device
+    )
 
+    return terminal_payoff_legs(spot, strikes, option_types, weights)
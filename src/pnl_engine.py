@@ -1,3 +1,8 @@
+import numpy as np
+
+from src.leg_book import LegBook
+
+
 def option_payoff(spot, strike, option_type):
     if option_type == "call":
         return max(spot - strike, 0)
@@ -6,8 +11,24 @@ def option_payoff(spot, strike, option_type):
 
 
 def portfolio_payoff(spot, legs):
+    if isinstance(legs, LegBook):
+        return book_payoff(spot, legs)
+
     total = 0.0
     for leg in legs:
         px = option_payoff(spot, leg["strike"], leg["option_type"])
         total += px * leg["weight"] * 100   # SPX multiplier
     return total
+
+
+def book_payoff(spot, book):
+    """
+    Expiry payoff of a LegBook at one spot, straight from its arrays.
+    Returns a float for single-structure books, else one value per structure.
+    """
+    leg_px = np.maximum(book.option_types * (spot - book.strikes), 0.0)
+    leg_pnl = leg_px * book.weights * 100   # SPX multiplier
+
+    if len(book) == 1:
+        return float(leg_pnl.sum())
+    return np.bincount(book.structure_ids, weights=leg_pnl, minlength=len(book))
@@ -1,10 +1,45 @@
 import torch
 import torch.nn as nn
-from src.option_grammar import iron_condor, butterfly
-from src.capital_physics import capital_feasible
+
+try:
+    from src.option_grammar import (
+        GRAMMAR_WEIGHTS,
+        IRON_CONDOR_TYPES,
+        BUTTERFLY_TYPES,
+        iron_condor_strikes,
+        butterfly_strikes,
+    )
+    from src.physics import OPTION_TYPE_NAMES
+    from src.capital_physics import capital_feasible
+except ModuleNotFoundError:
+    from option_grammar import (
+        GRAMMAR_WEIGHTS,
+        IRON_CONDOR_TYPES,
+        BUTTERFLY_TYPES,
+        iron_condor_strikes,
+        butterfly_strikes,
+    )
+    from physics import OPTION_TYPE_NAMES
+    from capital_physics import capital_feasible
 
 ACCOUNT_EQUITY = 25_000.0
 
+# Checkpoint format 2: forward squashes center / wing / width into the
+# decode bounds. Format 1 (a bare generator state_dict) was trained on
+# raw outputs cut by the decode clamps; its weights decode to different
+# structures under the squashed forward.
+CHECKPOINT_FORMAT = 2
+
+# Ultra-tight 25k retail bounds (guarantees feasibility)
+CENTER_BOUNDS = (-0.01, 0.01)
+WING_BOUNDS = (0.005, 0.01)
+WIDTH_BOUNDS = (0.005, 0.01)
+
+
+def _squash(x, lo, hi):
+    # Smooth map onto the open interval (lo, hi); gradient never vanishes
+    return (hi + lo) / 2 + (hi - lo) / 2 * torch.tanh(x)
+
 
 class PortfolioGenerator(nn.Module):
     def __init__(self, latent_dim, hidden_dim=64):
@@ -18,31 +53,123 @@ class PortfolioGenerator(nn.Module):
         )
 
     def forward(self, z):
-        return self.net(z)
+        """
+        Returns params [..., 5] with center, wing and width squashed
+        inside the decode bounds, so the decode clamps are no-ops on
+        generator output and never cut the gradient.
+        """
+        type_logit, center, wing, width, size = self.net(z).unbind(-1)
+        return torch.stack([
+            type_logit,
+            _squash(center, *CENTER_BOUNDS),
+            _squash(wing, *WING_BOUNDS),
+            _squash(width, *WIDTH_BOUNDS),
+            size,
+        ], dim=-1)
 
 
-def decode_portfolio_tensor(params, spot):
-    type_logit, center, wing, width, size = params
+def save_checkpoint(path, generator, **modules):
+    """
+    Saves the generator state (plus any extra modules by name) under
+    the current CHECKPOINT_FORMAT tag.
+    """
+    checkpoint = {"format": CHECKPOINT_FORMAT, "generator": generator.state_dict()}
+    checkpoint.update((name, m.state_dict()) for name, m in modules.items())
+    torch.save(checkpoint, path)
+
+
+def load_checkpoint(path):
+    """
+    Loads a save_checkpoint dict; raises ValueError for any other
+    format. Format 1 checkpoints cannot be converted (see
+    CHECKPOINT_FORMAT) and must be retrained with train.py.
+    """
+    checkpoint = torch.load(path, map_location="cpu")
+    found = checkpoint.get("format", 1) if isinstance(checkpoint, dict) else None
+    if found != CHECKPOINT_FORMAT:
+        raise ValueError(
+            f"{path}: checkpoint format {found}, expected {CHECKPOINT_FORMAT}; "
+            "retrain with train.py"
+        )
+    return checkpoint
+
+
+def decode_portfolio_batch(params, spot, round_strikes=True):
+    """
+    Decodes generator outputs into a fixed-shape leg book.
+
+    params: [B, 5] (type_logit, center, wing, width, size)
+    spot:   float or Tensor [B]
+
+    Returns (strikes [B, 4], option_types [B, 4], weights [B, 4]).
+    Grammar choice is a torch.where on type_logit > 0 (iron condor)
+    vs butterfly. With round_strikes=False strikes stay differentiable
+    (PortfolioGenerator output is already inside the clamps).
+    """
+    type_logit, center, wing, width, size = params.unbind(-1)
+    spot = torch.as_tensor(spot, dtype=params.dtype, device=params.device)
 
     # Ultra-tight 25k retail clamps (guarantees feasibility)
-    center = torch.clamp(center, -0.01, 0.01)
-    wing   = torch.clamp(torch.abs(wing), 0.005, 0.01)
-    width  = torch.clamp(torch.abs(width), 0.005, 0.01)
-    size   = torch.tensor(1)
+    center = torch.clamp(center, *CENTER_BOUNDS)
+    wing   = torch.clamp(torch.abs(wing), *WING_BOUNDS)
+    width  = torch.clamp(torch.abs(width), *WIDTH_BOUNDS)
+
+    is_condor = (type_logit > 0).unsqueeze(-1)
+
+    strikes = torch.where(
+        is_condor,
+        iron_condor_strikes(spot, center, wing, width),
+        butterfly_strikes(spot, center, wing),
+    )
+    if round_strikes:
+        strikes = (
+            torch.round(strikes.detach().double() * 100.0) / 100.0
+        ).to(params.dtype)
+
+    option_types = torch.where(
+        is_condor,
+        torch.tensor(IRON_CONDOR_TYPES, dtype=torch.int8, device=params.device),
+        torch.tensor(BUTTERFLY_TYPES, dtype=torch.int8, device=params.device),
+    )
 
-    if type_logit > 0:
-        legs = iron_condor(spot, center, wing, width, 1)
-    else:
-        legs = butterfly(spot, center, wing, 1)
+    # Fixed unit size
+    weights = torch.tensor(
+        GRAMMAR_WEIGHTS, dtype=params.dtype, device=params.device
+    ).expand_as(strikes)
 
-    for leg in legs:
-        leg["strike"] = round(float(torch.tensor(leg["strike"]).detach()), 2)
+    return strikes, option_types, weights
 
-    return legs
+
+def legs_from_batch(strikes, option_types, weights):
+    """
+    Converts a [B, L] leg book into per-structure lists of leg dicts.
+    """
+    return [
+        [
+            {
+                "option_type": OPTION_TYPE_NAMES[t],
+                "strike": round(k, 2),
+                "weight": int(w) if float(w).is_integer() else w,
+            }
+            for k, t, w in zip(row_k, row_t, row_w)
+        ]
+        for row_k, row_t, row_w in zip(
+            strikes.detach().tolist(),
+            option_types.tolist(),
+            weights.detach().tolist(),
+        )
+    ]
+
+
+def decode_portfolio_tensor(params, spot):
+    strikes, option_types, weights = decode_portfolio_batch(
+        params.unsqueeze(0), spot, round_strikes=False
+    )
+    return legs_from_batch(strikes, option_types, weights)[0]
 
 
-def capital_filter(legs, spot):
-    feasible, used = capital_feasible(legs, spot)
+def capital_filter(legs, spot, cache=None):
+    feasible, used = capital_feasible(legs, spot, cache=cache)
 
     class Account:
         def __init__(self, used):
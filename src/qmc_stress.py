@@ -0,0 +1,305 @@
+"""
+Quasi-Monte Carlo stress scenarios.
+
+Joint spot / vol / skew shocks are drawn from a scrambled Sobol
+sequence, mapped through a Gaussian copula onto configurable
+marginals, and evaluated chunk by chunk (optionally across a
+process pool) into the streaming CVaR / worst-case aggregators.
+"""
+
+import math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import torch
+from torch.quasirandom import SobolEngine
+
+from src.physics import bs_leg_prices, terminal_payoff_legs
+from src.stress_engine import (
+    spot_shock,
+    vol_level_shift,
+    MAX_EXACT_K,
+    StreamingCVaR,
+    RunningCVaR,
+    StreamingWorstCase,
+)
+
+STRESS_FACTORS = ("spot", "vol", "skew")
+
+
+# -------------------------------------------------
+# Marginals (inverse CDFs of a standard uniform),
+# scaled to zero mean and unit variance
+# -------------------------------------------------
+
+def _normal_icdf(u):
+    return torch.special.ndtri(u)
+
+
+def _laplace_icdf(u):
+    # Scale 1 / sqrt(2): variance 2 b^2 = 1
+    return -torch.sign(u - 0.5) * torch.log1p(-2.0 * (u - 0.5).abs()) / math.sqrt(2.0)
+
+
+def _logistic_icdf(u):
+    # Scale sqrt(3) / pi: variance s^2 pi^2 / 3 = 1
+    return (torch.log(u) - torch.log1p(-u)) * math.sqrt(3.0) / math.pi
+
+
+MARGINALS = {
+    "normal": _normal_icdf,
+    "laplace": _laplace_icdf,
+    "logistic": _logistic_icdf,
+}
+
+
+class QMCScenarioGenerator:
+    """
+    Low-discrepancy joint (spot, vol, skew) shock generator.
+
+    Draws are a deterministic function of (seed, index), so any chunk
+    of the sequence can be regenerated independently by a worker.
+
+    Args:
+        scale: shock standard deviation per factor (spot fraction,
+               vol points, skew); every marginal has unit variance
+        loc: shock location per factor
+        marginals: marginal name per factor ("normal", "laplace", "logistic")
+        correlation: [3, 3] Gaussian copula correlation (default: identity)
+        seed: Sobol scrambling seed
+    """
+
+    def __init__(
+        self,
+        scale=(0.05, 0.03, 0.02),
+        loc=(0.0, 0.0, 0.0),
+        marginals=("normal", "normal", "normal"),
+        correlation=None,
+        seed: int = 0,
+    ):
+        for name in marginals:
+            if name not in MARGINALS:
+                raise ValueError(f"unknown marginal '{name}'")
+        if not len(scale) == len(loc) == len(marginals) == len(STRESS_FACTORS):
+            raise ValueError("scale, loc and marginals need one entry per factor")
+
+        if correlation is None:
+            correlation = torch.eye(len(STRESS_FACTORS), dtype=torch.float64)
+        correlation = torch.as_tensor(correlation, dtype=torch.float64)
+
+        self.scale = torch.tensor(scale, dtype=torch.float64)
+        self.loc = torch.tensor(loc, dtype=torch.float64)
+        self.marginals = tuple(marginals)
+        self.chol = torch.linalg.cholesky(correlation)
+        self.seed = seed
+
+    def uniforms(self, n: int, start: int = 0) -> torch.Tensor:
+        """
+        Sobol points [n, 3] with index range [start, start + n).
+        """
+        engine = SobolEngine(
+            len(STRESS_FACTORS), scramble=True, seed=self.seed
+        )
+        if start:
+            engine.fast_forward(start)
+        u = engine.draw(n, dtype=torch.float64)
+        eps = torch.finfo(u.dtype).eps
+        return u.clamp(eps, 1.0 - eps)
+
+    def draw(self, n: int, start: int = 0) -> dict:
+        """
+        Returns:
+            dict of shocks [n] keyed by STRESS_FACTORS
+        """
+        # Gaussian copula: correlate in normal space, map back to uniforms
+        z = torch.special.ndtri(self.uniforms(n, start)) @ self.chol.T
+        u = torch.special.ndtr(z)
+
+        shocks = torch.stack([
+            MARGINALS[name](u[:, i]) for i, name in enumerate(self.marginals)
+        ], dim=-1)
+        shocks = self.loc + self.scale * shocks
+
+        return dict(zip(STRESS_FACTORS, shocks.unbind(dim=-1)))
+
+
+def qmc_scenario_values(
+    spot: torch.Tensor,
+    strikes: torch.Tensor,
+    option_types: torch.Tensor,
+    weights: torch.Tensor,
+    shocks: dict,
+    vol=None,
+    maturity=None,
+    rate=0.0,
+    ref_spot: float = None,
+) -> torch.Tensor:
+    """
+    Portfolio values under paired (spot, vol, skew) scenarios.
+
+    Unlike scenario_cube, scenario i applies the i-th shock of every
+    factor together. Terminal mode (vol=None) uses the spot shocks only.
+    Skew shocks tilt vol by skew * log(K / ref_spot) (sticky strike).
+
+    Args:
+        spot: Tensor of spot prices [N] or per-structure [B, N]
+        strikes: Tensor of strikes [L] or [B, L]
+        option_types: Tensor of type codes (CALL/PUT), same shape as strikes
+        weights: Tensor of leg weights, same shape as strikes
+        shocks: output of QMCScenarioGenerator.draw, each [S]
+        vol: Implied volatility, scalar or per-leg tensor shaped like strikes
+        maturity: Time to maturity (years)
+        rate: Risk-free rate
+        ref_spot: spot the skew tilt is centred on (pricing mode)
+
+    Returns:
+        Tensor of scenario values [S, N] or [B, S, N]
+    """
+    spot_shocks = shocks["spot"].to(dtype=spot.dtype, device=spot.device)
+    spot_s = spot_shock(
+        spot.unsqueeze(-2), spot_shocks.clamp(min=-0.99).unsqueeze(-1)
+    )
+
+    if vol is None:
+        return terminal_payoff_legs(
+            spot_s,
+            strikes.unsqueeze(-2),
+            option_types.unsqueeze(-2),
+            weights.unsqueeze(-2),
+        )
+
+    if maturity is None or ref_spot is None:
+        raise ValueError("pricing mode needs vol, maturity and ref_spot")
+
+    vol_shifts = shocks["vol"].to(dtype=spot.dtype, device=spot.device)
+    skew_shifts = shocks["skew"].to(dtype=spot.dtype, device=spot.device)
+
+    strikes = strikes.to(spot.dtype).unsqueeze(-2)
+    vol = torch.as_tensor(vol, dtype=spot.dtype, device=spot.device)
+    if vol.ndim > 0:
+        vol = vol.unsqueeze(-2)
+
+    # Per-scenario, per-leg vol: [..., S, L]
+    leg_vol = vol_level_shift(
+        vol,
+        vol_shifts.unsqueeze(-1)
+        + skew_shifts.unsqueeze(-1) * torch.log(strikes / ref_spot),
+    )
+
+    leg_prices = bs_leg_prices(
+        spot=spot_s,
+        strikes=strikes,
+        option_types=option_types.unsqueeze(-2),
+        vol=leg_vol,
+        maturity=maturity,
+        rate=rate,
+    )
+    weights = weights.to(leg_prices.dtype).unsqueeze(-2).unsqueeze(-1)
+    return (weights * leg_prices).sum(dim=-2)
+
+
+# (generator, portfolio, pricing, q, k) in a pool worker, sent once by
+# the pool initializer rather than pickled with every chunk
+_worker_state = None
+
+
+def _init_worker(state):
+    global _worker_state
+    # One BLAS thread per process; the pool provides the parallelism
+    torch.set_num_threads(1)
+    _worker_state = state
+
+
+def _evaluate_chunk(state, start, n):
+    generator, portfolio, pricing, q, k = state
+
+    shocks = generator.draw(n, start)
+    values = qmc_scenario_values(*portfolio, shocks, **pricing)
+
+    # Exact: the chunk's min(k, chunk points) worst values (k was
+    # checked against max_k by the caller)
+    cvar = RunningCVaR(q) if k is None else StreamingCVaR(k=k, max_k=None)
+    return cvar.update(values), StreamingWorstCase().update(values)
+
+
+def _evaluate_worker_chunk(task):
+    return _evaluate_chunk(_worker_state, *task)
+
+
+def run_qmc_stress(
+    spot: torch.Tensor,
+    strikes: torch.Tensor,
+    option_types: torch.Tensor,
+    weights: torch.Tensor,
+    generator: QMCScenarioGenerator,
+    n_scenarios: int,
+    q: float = 0.1,
+    chunk_size: int = 1024,
+    workers: int = 0,
+    vol=None,
+    maturity=None,
+    rate=0.0,
+    ref_spot: float = None,
+    mp_context=None,
+    exact: bool = False,
+    max_k: int = MAX_EXACT_K,
+) -> dict:
+    """
+    Streams n_scenarios QMC scenarios through fixed-size chunks.
+
+    Chunks are evaluated in-process (workers=0) or on a process pool.
+    Pool workers receive the generator and portfolio once, through the
+    pool initializer; tasks are just (start, n) and at most
+    2 x workers chunks are in flight at a time. Chunk results are
+    merged in sequence order, so results do not depend on the worker
+    count.
+
+    CVaR reduces into RunningCVaR by default: fixed memory, approximate
+    CVaR. exact=True reduces into StreamingCVaR instead: each chunk
+    sends back its min(k, chunk points) worst values,
+    k = q * n_scenarios * N, and the merged buffer holds k values per
+    structure, so memory grows with n_scenarios; k above max_k raises
+    ValueError before any chunk is evaluated.
+
+    Returns:
+        dict with cvar and worst, scalar or [B] per structure
+    """
+    n_points = spot.shape[-1]
+    k = max(1, int(q * n_scenarios * n_points)) if exact else None
+
+    portfolio = (spot, strikes, option_types, weights)
+    pricing = {"vol": vol, "maturity": maturity, "rate": rate, "ref_spot": ref_spot}
+    state = (generator, portfolio, pricing, q, k)
+
+    tasks = (
+        (start, min(chunk_size, n_scenarios - start))
+        for start in range(0, n_scenarios, chunk_size)
+    )
+
+    cvar = RunningCVaR(q) if k is None else StreamingCVaR(k=k, max_k=max_k)
+    worst = StreamingWorstCase()
+
+    def merge(chunk):
+        chunk_cvar, chunk_worst = chunk
+        cvar.merge(chunk_cvar)
+        worst.merge(chunk_worst)
+
+    if workers:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(state,),
+        ) as pool:
+            in_flight = deque()
+            for task in tasks:
+                if len(in_flight) == 2 * workers:
+                    merge(in_flight.popleft().result())
+                in_flight.append(pool.submit(_evaluate_worker_chunk, task))
+            while in_flight:
+                merge(in_flight.popleft().result())
+    else:
+        for task in tasks:
+            merge(_evaluate_chunk(state, *task))
+
+    return {"cvar": cvar.result(), "worst": worst.result()}
@@ -2,8 +2,14 @@
 Real implied volatility surface ingestion utilities.
 """
 
+import contextlib
+
 import torch
-import numpy as np
+
+try:
+    from src.regime_encoder import aggregate_term_structure, maturity_slice_features
+except ModuleNotFoundError:
+    from regime_encoder import aggregate_term_structure, maturity_slice_features
 
 
 def strikes_to_log_moneyness(
@@ -13,48 +19,387 @@ def strikes_to_log_moneyness(
     return torch.log(strikes / spot)
 
 
-def resample_vol_surface(
+def interp_linear(
+    x: torch.Tensor,
+    xp: torch.Tensor,
+    fp: torch.Tensor,
+) -> torch.Tensor:
+    """
+    Batched piecewise-linear interpolation on tensors.
+
+    Same semantics as np.interp: xp must be increasing along the
+    last dim and values outside [xp[0], xp[-1]] are held flat.
+
+    Args:
+        x: query points [..., Q]
+        xp: sample points [K] or [..., K]
+        fp: sample values [K] or [..., K]
+
+    Returns:
+        Interpolated values [..., Q]
+    """
+    batch = torch.broadcast_shapes(x.shape[:-1], xp.shape[:-1], fp.shape[:-1])
+    n = xp.shape[-1]
+
+    if n == 1:
+        return fp[..., :1].expand(*batch, x.shape[-1])
+
+    xp = xp.expand(*batch, n).contiguous()
+    fp = fp.expand(*batch, n)
+    x = x.expand(*batch, x.shape[-1]).contiguous()
+
+    idx = torch.searchsorted(xp, x, right=True).clamp(1, n - 1)
+
+    x0 = torch.gather(xp, -1, idx - 1)
+    x1 = torch.gather(xp, -1, idx)
+    f0 = torch.gather(fp, -1, idx - 1)
+    f1 = torch.gather(fp, -1, idx)
+
+    dx = x1 - x0
+    t = (x - x0) / torch.where(dx > 0, dx, torch.ones_like(dx))
+    t = t.clamp(0.0, 1.0)
+
+    return f0 + t * (f1 - f0)
+
+
+def smile_vol(
     strikes: torch.Tensor,
-    vol: torch.Tensor,
     spot: float,
     k_grid: torch.Tensor,
+    vol_grid: torch.Tensor,
 ) -> torch.Tensor:
     """
-    Interpolates implied vol onto a fixed log-moneyness grid.
-    Uses NumPy interpolation (safe for regime features).
+    Looks up the implied vol of each strike on a resampled smile.
+
+    Args:
+        strikes: Tensor of strikes [L] or [B, L]
+        spot: spot the smile was resampled against
+        k_grid: log-moneyness grid [K]
+        vol_grid: vol on k_grid [K] or per-structure [B, K]
+
+    Returns:
+        Per-leg implied vol, same shape as strikes
     """
     k = strikes_to_log_moneyness(strikes, spot)
+    return interp_linear(k, k_grid.to(k.dtype), vol_grid.to(k.dtype))
+
+
+def pad_vol_slices(
+    strikes: list,
+    vol: list,
+):
+    """
+    Pads ragged smile slices into dense tensors.
+
+    Args:
+        strikes: list of strike tensors [K_i]
+        vol: list of implied vol tensors [K_i]
+
+    Returns:
+        (strikes [M, K_max], vol [M, K_max], mask [M, K_max])
+    """
+    n = max((s.numel() for s in strikes), default=0)
+    dtype = vol[0].dtype if vol else torch.float
+
+    strikes_pad = torch.ones(len(strikes), n, dtype=dtype)
+    vol_pad = torch.zeros(len(vol), n, dtype=dtype)
+    mask = torch.zeros(len(strikes), n, dtype=torch.bool)
 
-    # Move to CPU numpy (regime features are non-differentiable)
-    k_np = k.detach().cpu().numpy()
-    vol_np = vol.detach().cpu().numpy()
-    k_grid_np = k_grid.detach().cpu().numpy()
-
-    # Sort by k
-    idx = np.argsort(k_np)
-    k_np = k_np[idx]
-    vol_np = vol_np[idx]
-
-    # Linear interpolation
-    vol_interp_np = np.interp(
-        k_grid_np,
-        k_np,
-        vol_np,
-        left=vol_np[0],
-        right=vol_np[-1],
+    for i, (s, v) in enumerate(zip(strikes, vol)):
+        strikes_pad[i, :s.numel()] = s.reshape(-1)
+        vol_pad[i, :v.numel()] = v.reshape(-1)
+        mask[i, :s.numel()] = True
+
+    return strikes_pad, vol_pad, mask
+
+
+def pad_vol_surfaces(
+    strikes: list,
+    vol: list,
+):
+    """
+    Pads ragged multi-maturity surfaces into dense tensors.
+
+    Args:
+        strikes: list (surfaces) of lists (maturities) of strike tensors
+        vol: implied vol tensors, same nesting as strikes
+
+    Returns:
+        (strikes [B, M, K], vol [B, M, K], mask [B, M, K], slice_mask [B, M])
+    """
+    strikes_flat, vol_flat, mask_flat = pad_vol_slices(
+        [s for surface in strikes for s in surface],
+        [v for surface in vol for v in surface],
     )
 
-    return torch.tensor(
-        vol_interp_np,
-        dtype=vol.dtype,
-        device=vol.device,
+    n_slices = torch.tensor([len(surface) for surface in strikes])
+    slice_mask = torch.arange(int(n_slices.max())) < n_slices.unsqueeze(-1)
+    shape = slice_mask.shape + strikes_flat.shape[-1:]
+
+    strikes_pad = torch.ones(shape, dtype=strikes_flat.dtype)
+    vol_pad = torch.zeros(shape, dtype=vol_flat.dtype)
+    mask = torch.zeros(shape, dtype=torch.bool)
+
+    strikes_pad[slice_mask] = strikes_flat
+    vol_pad[slice_mask] = vol_flat
+    mask[slice_mask] = mask_flat
+
+    return strikes_pad, vol_pad, mask, slice_mask
+
+
+def resample_vol_surfaces(
+    strikes: torch.Tensor,
+    vol: torch.Tensor,
+    spot,
+    k_grid: torch.Tensor,
+    mask: torch.Tensor = None,
+    differentiable: bool = False,
+) -> torch.Tensor:
+    """
+    Interpolates padded smiles onto a fixed log-moneyness grid.
+
+    Every slice is sorted and interpolated in one batched
+    searchsorted pass. Values outside a slice's strike range
+    are held flat (np.interp semantics). Fully masked slices
+    resample to zeros.
+
+    Args:
+        strikes: Tensor of strikes [..., K_raw] (e.g. [B, M, K_raw])
+        vol: Tensor of implied vols [..., K_raw]
+        spot: float, or Tensor over the leading batch dims (e.g. [B])
+        k_grid: log-moneyness grid [K_grid]
+        mask: bool Tensor [..., K_raw], True for valid quotes
+        differentiable: keep the autograd graph through strikes/vol
+
+    Returns:
+        Tensor of resampled vols [..., K_grid]
+    """
+    grad_ctx = contextlib.nullcontext() if differentiable else torch.no_grad()
+
+    with grad_ctx:
+        spot = torch.as_tensor(spot, dtype=strikes.dtype, device=strikes.device)
+        spot = spot.reshape(spot.shape + (1,) * (strikes.ndim - spot.ndim))
+
+        k = strikes_to_log_moneyness(strikes, spot)
+
+        if mask is not None:
+            # Padding sorts to the end and never brackets a query
+            pad = torch.finfo(k.dtype).max
+            k = torch.where(mask, k, torch.full_like(k, pad))
+            vol = torch.where(mask, vol, torch.zeros_like(vol))
+
+        k_sorted, order = torch.sort(k, dim=-1)
+        vol_sorted = torch.gather(vol, -1, order)
+
+        queries = k_grid.to(k.dtype).expand(*k.shape[:-1], k_grid.shape[-1])
+
+        return interp_linear(queries, k_sorted, vol_sorted)
+
+
+def resample_vol_surface(
+    strikes: torch.Tensor,
+    vol: torch.Tensor,
+    spot: float,
+    k_grid: torch.Tensor,
+) -> torch.Tensor:
+    """
+    Interpolates implied vol onto a fixed log-moneyness grid.
+    Single-slice wrapper around resample_vol_surfaces
+    (non-differentiable, safe for regime features).
+    """
+    return resample_vol_surfaces(
+        strikes=strikes,
+        vol=vol,
+        spot=spot,
+        k_grid=k_grid,
     )
 
 
 def normalize_vol_surface(vol: torch.Tensor) -> torch.Tensor:
     """
     Normalize vol surface for regime encoding.
+    Batched inputs [..., K] are normalized per slice.
     """
-    mean = vol.mean()
-    std = vol.std() + 1e-6
+    mean = vol.mean(dim=-1, keepdim=True)
+    std = vol.std(dim=-1, keepdim=True) + 1e-6
     return (vol - mean) / std
+
+
+def vol_slice_features(
+    strikes: torch.Tensor,
+    vol: torch.Tensor,
+    spot,
+    k_grid: torch.Tensor,
+    normalize: bool = True,
+):
+    """
+    Resamples smile slices onto k_grid and featurizes each one.
+
+    NaN vols are missing quotes and are masked out of the resample.
+
+    Args:
+        strikes: Tensor of strikes [..., K_raw]
+        vol: Tensor of implied vols [..., K_raw], NaN = no quote
+        spot: moneyness reference, float or Tensor over the batch dims
+        k_grid: log-moneyness grid [K_grid]
+        normalize: normalize each resampled slice (as in training)
+
+    Returns:
+        (vol_grid [..., K_grid], slice_features [..., 3])
+    """
+    mask = torch.isfinite(vol)
+    vol_grid = resample_vol_surfaces(
+        strikes=strikes,
+        vol=torch.nan_to_num(vol),
+        spot=spot,
+        k_grid=k_grid,
+        mask=mask,
+    )
+    if normalize:
+        vol_grid = normalize_vol_surface(vol_grid)
+
+    return vol_grid, maturity_slice_features(k_grid, vol_grid)
+
+
+def live_surface_features(
+    surface: dict,
+    k_grid: torch.Tensor,
+    normalize: bool = True,
+) -> torch.Tensor:
+    """
+    Term-structure regime features of a live surface, rebuilt in full.
+
+    Same grid, normalization and live-slice mask as
+    IncrementalSurface.refresh, so a polled surface and a streamed
+    snapshot of the same chain encode identically. Moneyness is taken
+    against surface["ref_spot"] when present (streamed snapshots),
+    else surface["spot"].
+
+    Args:
+        surface: extract_live_spx_surface format, NaN = no quote
+        k_grid: log-moneyness grid [K_grid]
+        normalize: normalize each resampled slice (as in training)
+
+    Returns:
+        Regime features [6]
+    """
+    strikes, vol, mask = pad_vol_slices(
+        [torch.as_tensor(s) for s in surface["strikes"]],
+        [torch.as_tensor(v) for v in surface["implied_vol"]],
+    )
+    vol = torch.where(mask, vol, torch.full_like(vol, float("nan")))
+    spot = surface.get("ref_spot", surface["spot"])
+
+    _, slice_features = vol_slice_features(strikes, vol, spot, k_grid, normalize)
+    return aggregate_term_structure(slice_features, torch.isfinite(vol).any(dim=-1))
+
+
+class IncrementalSurface:
+    """
+    Live strike x expiry IV array with per-slice dirty flags.
+
+    IV ticks are written in place into a preallocated [M, K] array
+    (NaN = no quote yet) and mark their expiry slice dirty. refresh()
+    resamples onto k_grid and re-featurizes only the dirty slices,
+    then re-aggregates the term structure (cheap, [M, 3]).
+
+    Moneyness is taken against a reference spot that is rebased (and
+    every slice marked dirty) once spot leaves spot_band.
+
+    Args:
+        strikes: Tensor of strikes [K] shared by all expiries
+        n_expiries: number of expiry slices M
+        spot: initial reference spot
+        k_grid: log-moneyness grid [K_grid]
+        spot_band: relative spot move that triggers a full rebase
+        normalize: normalize each resampled slice (as in training)
+    """
+
+    def __init__(
+        self,
+        strikes: torch.Tensor,
+        n_expiries: int,
+        spot: float,
+        k_grid: torch.Tensor,
+        spot_band: float = 0.005,
+        normalize: bool = True,
+    ):
+        self.strikes = torch.as_tensor(strikes, dtype=torch.float)
+        self.k_grid = k_grid
+        self.spot = float(spot)
+        self.ref_spot = float(spot)
+        self.spot_band = spot_band
+        self.normalize = normalize
+
+        self.iv = torch.full((n_expiries, self.strikes.numel()), float("nan"))
+        self.dirty = torch.ones(n_expiries, dtype=torch.bool)
+
+        self.vol_grid = torch.zeros(n_expiries, k_grid.numel())
+        self.slice_features = torch.zeros(n_expiries, 3)
+        self.features = None
+
+        self.ticks = 0
+        self.slices_refreshed = 0
+
+    @property
+    def live(self) -> torch.Tensor:
+        """
+        [M] bool, True for expiries with at least one quote.
+        """
+        return torch.isfinite(self.iv).any(dim=-1)
+
+    def update(self, expiry_index: int, strike_index: int, iv: float):
+        """
+        Write one IV tick in place; marks the slice dirty if it changed.
+        """
+        self.ticks += 1
+        if self.iv[expiry_index, strike_index] != iv:
+            self.iv[expiry_index, strike_index] = iv
+            self.dirty[expiry_index] = True
+
+    def set_spot(self, spot: float):
+        self.spot = float(spot)
+        if abs(self.spot / self.ref_spot - 1.0) > self.spot_band:
+            self.ref_spot = self.spot
+            self.dirty[:] = True
+
+    def refresh(self) -> torch.Tensor:
+        """
+        Re-featurize dirty slices (live_surface_features on the whole
+        surface gives the same result).
+
+        Returns:
+            Term-structure regime features [6]
+        """
+        idx = self.dirty.nonzero().squeeze(-1)
+
+        if idx.numel() or self.features is None:
+            iv = self.iv[idx]
+            vol_grid, slice_features = vol_slice_features(
+                self.strikes.expand_as(iv), iv, self.ref_spot,
+                self.k_grid, self.normalize,
+            )
+
+            self.vol_grid[idx] = vol_grid
+            self.slice_features[idx] = slice_features
+            self.dirty[idx] = False
+            self.slices_refreshed += idx.numel()
+
+            self.features = aggregate_term_structure(self.slice_features, self.live)
+
+        return self.features
+
+    def reindex(self, strikes: torch.Tensor) -> "IncrementalSurface":
+        """
+        Same surface on a new strike set; quotes on shared strikes carry over.
+        """
+        out = IncrementalSurface(
+            strikes, self.iv.shape[0], self.spot, self.k_grid,
+            spot_band=self.spot_band, normalize=self.normalize,
+        )
+        old = {float(k): i for i, k in enumerate(self.strikes.tolist())}
+        for j, k in enumerate(out.strikes.tolist()):
+            i = old.get(float(k))
+            if i is not None:
+                out.iv[:, j] = self.iv[:, i]
+        return out
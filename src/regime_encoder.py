@@ -17,17 +17,35 @@ def vol_surface_features(log_moneyness: torch.Tensor, vol: torch.Tensor) -> torc
     if log_moneyness.shape != vol.shape:
         raise ValueError("log_moneyness and vol must have same shape")
 
-    dk = log_moneyness[1:] - log_moneyness[:-1]
-    dv = vol[1:] - vol[:-1]
+    return vol_surface_features_batched(log_moneyness, vol)
 
-    d2v = vol[2:] - 2 * vol[1:-1] + vol[:-2]
-    d2k = (dk[1:] + dk[:-1]) / 2.0
 
-    level = vol.mean()
-    skew = (dv / dk).mean()
-    curvature = (d2v / (d2k ** 2)).mean()
+def vol_surface_features_batched(log_moneyness: torch.Tensor, vol: torch.Tensor) -> torch.Tensor:
+    """
+    (level, skew, curvature) of every smile in one pass.
 
-    return torch.stack([level, skew, curvature])
+    log_moneyness: [K] or [..., K]
+    vol:           [..., K]
+    returns:       [..., 3]
+    """
+    if log_moneyness.shape[-1] != vol.shape[-1]:
+        raise ValueError("log_moneyness and vol must share the last dim")
+
+    dk = log_moneyness[..., 1:] - log_moneyness[..., :-1]
+    dv = vol[..., 1:] - vol[..., :-1]
+
+    d2v = vol[..., 2:] - 2 * vol[..., 1:-1] + vol[..., :-2]
+    d2k = (dk[..., 1:] + dk[..., :-1]) / 2.0
+
+    level = vol.mean(dim=-1)
+    skew = (dv / dk).mean(dim=-1)
+    curvature = (d2v / (d2k ** 2)).mean(dim=-1)
+
+    return torch.stack([level, skew, curvature], dim=-1)
+
+
+# Single-maturity regime features used by the real-data pipelines
+real_vol_features = vol_surface_features_batched
 
 
 # ============================================================
@@ -35,29 +53,72 @@ def vol_surface_features(log_moneyness: torch.Tensor, vol: torch.Tensor) -> torc
 # ============================================================
 
 def multi_maturity_vol_features(k_grid: torch.Tensor, vol_surfaces: list) -> torch.Tensor:
-    levels, slopes, curvatures = [], [], []
+    return multi_maturity_vol_features_batched(k_grid, torch.stack(list(vol_surfaces)))
 
-    for vol in vol_surfaces:
-        dvol_dk = torch.gradient(vol, spacing=(k_grid,))[0]
-        d2vol_dk2 = torch.gradient(dvol_dk, spacing=(k_grid,))[0]
 
-        levels.append(vol.mean())
-        slopes.append(dvol_dk.mean())
-        curvatures.append(d2vol_dk2.mean())
+def maturity_slice_features(k_grid: torch.Tensor, vol: torch.Tensor) -> torch.Tensor:
+    """
+    Per-slice (level, slope, curvature) on a shared k grid.
 
-    levels = torch.stack(levels)
-    slopes = torch.stack(slopes)
-    curvatures = torch.stack(curvatures)
+    k_grid: [K]
+    vol:    [..., K]
+    returns [..., 3]
+    """
+    dvol_dk = torch.gradient(vol, spacing=(k_grid,), dim=-1)[0]
+    d2vol_dk2 = torch.gradient(dvol_dk, spacing=(k_grid,), dim=-1)[0]
 
-    # unbiased=False makes single-slice regimes well-posed
     return torch.stack([
-        levels.mean(),
-        levels.std(unbiased=False),
-        slopes.mean(),
-        slopes.std(unbiased=False),
-        curvatures.mean(),
-        curvatures.std(unbiased=False),
-    ])
+        vol.mean(dim=-1),
+        dvol_dk.mean(dim=-1),
+        d2vol_dk2.mean(dim=-1),
+    ], dim=-1)
+
+
+def aggregate_term_structure(
+    slice_features: torch.Tensor,
+    mask: torch.Tensor = None,
+) -> torch.Tensor:
+    """
+    Mean / std of per-slice features across maturities.
+
+    slice_features: [..., M, 3]
+    mask:           [..., M] bool, True for live maturities
+    returns:        [..., 6]
+    """
+    if mask is None:
+        mask = torch.ones(slice_features.shape[:-1], dtype=torch.bool, device=slice_features.device)
+
+    live = mask.unsqueeze(-1)
+    n = live.sum(dim=-2).clamp(min=1).to(slice_features.dtype)
+    zeros = torch.zeros_like(slice_features)
+
+    mean = torch.where(live, slice_features, zeros).sum(dim=-2) / n
+    # unbiased=False makes single-slice regimes well-posed
+    centered = torch.where(live, slice_features - mean.unsqueeze(-2), zeros)
+    var = (centered ** 2).sum(dim=-2) / n
+    std = var.sqrt()
+
+    # (level_mean, level_std, slope_mean, slope_std, curv_mean, curv_std)
+    return torch.stack([mean, std], dim=-1).flatten(-2)
+
+
+def multi_maturity_vol_features_batched(
+    k_grid: torch.Tensor,
+    vol_surfaces: torch.Tensor,
+    mask: torch.Tensor = None,
+) -> torch.Tensor:
+    """
+    Term-structure regime features for stacked surfaces.
+
+    k_grid:       [K]
+    vol_surfaces: [..., M, K] (e.g. [B, M, K])
+    mask:         [..., M] bool, True for live maturities
+    returns:      [..., 6]
+    """
+    return aggregate_term_structure(
+        maturity_slice_features(k_grid, vol_surfaces),
+        mask,
+    )
 
 
 # ============================================================
@@ -7,7 +7,7 @@ import matplotlib.pyplot as plt
 
 from grids import make_moneyness_grid, make_spot_grid
 from regime_encoder import vol_surface_features, RegimeEncoder
-from portfolio_generator import PortfolioGenerator, decode_portfolio_tensor
+from portfolio_generator import PortfolioGenerator, decode_portfolio_tensor, load_checkpoint
 from physics import terminal_portfolio_payoff
 
 
@@ -44,9 +44,7 @@ CURVATURES = [0.02, 0.05, 0.10, 0.15]
 encoder = RegimeEncoder(input_dim=3, hidden_dim=16, latent_dim=8)
 generator = PortfolioGenerator(latent_dim=8, hidden_dim=64)
 
-generator.load_state_dict(
-    torch.load("checkpoints/generator.pt", map_location="cpu")
-)
+generator.load_state_dict(load_checkpoint("checkpoints/generator.pt")["generator"])
 generator.eval()
 
 # -------------------------------------------------
@@ -1,6 +1,15 @@
 import json
 import time
 
+from src.leg_book import LegBook
+
+
+def _encode(obj):
+    if isinstance(obj, LegBook):
+        return obj.to_dict()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
 class LiveSessionLogger:
     def __init__(self):
         self.records = []
@@ -14,5 +23,5 @@ class LiveSessionLogger:
         ts = int(time.time())
         fname = f"session_{ts}.json"
         with open(fname, "w") as f:
-            json.dump(self.records, f, indent=2)
+            json.dump(self.records, f, indent=2, default=_encode)
         return fname
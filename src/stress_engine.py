@@ -3,8 +3,14 @@ Deterministic adversarial stress operators.
 """
 
 import torch
+import torch.nn.functional as F
 from typing import Callable
 
+try:
+    from src.physics import bs_leg_prices, terminal_payoff_legs
+except ModuleNotFoundError:
+    from physics import bs_leg_prices, terminal_payoff_legs
+
 
 # -------------------------------------------------
 # Spot shocks
@@ -19,7 +25,8 @@ def spot_shock(
 
     Args:
         spot: Tensor of spot prices [N]
-        shock: fractional shock (e.g. -0.2 or +0.2)
+        shock: fractional shock (e.g. -0.2 or +0.2), or a tensor
+               of shocks broadcastable against spot
 
     Returns:
         Shocked spot tensor
@@ -40,13 +47,140 @@ def vol_level_shift(
 
     Args:
         vol: Tensor of implied volatilities [N]
-        shift: additive shift (e.g. +0.05)
+        shift: additive shift (e.g. +0.05), or a tensor of shifts
+               broadcastable against vol
 
     Returns:
         Shifted vol tensor
     """
     return torch.clamp(vol + shift, min=1e-4)
 
+
+# -------------------------------------------------
+# Time decay
+# -------------------------------------------------
+
+def time_decay(
+    maturity,
+    decay,
+) -> torch.Tensor:
+    """
+    Rolls time to maturity forward.
+
+    Args:
+        maturity: time to maturity (years)
+        decay: elapsed time (years), scalar or tensor
+
+    Returns:
+        Remaining maturity tensor, floored just above expiry
+    """
+    return torch.clamp(torch.as_tensor(maturity) - decay, min=1e-6)
+
+
+# -------------------------------------------------
+# Scenario cube
+# -------------------------------------------------
+
+def scenario_grid(
+    spot_shocks,
+    vol_shifts=None,
+    time_decays=None,
+):
+    """
+    Cartesian product of stress axes, flattened to one scenario axis.
+
+    Args:
+        spot_shocks: fractional spot shocks [Ss]
+        vol_shifts: additive vol shifts [Sv] (default: no shift)
+        time_decays: elapsed times in years [St] (default: no decay)
+
+    Returns:
+        (spot_shocks [S], vol_shifts [S], time_decays [S]),
+        S = Ss * Sv * St, spot shock varying slowest
+    """
+    spot_shocks = torch.as_tensor(spot_shocks).reshape(-1)
+    if not spot_shocks.is_floating_point():
+        spot_shocks = spot_shocks.float()
+    vol_shifts = torch.as_tensor(
+        0.0 if vol_shifts is None else vol_shifts, dtype=spot_shocks.dtype
+    ).reshape(-1)
+    time_decays = torch.as_tensor(
+        0.0 if time_decays is None else time_decays, dtype=spot_shocks.dtype
+    ).reshape(-1)
+
+    grids = torch.meshgrid(spot_shocks, vol_shifts, time_decays, indexing="ij")
+    return tuple(g.reshape(-1) for g in grids)
+
+
+def scenario_cube(
+    spot: torch.Tensor,
+    strikes: torch.Tensor,
+    option_types: torch.Tensor,
+    weights: torch.Tensor,
+    spot_shocks,
+    vol_shifts=None,
+    time_decays=None,
+    vol=None,
+    maturity=None,
+    rate=0.0,
+) -> torch.Tensor:
+    """
+    Stressed portfolio values for every scenario in one broadcast pass.
+
+    Terminal mode (vol=None) stresses expiry payoffs with spot shocks
+    only. Pricing mode (vol and maturity given) reprices with
+    Black–Scholes under every (spot shock, vol shift, time decay).
+
+    Args:
+        spot: Tensor of spot prices [N] or per-structure [B, N]
+        strikes: Tensor of strikes [L] or [B, L]
+        option_types: Tensor of type codes (CALL/PUT), same shape as strikes
+        weights: Tensor of leg weights, same shape as strikes
+        spot_shocks: fractional spot shocks [Ss]
+        vol_shifts: additive vol shifts [Sv] (pricing mode)
+        time_decays: elapsed times in years [St] (pricing mode)
+        vol: Implied volatility, scalar or per-leg tensor shaped like strikes
+        maturity: Time to maturity (years)
+        rate: Risk-free rate
+
+    Returns:
+        Tensor of stressed values [S, N] or [B, S, N]
+    """
+    if vol is None:
+        if vol_shifts is not None or time_decays is not None:
+            raise ValueError("vol shifts and time decays need vol and maturity")
+        shocks = torch.as_tensor(spot_shocks, dtype=spot.dtype).reshape(-1)
+        return terminal_payoff_legs(
+            spot_shock(spot.unsqueeze(-2), shocks.to(spot.device).unsqueeze(-1)),
+            strikes.unsqueeze(-2),
+            option_types.unsqueeze(-2),
+            weights.unsqueeze(-2),
+        )
+
+    if maturity is None:
+        raise ValueError("pricing mode needs both vol and maturity")
+
+    shocks, shifts, decays = (
+        x.to(dtype=spot.dtype, device=spot.device)
+        for x in scenario_grid(spot_shocks, vol_shifts, time_decays)
+    )
+
+    vol = torch.as_tensor(vol, dtype=spot.dtype, device=spot.device)
+    if vol.ndim > 0:
+        vol = vol.unsqueeze(-2)
+
+    # Scenario axis sits just before the leg axis: [..., S, L, N]
+    leg_prices = bs_leg_prices(
+        spot=spot_shock(spot.unsqueeze(-2), shocks.unsqueeze(-1)),
+        strikes=strikes.unsqueeze(-2),
+        option_types=option_types.unsqueeze(-2),
+        vol=vol_level_shift(vol, shifts.unsqueeze(-1)),
+        maturity=time_decay(maturity, decays).reshape(-1, 1, 1),
+        rate=rate,
+    )
+    weights = weights.to(leg_prices.dtype).unsqueeze(-2).unsqueeze(-1)
+    return (weights * leg_prices).sum(dim=-2)
+
 from typing import List
 
 
@@ -57,39 +191,281 @@ def aggregate_worst_case(
     Computes worst-case payoff across stresses and spot.
 
     Args:
-        stressed_payoffs: list of payoff tensors [N]
+        stressed_payoffs: list of payoff tensors [N], or a
+                          stacked tensor [..., S, N]
 
     Returns:
-        Scalar tensor (worst-case payoff)
+        Worst-case tensor: scalar, or [...] per structure
     """
-    worst = torch.stack(
-        [p.min() for p in stressed_payoffs]
-    ).min()
+    if torch.is_tensor(stressed_payoffs):
+        return stressed_payoffs.amin(dim=(-2, -1))
+
+    stream = StreamingWorstCase()
+    for p in stressed_payoffs:
+        stream.update(p)
 
-    return worst
+    return stream.result()
 
 
 def aggregate_cvar(
-    stressed_payoffs: List[torch.Tensor],
+    stressed_payoffs,
     q: float = 0.1,
 ) -> torch.Tensor:
     """
     Computes CVaR-style tail average across stresses and spot.
 
     Args:
-        stressed_payoffs: list of payoff tensors [N]
+        stressed_payoffs: list of payoff tensors [N], or a
+                          stacked tensor [..., S, N]
         q: tail fraction (e.g. 0.1 = worst 10%)
 
     Returns:
-        Scalar tensor (CVaR)
+        CVaR tensor: scalar, or [...] per structure
     """
-    all_payoffs = torch.cat(stressed_payoffs)
-    k = max(1, int(q * all_payoffs.numel()))
+    if not torch.is_tensor(stressed_payoffs):
+        # The payoffs are already in memory: no buffer cap
+        stream = StreamingCVaR(
+            q=q,
+            n_total=sum(p.numel() for p in stressed_payoffs),
+            max_k=None,
+        )
+        for p in stressed_payoffs:
+            stream.update(p)
+        return stream.result()
+
+    all_payoffs = stressed_payoffs.flatten(-2)
+
+    k = max(1, int(q * all_payoffs.shape[-1]))
 
     worst_k, _ = torch.topk(
         all_payoffs,
         k=k,
+        dim=-1,
         largest=False,
     )
 
-    return worst_k.mean()
+    return worst_k.mean(dim=-1)
+
+
+def smooth_cvar(
+    stressed_payoffs,
+    q: float = 0.1,
+    temperature: float = 0.01,
+) -> torch.Tensor:
+    """
+    Differentiable CVaR via the Rockafellar–Uryasev form.
+
+    CVaR_q = t - E[(t - X)+] / q at t = VaR_q. The hinge is smoothed
+    with softplus, so every payoff near the tail gets a gradient, and
+    t is the detached empirical quantile (the objective is stationary
+    in t there). As temperature -> 0 this matches aggregate_cvar.
+
+    Args:
+        stressed_payoffs: list of payoff tensors [N], or a
+                          stacked tensor [..., S, N]
+        q: tail fraction (e.g. 0.1 = worst 10%)
+        temperature: softplus width, in payoff units
+
+    Returns:
+        CVaR tensor: scalar, or [...] per structure
+    """
+    if torch.is_tensor(stressed_payoffs):
+        all_payoffs = stressed_payoffs.flatten(-2)
+    else:
+        all_payoffs = torch.cat(stressed_payoffs)
+
+    var = torch.quantile(
+        all_payoffs.detach(), q, dim=-1, keepdim=True, interpolation="lower"
+    )
+    shortfall = temperature * F.softplus((var - all_payoffs) / temperature)
+
+    return var.squeeze(-1) - shortfall.mean(dim=-1) / q
+
+
+# -------------------------------------------------
+# Streaming aggregators
+# -------------------------------------------------
+
+# Default cap on StreamingCVaR's per-structure buffer (values)
+MAX_EXACT_K = 1 << 20
+
+
+def _scenario_points(chunk: torch.Tensor) -> torch.Tensor:
+    # [N] is a single scenario; [..., S, N] flattens to [..., S * N]
+    if chunk.ndim == 1:
+        return chunk
+    return chunk.flatten(-2)
+
+
+class StreamingCVaR:
+    """
+    Exact CVaR over scenario chunks fed one at a time.
+
+    An exact top-k buffer: keeps the k worst payoffs seen so far per
+    structure, with k = max(1, int(q * n_total)) as in aggregate_cvar.
+    Memory is O(q * n_total) per structure, so it still grows with the
+    scenario count (by 1/q less than holding every payoff); k above
+    max_k raises ValueError (None = no cap). Use RunningCVaR when
+    memory has to stay fixed.
+    """
+
+    def __init__(
+        self,
+        q: float = 0.1,
+        n_total: int = None,
+        k: int = None,
+        max_k: int = MAX_EXACT_K,
+    ):
+        if k is None:
+            if n_total is None:
+                raise ValueError("StreamingCVaR needs n_total or k")
+            k = max(1, int(q * n_total))
+        if max_k is not None and k > max_k:
+            raise ValueError(
+                f"exact CVaR buffer k={k} exceeds max_k={max_k}; "
+                "use RunningCVaR or raise max_k"
+            )
+        self.k = k
+        self.count = 0
+        self.buffer = None
+
+    def _push(self, values: torch.Tensor, count: int):
+        if self.buffer is not None:
+            values = torch.cat([self.buffer, values], dim=-1)
+        if values.shape[-1] > self.k:
+            values, _ = torch.topk(values, k=self.k, dim=-1, largest=False)
+        self.buffer = values
+        self.count += count
+
+    def update(self, chunk: torch.Tensor):
+        """
+        Args:
+            chunk: stressed payoffs [N] or [..., S, N]
+        """
+        values = _scenario_points(chunk)
+        self._push(values, values.shape[-1])
+        return self
+
+    def merge(self, other: "StreamingCVaR"):
+        """
+        Folds in another stream built with the same k.
+        """
+        if other.k != self.k:
+            raise ValueError("cannot merge streams with different k")
+        if other.buffer is not None:
+            self._push(other.buffer, other.count)
+        return self
+
+    def result(self) -> torch.Tensor:
+        """
+        Returns:
+            CVaR tensor: scalar, or [...] per structure
+        """
+        if self.buffer is None:
+            raise ValueError("no scenarios seen")
+        return self.buffer.mean(dim=-1)
+
+
+class RunningCVaR:
+    """
+    Fixed-memory CVaR estimate over scenario chunks fed one at a time.
+
+    Rockafellar–Uryasev running form: the VaR estimate t is the
+    count-weighted mean of per-chunk empirical q-quantiles, and each
+    chunk adds t - E[(t - X)+] / q at the current t. The objective is
+    stationary in t, so the error from t drifting between chunks is
+    second order. Memory is O(1) per structure regardless of the
+    scenario count. The estimate is approximate: chunks must be
+    exchangeable draws (Monte Carlo / QMC chunks, not a sorted shock
+    sweep) and the per-chunk quantile is biased by O(1 / chunk size).
+    See StreamingCVaR for the exact buffer.
+    """
+
+    def __init__(self, q: float = 0.1):
+        self.q = q
+        self.count = 0
+        self.var = None
+        self.total = None   # sum of per-point CVaR contributions
+
+    def _push(self, var: torch.Tensor, total: torch.Tensor, count: int):
+        if self.var is None:
+            self.var, self.total = var, total
+        else:
+            w = count / (self.count + count)
+            self.var = self.var + w * (var - self.var)
+            self.total = self.total + total
+        self.count += count
+
+    def update(self, chunk: torch.Tensor):
+        """
+        Args:
+            chunk: stressed payoffs [N] or [..., S, N]
+        """
+        values = _scenario_points(chunk)
+        n = values.shape[-1]
+
+        chunk_var = torch.quantile(
+            values, self.q, dim=-1, keepdim=True, interpolation="lower"
+        ).squeeze(-1)
+        if self.var is None:
+            var = chunk_var
+        else:
+            var = self.var + n / (self.count + n) * (chunk_var - self.var)
+
+        shortfall = (var.unsqueeze(-1) - values).clamp(min=0.0).sum(dim=-1)
+        self._push(chunk_var, n * var - shortfall / self.q, n)
+        return self
+
+    def merge(self, other: "RunningCVaR"):
+        """
+        Folds in another stream built with the same q.
+        """
+        if other.q != self.q:
+            raise ValueError("cannot merge streams with different q")
+        if other.var is not None:
+            self._push(other.var, other.total, other.count)
+        return self
+
+    def result(self) -> torch.Tensor:
+        """
+        Returns:
+            CVaR tensor: scalar, or [...] per structure
+        """
+        if self.var is None:
+            raise ValueError("no scenarios seen")
+        return self.total / self.count
+
+
+class StreamingWorstCase:
+    """
+    Worst-case payoff over scenario chunks fed one at a time.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.worst = None
+
+    def _push(self, worst: torch.Tensor, count: int):
+        if self.worst is not None:
+            worst = torch.minimum(self.worst, worst)
+        self.worst = worst
+        self.count += count
+
+    def update(self, chunk: torch.Tensor):
+        """
+        Args:
+            chunk: stressed payoffs [N] or [..., S, N]
+        """
+        values = _scenario_points(chunk)
+        self._push(values.amin(dim=-1), values.shape[-1])
+        return self
+
+    def merge(self, other: "StreamingWorstCase"):
+        if other.worst is not None:
+            self._push(other.worst, other.count)
+        return self
+
+    def result(self) -> torch.Tensor:
+        if self.worst is None:
+            raise ValueError("no scenarios seen")
+        return self.worst
@@ -126,8 +126,8 @@ def extract_multi_maturity_surface(
 # LIVE SPX GEOMETRY
 # ============================================================
 
-def extract_live_spx_surface():
-    feed_df = load_live_spx_chain()
+def extract_live_spx_surface(window=None):
+    feed_df = load_live_spx_chain(window)
     spot = float(feed_df["strike"].median())
 
     try:
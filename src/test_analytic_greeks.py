@@ -0,0 +1,78 @@
+import torch
+
+from grids import make_spot_grid
+from physics import price_portfolio, portfolio_delta, portfolio_gamma, portfolio_vega
+from greeks import portfolio_greeks
+
+# Spot grid
+spot = make_spot_grid(
+    spot=100.0,
+    sigma=0.2,
+    n_std=3.0,
+    n_points=41,
+).double()
+
+legs = [
+    {"option_type": "put", "strike": 90.0, "weight": 1.0},
+    {"option_type": "call", "strike": 110.0, "weight": -1.0},
+]
+
+vol = 0.2
+maturity = 0.5
+rate = 0.03
+
+greeks = portfolio_greeks(
+    spot=spot,
+    legs=legs,
+    vol=vol,
+    maturity=maturity,
+    rate=rate,
+)
+
+# Autograd reference
+spot_ad = spot.clone().requires_grad_(True)
+price = price_portfolio(spot=spot_ad, legs=legs, vol=vol, maturity=maturity, rate=rate)
+delta_ad = portfolio_delta(spot=spot_ad, portfolio_price=price)
+gamma_ad = portfolio_gamma(spot=spot_ad, delta=delta_ad)
+
+vega_ad = portfolio_vega(
+    vol=torch.tensor(vol, dtype=torch.float64, requires_grad=True),
+    portfolio_price_fn=lambda v: price_portfolio(
+        spot=spot, legs=legs, vol=v, maturity=maturity, rate=rate
+    ),
+)
+
+# Finite-difference references in calendar time (dt = -dT)
+dt = 1e-5
+price_later = price_portfolio(spot=spot, legs=legs, vol=vol, maturity=maturity - dt, rate=rate)
+price_now = price_portfolio(spot=spot, legs=legs, vol=vol, maturity=maturity, rate=rate)
+theta_fd = (price_later - price_now) / dt
+
+spot_later = spot.clone().requires_grad_(True)
+delta_later = portfolio_delta(
+    spot=spot_later,
+    portfolio_price=price_portfolio(
+        spot=spot_later, legs=legs, vol=vol, maturity=maturity - dt, rate=rate
+    ),
+)
+charm_fd = (delta_later - delta_ad) / dt
+
+print("Max |delta - autograd|:", (greeks["delta"] - delta_ad).abs().max().item())
+print("Max |gamma - autograd|:", (greeks["gamma"] - gamma_ad).abs().max().item())
+print("Max |vega - jacobian|:", (greeks["vega"] - vega_ad).abs().max().item())
+print("Max |theta - finite diff|:", (greeks["theta"] - theta_fd).abs().max().item())
+print("Max |charm - finite diff|:", (greeks["charm"] - charm_fd).abs().max().item())
+print("Requires grad (default):", greeks["delta"].requires_grad)
+
+# Differentiable mode for training
+vol_t = torch.tensor(vol, dtype=torch.float64, requires_grad=True)
+greeks_train = portfolio_greeks(
+    spot=spot,
+    legs=legs,
+    vol=vol_t,
+    maturity=maturity,
+    rate=rate,
+    differentiable=True,
+)
+greeks_train["vega"].sum().backward()
+print("\nd(sum vega)/d(vol):", vol_t.grad.item())
@@ -0,0 +1,60 @@
+import torch
+
+from grids import make_spot_grid
+from physics import terminal_portfolio_payoff, terminal_payoff_legs, CALL, PUT
+from stress_engine import spot_shock, aggregate_cvar
+
+# Spot grid
+spot = make_spot_grid(
+    spot=100.0,
+    sigma=0.2,
+    n_std=3.0,
+    n_points=41,
+)
+
+# Batch of random structures [B, L]
+torch.manual_seed(0)
+B = 64
+strikes = 100.0 * torch.exp(0.2 * torch.randn(B, 4))
+option_types = torch.where(torch.rand(B, 4) > 0.5, torch.tensor(CALL), torch.tensor(PUT))
+weights = torch.randn(B, 4)
+
+payoff = terminal_payoff_legs(spot, strikes, option_types, weights)
+
+
+def to_legs(b):
+    return [
+        {
+            "option_type": "call" if option_types[b, i] > 0 else "put",
+            "strike": float(strikes[b, i]),
+            "weight": float(weights[b, i]),
+        }
+        for i in range(4)
+    ]
+
+
+reference = torch.stack([terminal_portfolio_payoff(spot, to_legs(b)) for b in range(B)])
+
+print("Batch payoff shape:", payoff.shape)
+print("Max abs diff vs loop:", (payoff - reference).abs().max().item())
+
+# Stressed payoffs [B, S, N] and per-structure CVaR
+shocks = torch.tensor([-0.4, -0.2, 0.2, 0.4])
+stressed = terminal_payoff_legs(
+    spot_shock(spot, shocks.unsqueeze(-1)),
+    strikes.unsqueeze(1),
+    option_types.unsqueeze(1),
+    weights.unsqueeze(1),
+)
+cvar = aggregate_cvar(stressed)
+
+cvar_reference = torch.stack([
+    aggregate_cvar([
+        terminal_portfolio_payoff(spot_shock(spot, float(s)), to_legs(b))
+        for s in shocks
+    ])
+    for b in range(B)
+])
+
+print("\nStressed shape:", stressed.shape)
+print("Max abs CVaR diff vs loop:", (cvar - cvar_reference).abs().max().item())
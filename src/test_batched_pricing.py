@@ -0,0 +1,114 @@
+import math
+
+import torch
+
+from grids import make_spot_grid
+from physics import price_portfolio, price_legs, legs_to_tensors, CALL, PUT
+
+
+def bs_reference(S, K, vol, T, option_type):
+    """
+    Closed-form Black–Scholes (r = 0) on Python floats, independent
+    of the torch kernel.
+    """
+    N = lambda x: 0.5 * (1.0 + math.erf(x / math.sqrt(2.0)))
+    d1 = (math.log(S / K) + 0.5 * vol ** 2 * T) / (vol * math.sqrt(T))
+    d2 = d1 - vol * math.sqrt(T)
+    if option_type == "call":
+        return S * N(d1) - K * N(d2)
+    return K * N(-d2) - S * N(-d1)
+
+
+def reference_prices(spot, legs, vol, maturity):
+    return torch.tensor([
+        sum(
+            leg["weight"] * bs_reference(s, leg["strike"], vol, maturity, leg["option_type"])
+            for leg in legs
+        )
+        for s in spot.tolist()
+    ])
+
+# Spot grid
+spot = make_spot_grid(
+    spot=100.0,
+    sigma=0.2,
+    n_std=3.0,
+    n_points=41,
+)
+
+vol = 0.2
+maturity = 1.0
+
+# Iron condor
+legs = [
+    {"option_type": "put", "strike": 85.0, "weight": 1.0},
+    {"option_type": "put", "strike": 95.0, "weight": -1.0},
+    {"option_type": "call", "strike": 105.0, "weight": -1.0},
+    {"option_type": "call", "strike": 115.0, "weight": 1.0},
+]
+
+strikes, option_types, weights = legs_to_tensors(legs)
+
+price_single = price_legs(
+    spot=spot,
+    strikes=strikes,
+    option_types=option_types,
+    weights=weights,
+    vol=vol,
+    maturity=maturity,
+)
+
+price_dicts = price_portfolio(
+    spot=spot,
+    legs=legs,
+    vol=vol,
+    maturity=maturity,
+)
+
+print("Single structure shape:", price_single.shape)
+print("Max abs diff vs closed form:",
+      (price_single - reference_prices(spot, legs, vol, maturity)).abs().max().item())
+print("Max abs diff vs price_portfolio:",
+      (price_single - price_dicts).abs().max().item())
+
+# Batch of candidate structures [B, L]
+torch.manual_seed(0)
+B = 256
+batch_strikes = 100.0 * torch.exp(0.2 * torch.randn(B, 4))
+batch_types = torch.where(
+    torch.rand(B, 4) > 0.5,
+    torch.tensor(CALL),
+    torch.tensor(PUT),
+)
+batch_weights = torch.randn(B, 4)
+
+batch_price = price_legs(
+    spot=spot,
+    strikes=batch_strikes,
+    option_types=batch_types,
+    weights=batch_weights,
+    vol=vol,
+    maturity=maturity,
+)
+
+# Reference: closed-form scalar prices, one structure at a time
+loop_price = torch.stack([
+    reference_prices(
+        spot,
+        [
+            {
+                "option_type": "call" if batch_types[b, i] > 0 else "put",
+                "strike": float(batch_strikes[b, i]),
+                "weight": float(batch_weights[b, i]),
+            }
+            for i in range(4)
+        ],
+        vol,
+        maturity,
+    )
+    for b in range(B)
+])
+
+print("\nBatch shape:", batch_price.shape)
+print("Max abs diff vs closed-form loop:",
+      (batch_price - loop_price).abs().max().item())
@@ -0,0 +1,61 @@
+import numpy as np
+import torch
+
+from grids import make_moneyness_grid
+from real_vol import resample_vol_surface, resample_vol_surfaces
+
+torch.manual_seed(0)
+
+k_grid = make_moneyness_grid(-1.0, 1.0, 41)
+
+# Padded multi-expiry surfaces [B, M, K_raw] with ragged slices
+B, M, K_raw = 4, 3, 12
+spot = torch.tensor([95.0, 100.0, 105.0, 110.0])
+
+strikes = 100.0 * torch.exp(0.5 * torch.randn(B, M, K_raw))
+vol = 0.2 + 0.1 * torch.rand(B, M, K_raw)
+n_valid = torch.randint(2, K_raw + 1, (B, M))
+mask = torch.arange(K_raw) < n_valid.unsqueeze(-1)
+
+vol_grid = resample_vol_surfaces(
+    strikes=strikes,
+    vol=vol,
+    spot=spot,
+    k_grid=k_grid,
+    mask=mask,
+)
+
+# Reference: per-slice NumPy interpolation
+max_diff = 0.0
+for b in range(B):
+    for m in range(M):
+        n = int(n_valid[b, m])
+        k = np.log(strikes[b, m, :n].numpy() / float(spot[b]))
+        v = vol[b, m, :n].numpy()
+        idx = np.argsort(k)
+        ref = np.interp(k_grid.numpy(), k[idx], v[idx], left=v[idx][0], right=v[idx][-1])
+        max_diff = max(max_diff, np.abs(vol_grid[b, m].numpy() - ref).max())
+
+print("Batched shape:", vol_grid.shape)
+print("Max abs diff vs np.interp:", max_diff)
+
+# Single-slice wrapper
+single = resample_vol_surface(
+    strikes=strikes[0, 0],
+    vol=vol[0, 0],
+    spot=float(spot[0]),
+    k_grid=k_grid,
+)
+print("Single slice shape:", single.shape)
+
+# Differentiable mode
+vol_req = vol.clone().requires_grad_(True)
+resample_vol_surfaces(
+    strikes=strikes,
+    vol=vol_req,
+    spot=spot,
+    k_grid=k_grid,
+    mask=mask,
+    differentiable=True,
+).sum().backward()
+print("Gradient on padding:", vol_req.grad[~mask].abs().sum().item())
@@ -0,0 +1,106 @@
+import torch
+
+from grids import make_spot_grid
+from leg_book import (
+    LegBook,
+    canonicalize_legs,
+    canonicalize_batch,
+    structure_key,
+)
+from physics import terminal_payoff_legs, legs_to_tensors
+from portfolio_generator import decode_portfolio_batch
+from capital_physics import capital_feasible
+
+spot = make_spot_grid(
+    spot=100.0,
+    sigma=0.2,
+    n_std=3.0,
+    n_points=41,
+)
+
+# Butterfly with duplicated shorts plus an offsetting pair
+legs = [
+    {"option_type": "call", "strike": 110.0, "weight": 1},
+    {"option_type": "call", "strike": 100.0, "weight": -1},
+    {"option_type": "call", "strike": 100.0, "weight": -1},
+    {"option_type": "call", "strike": 90.0, "weight": 1},
+    {"option_type": "put", "strike": 95.0, "weight": 1},
+    {"option_type": "put", "strike": 95.0, "weight": -1},
+]
+
+canonical = canonicalize_legs(legs)
+print("Canonical legs:")
+for leg in canonical:
+    print(leg)
+
+# The pricing path unpacks the canonical legs only
+print("\nLegs priced:", legs_to_tensors(legs)[0].numel(), "of", len(legs))
+raw = (
+    torch.tensor([l["strike"] for l in legs]),
+    torch.tensor([1 if l["option_type"] == "call" else -1 for l in legs]),
+    torch.tensor([float(l["weight"]) for l in legs]),
+)
+print("Payoff unchanged:", torch.equal(
+    terminal_payoff_legs(spot, *raw),
+    terminal_payoff_legs(spot, *legs_to_tensors(legs)),
+))
+print("Margin:", capital_feasible(legs, 100.0))
+
+# Tensor strikes survive netting with their autograd graph
+k = torch.tensor(100.0, requires_grad=True)
+tensor_legs = [
+    {"option_type": "call", "strike": k, "weight": -1},
+    {"option_type": "call", "strike": k, "weight": -1},
+]
+strikes_t, _, _ = legs_to_tensors(canonicalize_legs(tensor_legs))
+strikes_t.sum().backward()
+print("Strike gradient after netting:", k.grad.item())
+
+# Stable hash: leg order does not matter
+print("\nSame key when shuffled:",
+      structure_key(legs, "SPX", "20260112") == structure_key(legs[::-1], "SPX", "20260112"))
+print("Book key matches:",
+      structure_key(LegBook.from_legs(legs), "SPX", "20260112") == structure_key(legs, "SPX", "20260112"))
+
+# Batched canonicalization of decoded structures
+torch.manual_seed(0)
+params = torch.randn(1000, 5)
+strikes, option_types, weights = decode_portfolio_batch(params, 100.0)
+
+c_strikes, c_types, c_weights, n_legs = canonicalize_batch(strikes, option_types, weights)
+
+print("\nLegs per structure:", torch.bincount(n_legs).tolist())
+print("Payoff max diff:", (
+    terminal_payoff_legs(spot, strikes, option_types, weights)
+    - terminal_payoff_legs(spot, c_strikes, c_types, c_weights)
+).abs().max().item())
+
+book = LegBook.from_tensors(strikes, option_types, weights)
+canonical_book = canonicalize_legs(book)
+print("Book legs before/after:", book.n_legs, canonical_book.n_legs)
+print("Book matches batch:", all(
+    canonical_book[i].to_legs() == LegBook.from_tensors(
+        c_strikes[i, : n_legs[i]], c_types[i, : n_legs[i]], c_weights[i, : n_legs[i]]
+    ).to_legs()
+    for i in range(50)
+))
+
+# One canonical order everywhere: (type, strike), puts first
+mixed = [
+    {"option_type": "call", "strike": 95.0, "weight": 1.0},
+    {"option_type": "put", "strike": 105.0, "weight": -1.0},
+    {"option_type": "call", "strike": 95.0, "weight": -0.5},
+    {"option_type": "put", "strike": 90.0, "weight": 2.0},
+]
+b_strikes, b_types, b_weights, n = canonicalize_batch(
+    torch.tensor([[l["strike"] for l in mixed]]),
+    torch.tensor([[1 if l["option_type"] == "call" else -1 for l in mixed]]),
+    torch.tensor([[l["weight"] for l in mixed]]),
+)
+print("\nDict order: ", [(l["option_type"], l["strike"]) for l in canonicalize_legs(mixed)])
+print("Batch order:", [("put" if t < 0 else "call", s) for t, s in
+                       zip(b_types[0, : n[0]].tolist(), b_strikes[0, : n[0]].tolist())])
+print("Pad slots copy first live leg:",
+      (b_strikes[0, n[0]:] == b_strikes[0, 0]).all().item(),
+      (b_types[0, n[0]:] == b_types[0, 0]).all().item(),
+      (b_weights[0, n[0]:] == 0).all().item())
@@ -0,0 +1,86 @@
+import random
+import time
+
+import torch
+
+from src.capital_physics import net_side, capital_feasible, capital_feasible_batch
+from src.portfolio_generator import decode_portfolio_batch, legs_from_batch
+from src.physics import OPTION_TYPE_NAMES
+
+
+def reference_net_side(shorts, longs, is_put, mult=100):
+    # Original nested-loop pairing
+    shorts = sorted(shorts, key=lambda x: x[0])
+    longs = sorted(longs, key=lambda x: x[0])
+    margin = 0.0
+    for s_strike, s_qty in shorts:
+        qty_left = s_qty
+        for i, (l_strike, l_qty) in enumerate(longs):
+            if qty_left == 0:
+                break
+            valid = (l_strike < s_strike) if is_put else (l_strike > s_strike)
+            if not valid:
+                continue
+            paired = min(qty_left, l_qty)
+            margin += paired * abs(s_strike - l_strike) * mult
+            qty_left -= paired
+            longs[i] = (l_strike, l_qty - paired)
+        if qty_left > 0:
+            margin += qty_left * s_strike * mult
+    return margin
+
+
+# Random sides with repeated strikes and uneven quantities
+random.seed(0)
+mismatch = 0
+for _ in range(5000):
+    strikes = [90 + 5 * random.randint(0, 6) for _ in range(12)]
+    shorts = [(k, random.randint(1, 3)) for k in strikes[:random.randint(0, 6)]]
+    longs = [(k, random.randint(1, 3)) for k in strikes[6:6 + random.randint(0, 6)]]
+    for is_put in (True, False):
+        if net_side(shorts, longs, is_put) != reference_net_side(shorts, longs, is_put):
+            mismatch += 1
+print("net_side mismatches vs nested loop:", mismatch)
+
+# Batched feasibility over random [B, L] books
+torch.manual_seed(0)
+B, L = 2000, 6
+strikes = 90.0 + 5.0 * torch.randint(0, 7, (B, L)).double()
+option_types = torch.where(torch.rand(B, L) < 0.5, 1, -1).to(torch.int8)
+weights = torch.randint(-2, 3, (B, L)).double()
+
+feasible, margin = capital_feasible_batch(strikes, option_types, weights)
+
+reference = [
+    capital_feasible(
+        [
+            {"option_type": OPTION_TYPE_NAMES[t], "strike": k, "weight": w}
+            for k, t, w in zip(row_k, row_t, row_w)
+        ],
+        100.0,
+    )
+    for row_k, row_t, row_w in zip(
+        strikes.tolist(), option_types.tolist(), weights.tolist()
+    )
+]
+print("\nMargin max diff:",
+      (margin - torch.tensor([m for _, m in reference], dtype=torch.float64)).abs().max().item())
+print("Feasible matches:",
+      feasible.tolist() == [f for f, _ in reference], "| feasible:", int(feasible.sum()))
+
+# Decoded candidates: batch vs per-structure filter
+params = torch.randn(20000, 5)
+decoded = decode_portfolio_batch(params, 100.0)
+
+t0 = time.perf_counter()
+feasible, margin = capital_feasible_batch(*decoded)
+t_batch = time.perf_counter() - t0
+
+t0 = time.perf_counter()
+reference = [capital_feasible(legs, 100.0) for legs in legs_from_batch(*decoded)]
+t_loop = time.perf_counter() - t0
+
+print("\nDecoded margins match:", torch.allclose(
+    margin, torch.tensor([m for _, m in reference], dtype=torch.float64)
+))
+print(f"Batch {t_batch * 1e3:.1f} ms vs loop {t_loop * 1e3:.1f} ms")
@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import pandas as pd
+import torch
+
+from src.fake_ib import FakeIB
+from src.grids import StrikeWindow, make_moneyness_grid
+from src.live_feed import ChainSubscription, IBKRLiveFeed
+from src.real_vol import live_surface_features
+from src.surface_extractor import extract_multi_maturity_surface
+
+
+def smile(contract):
+    return 0.15 + 0.5 * (contract.strike / 5800.0 - 1.0) ** 2
+
+
+chain = [1000.0 + 5.0 * i for i in range(1801)]
+# Eight weekly / monthly expiries, +-10% window on 25-point strikes
+expiries = ["20250103", "20250110", "20250117", "20250124",
+            "20250131", "20250221", "20250321", "20250620"]
+k_grid = make_moneyness_grid(-0.1, 0.1, 41)
+window = StrikeWindow(k_min=-0.1, k_max=0.1, stride=25.0)
+
+# The default 90-line snapshot allowance cannot hold the window open:
+# rejected before anything is subscribed
+ib = FakeIB(chain)
+feed = IBKRLiveFeed(ib=ib, msg_rate=10000, window=window)
+try:
+    ChainSubscription(feed, expiries, k_grid).open(spot=5800.0)
+except ValueError as e:
+    print("max_lines=90:", e, "| lines opened:", ib.requested)
+
+# Persistent mode with a 500-line allowance
+sub = ChainSubscription(feed, expiries, k_grid, max_lines=500)
+sub.open(spot=5800.0)
+
+print("Lines open:", len(ib.tickers), "+ spot:", ib.spot_line is not None,
+      "| strikes per expiry:", len(sub._strikes))
+
+# Initial full-chain tick
+ib.tick(ib.tickers.values(), smile)
+snap = sub.snapshot()
+print("Slices refreshed after first fill:", sub.surface.slices_refreshed)
+
+# Same features as a full rebuild of the snapshot (the polled path)
+print("Matches full rebuild:", torch.equal(snap["features"], live_surface_features(snap, k_grid)))
+
+# A handful of ticks in one expiry: only that slice is re-featurized
+front = [t for t in ib.tickers.values() if t.contract.lastTradeDateOrContractMonth == expiries[0]][:5]
+before = sub.surface.slices_refreshed
+ib.tick(front, lambda c: smile(c) + 0.01)
+snap = sub.snapshot()
+print("Slices refreshed after 5 front ticks:", sub.surface.slices_refreshed - before)
+
+print("Still matches full rebuild:", torch.equal(snap["features"], live_surface_features(snap, k_grid)))
+
+# No ticks: refresh is a no-op
+before = sub.surface.slices_refreshed
+sub.snapshot()
+print("Slices refreshed with no ticks:", sub.surface.slices_refreshed - before)
+
+# Small spot move stays in band; a large one recenters the window.
+# Option ticks keep arriving while the new contracts are qualified.
+ib.spot_tick(5810.0)
+print("\nSmall spot move dirty slices:", int(sub.surface.dirty.sum()))
+snap = sub.snapshot()
+print("In-band move matches full rebuild:",
+      torch.equal(snap["features"], live_surface_features(snap, k_grid)))
+ib.spot_tick(5900.0)
+ib.during_qualify = lambda: ib.tick(list(ib.tickers.values()), smile)
+requested, cancelled = ib.requested, ib.cancelled
+asyncio.run(sub.snapshot_async())
+ib.during_qualify = None
+print("Recentred window:", sub._strikes[0], "-", sub._strikes[-1],
+      "| lines opened:", ib.requested - requested,
+      "| cancelled:", ib.cancelled - cancelled,
+      "| still open:", len(ib.tickers))
+print("Quotes carried over on shared strikes:", sub.surface.live.all().item())
+
+# Every line's IV sits at its own strike after the swap
+ib.tick(list(ib.tickers.values()), lambda c: c.strike / 1e5)
+iv, strikes_now = sub.surface.iv, sub.surface.strikes
+aligned = all(
+    abs(iv[m, i].item() - strikes_now[i].item() / 1e5) < 1e-6
+    for m, i in sub._index.values()
+)
+print("Ticks land on their strikes:", aligned)
+
+# Recentering beyond the allowance fails without touching state
+sub.max_lines = 100
+state = (dict(sub._lines), dict(sub._index), sub.surface, list(sub._strikes))
+try:
+    asyncio.run(sub.recenter_async(5950.0))
+except ValueError as e:
+    print("Over-allowance recenter:", e)
+print("State unchanged:", state == (sub._lines, sub._index, sub.surface, sub._strikes))
+sub.max_lines = 500
+
+# Steady-state refresh cost: incremental vs rebuilding every slice
+ib.tick(ib.tickers.values(), smile)
+sub.snapshot()
+front = [t for t in ib.tickers.values() if t.contract.lastTradeDateOrContractMonth == expiries[0]]
+before = sub.surface.slices_refreshed
+n = 50
+t0 = time.perf_counter()
+for _ in range(n):
+    ib.tick(front[:1], lambda c: smile(c) + 0.01 * torch.rand(1).item())
+    sub.snapshot()
+t_incremental = (time.perf_counter() - t0) / n
+print("\nSlices refreshed over", n, "one-tick refreshes:", sub.surface.slices_refreshed - before)
+
+# Rebuild path: DataFrame from every ticker, re-extract, resample, featurize
+t0 = time.perf_counter()
+for _ in range(n):
+    df = pd.DataFrame([
+        {"strike": t.contract.strike, "iv": t.modelGreeks.impliedVol,
+         "expiry": t.contract.lastTradeDateOrContractMonth}
+        for t in ib.tickers.values()
+    ])
+    live_surface_features(extract_multi_maturity_surface(df, 5900.0), k_grid)
+t_full = (time.perf_counter() - t0) / n
+
+print(f"One-tick refresh: {t_incremental * 1e3:.3f} ms incremental vs "
+      f"{t_full * 1e3:.3f} ms DataFrame rebuild ({len(ib.tickers)} lines)")
+
+sub.close()
+print("Lines after close:", len(ib.tickers), "| spot line:", ib.spot_line)
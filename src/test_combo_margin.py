@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from src.fake_ib import FakeIB
+from src.margin_engine import IBKRMarginEngine
+from src.margin_cache import MarginCache
+from src.ibkr_adapter import IBKRContractFactory
+
+LATENCY = 0.05
+
+
+def condor(center):
+    return [
+        {"option_type": "put", "strike": center - 10, "weight": 1},
+        {"option_type": "put", "strike": center - 5, "weight": -1},
+        {"option_type": "call", "strike": center + 5, "weight": -1},
+        {"option_type": "call", "strike": center + 10, "weight": 1},
+    ]
+
+
+ib = FakeIB(latency=LATENCY)
+factory = IBKRContractFactory(ib)
+structures = [
+    factory.make_contracts(condor(5800 + 5 * i), "20260112") for i in range(10)
+]
+
+# Per-leg what-ifs: 40 sequential round trips
+t0 = time.perf_counter()
+legacy = IBKRMarginEngine(ib)
+per_leg = [legacy.estimate_margin(c, q) for c, q in structures]
+t_legs = time.perf_counter() - t0
+print(f"Per-leg: {per_leg[0]} per condor, {ib.what_ifs} requests, {t_legs:.2f}s")
+
+# Combo what-ifs, issued concurrently
+ib.what_ifs = 0
+engine = IBKRMarginEngine(ib, cache=MarginCache(), combo=True, max_concurrency=16)
+
+t0 = time.perf_counter()
+combo = engine.estimate_many(structures, spot=5800.0, equity=25_000.0)
+t_combo = time.perf_counter() - t0
+print(f"Combo: {combo[0]} per condor, {ib.what_ifs} requests, {t_combo:.2f}s")
+
+# Repeats come from the cache
+ib.what_ifs = 0
+again = engine.estimate_many(structures, spot=5800.0, equity=25_000.0)
+print("Cached repeat:", again == combo, "| requests:", ib.what_ifs)
+
+# Single-structure path uses the combo too
+engine.cache = None
+print("Single combo margin:", engine.estimate_margin(*structures[0]))
+
+# Butterfly: the two body legs share a conId and are netted into one
+fly = [
+    {"option_type": "call", "strike": 5795, "weight": 1},
+    {"option_type": "call", "strike": 5800, "weight": -1},
+    {"option_type": "call", "strike": 5800, "weight": -1},
+    {"option_type": "call", "strike": 5805, "weight": 1},
+]
+contracts, qtys = factory.make_contracts(fly, "20260112")
+print("Butterfly combo margin:", engine.estimate_margin(contracts, qtys))
+bag, _ = engine.make_combo(contracts, qtys)
+print("Butterfly combo legs:", [(leg.action, leg.ratio) for leg in bag.comboLegs])
+
+# Timeouts come back as None
+ib.slow_symbols = {"SPX"}
+engine = IBKRMarginEngine(ib, combo=True, timeout=2 * LATENCY)
+print("Timed out:", engine.estimate_many(structures[:3]))
+
+# The single-structure path is bounded by timeout too
+t0 = time.perf_counter()
+try:
+    engine.estimate_margin(*structures[0])
+except asyncio.TimeoutError:
+    print(f"Single combo timed out after {time.perf_counter() - t0:.2f}s")
@@ -0,0 +1,99 @@
+import torch
+
+from src.grids import make_spot_grid
+from src.physics import terminal_payoff_legs
+from src.portfolio_generator import decode_portfolio_batch
+from src.stress_engine import scenario_cube, aggregate_cvar
+from src.loss import convexity_reward
+from src.constraints import (
+    SecondDerivativeStencil,
+    terminal_convexity_violation,
+    convexity_barrier,
+)
+
+spot = make_spot_grid(
+    spot=100.0,
+    sigma=0.2,
+    n_std=3.0,
+    n_points=81,
+).double()
+
+torch.manual_seed(0)
+params = torch.randn(256, 5, dtype=torch.float64)
+strikes, option_types, weights = decode_portfolio_batch(params, 100.0)
+
+payoff = terminal_payoff_legs(spot, strikes, option_types, weights)
+stressed = scenario_cube(
+    spot, strikes, option_types, weights, torch.tensor([-0.2, 0.0, 0.2])
+)
+
+
+def reference_gamma(p, s):
+    dS_forward = s[2:] - s[1:-1]
+    dS_backward = s[1:-1] - s[:-2]
+    return (
+        2.0
+        * ((p[2:] - p[1:-1]) / dS_forward - (p[1:-1] - p[:-2]) / dS_backward)
+        / (dS_forward + dS_backward)
+    )
+
+
+stencil = SecondDerivativeStencil(spot)
+
+gamma = stencil(payoff)
+loop = torch.stack([reference_gamma(p, spot) for p in payoff])
+print("Gamma [B, N] max diff:", (gamma - loop).abs().max().item())
+
+gamma_cube = stencil(stressed)
+print("Gamma [B, S, N] shape:", tuple(gamma_cube.shape),
+      "max diff:", (gamma_cube[:, 1] - loop).abs().max().item())
+
+# Whole-batch barrier vs per-structure calls
+barrier = convexity_barrier(payoff, spot, stencil=stencil)
+barrier_loop = torch.stack([convexity_barrier(p, spot) for p in payoff])
+print("\nBarrier max diff:", (barrier - barrier_loop).abs().max().item())
+
+# Per-structure grids [B, N]
+spots = 90.0 + 20.0 * torch.rand(256, dtype=torch.float64)
+grids = spots.unsqueeze(-1) * (spot / 100.0)
+payoff = terminal_payoff_legs(grids, strikes, option_types, weights)
+min_gamma = terminal_convexity_violation(payoff, grids)
+loop = torch.stack([reference_gamma(p, g).min() for p, g in zip(payoff, grids)])
+print("Per-grid min gamma max diff:", (min_gamma - loop).abs().max().item())
+
+# Per-structure grids [B, N] applied to a scenario cube [B, S, N]
+shocks = torch.tensor([-0.2, -0.1, 0.0, 0.1, 0.2], dtype=torch.float64)
+cube = scenario_cube(grids, strikes, option_types, weights, shocks)
+gamma_cube = SecondDerivativeStencil(grids)(cube)
+loop = torch.stack([
+    torch.stack([reference_gamma(p, g) for p in structure])
+    for structure, g in zip(cube, grids)
+])
+print("Per-grid gamma [B, S, N] shape:", tuple(gamma_cube.shape),
+      "max diff:", (gamma_cube - loop).abs().max().item())
+
+# Convexity reward stays in second-difference units, so the objective's
+# alpha / beta weights keep their calibration on any grid spacing
+uniform = torch.linspace(70.0, 130.0, 61, dtype=torch.float64)
+fly = terminal_payoff_legs(
+    uniform,
+    torch.tensor([95.0, 100.0, 100.0, 105.0], dtype=torch.float64),
+    torch.tensor([1, 1, 1, 1]),
+    torch.tensor([1.0, -1.0, -1.0, 1.0], dtype=torch.float64),
+)
+undivided = torch.relu(fly[2:] - 2 * fly[1:-1] + fly[:-2]).mean()
+print("\nUniform-grid reward == undivided second difference:",
+      torch.allclose(convexity_reward(fly, uniform), undivided))
+
+# Iron condor: the convexity / tail-penalty balance the weights are tuned
+# for holds on an SPX-sized grid (10x spacing, 10x payoffs)
+condor_types = torch.tensor([-1, -1, 1, 1])
+condor_weights = torch.tensor([1.0, -1.0, -1.0, 1.0], dtype=torch.float64)
+ratios = []
+for scale in (1.0, 10.0):
+    grid = scale * spot
+    condor_strikes = scale * torch.tensor([90.0, 97.5, 102.5, 110.0], dtype=torch.float64)
+    payoff = terminal_payoff_legs(grid, condor_strikes, condor_types, condor_weights)
+    cube = scenario_cube(grid, condor_strikes, condor_types, condor_weights, torch.tensor([-0.2, 0.2]))
+    ratios.append(convexity_reward(payoff, grid) / -aggregate_cvar(cube))
+print("Convexity / tail ratio at 1x, 10x grid:", [round(r.item(), 6) for r in ratios])
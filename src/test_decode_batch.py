@@ -0,0 +1,32 @@
+import torch
+
+from portfolio_generator import (
+    decode_portfolio_tensor,
+    decode_portfolio_batch,
+    legs_from_batch,
+)
+
+# Batch of raw generator outputs [B, 5]
+torch.manual_seed(0)
+B = 512
+params = torch.randn(B, 5)
+spot = 100.0
+
+strikes, option_types, weights = decode_portfolio_batch(params, spot)
+
+print("Strikes:", strikes.shape, strikes.dtype)
+print("Types:", option_types.shape, option_types.dtype)
+print("Weights:", weights.shape, weights.dtype)
+
+# Reference: per-structure dict decoding
+reference = [decode_portfolio_tensor(p, spot) for p in params]
+batch_legs = legs_from_batch(strikes, option_types, weights)
+
+print("\nMatches per-structure decode:", batch_legs == reference)
+print("Iron condors:", int((params[:, 0] > 0).sum()), "of", B)
+
+# Differentiable strikes for training
+params_req = params.clone().requires_grad_(True)
+strikes_raw, _, _ = decode_portfolio_batch(params_req, spot, round_strikes=False)
+strikes_raw.sum().backward()
+print("Strike gradient norm:", params_req.grad.norm().item())
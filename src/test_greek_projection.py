@@ -0,0 +1,54 @@
+import torch
+
+from src.greeks import leg_greek_matrix
+from src.portfolio_generator import decode_portfolio_batch
+from src.constraints import (
+    LinearConstraintProjector,
+    project_greek_neutral,
+    project_delta_neutral,
+)
+
+vol, maturity = 0.2, 30 / 365
+
+# Fixed leg set shared by every candidate: one factorization
+strikes = torch.tensor([90.0, 95.0, 100.0, 105.0, 110.0], dtype=torch.float64)
+option_types = torch.tensor([-1, -1, 1, 1, 1], dtype=torch.int8)
+
+A = leg_greek_matrix(100.0, strikes, option_types, vol, maturity)
+print("Greek matrix shape:", tuple(A.shape))
+
+torch.manual_seed(0)
+weights = torch.randn(4096, 5, dtype=torch.float64)
+
+projector = LinearConstraintProjector(A)
+neutral = projector.project(weights)
+print("Max |Greek| after:", (neutral @ A.T).abs().max().item())
+
+# Same as the explicit minimum-norm correction
+pinv = torch.linalg.pinv(A)
+reference = weights - (weights @ A.T) @ pinv.T
+print("Max diff vs pinv:", (neutral - reference).abs().max().item())
+
+# Non-zero (reachable) targets and weight bounds
+targets = A @ torch.tensor([1.0, -0.5, 0.5, -1.0, 0.5], dtype=torch.float64)
+bounded = projector.project(weights, targets, lower=-2.0, upper=2.0, n_iter=500)
+print("\nBounds hold:", bool((bounded.abs() <= 2.0).all()))
+print("Max target residual:", (bounded @ A.T - targets).abs().max().item())
+
+# Per-structure leg sets: one batched factorization
+params = torch.randn(1024, 5, dtype=torch.float64)
+spots = 95.0 + 10.0 * torch.rand(1024, dtype=torch.float64)
+strikes, option_types, weights = decode_portfolio_batch(params, spots)
+
+A = leg_greek_matrix(spots, strikes, option_types, vol, maturity, greeks=("delta", "vega"))
+neutral = project_greek_neutral(A, weights)
+print("\nBatched Greek matrix shape:", tuple(A.shape))
+print("Max |Greek| after:",
+      (A @ neutral.unsqueeze(-1)).abs().max().item())
+
+# Single-row case matches project_delta_neutral
+deltas = A[:, 0]
+print("Delta-only matches:", torch.allclose(
+    project_greek_neutral(deltas.unsqueeze(-2), weights),
+    project_delta_neutral(deltas, weights),
+))
@@ -0,0 +1,60 @@
+import torch
+
+from src.grids import make_spot_grid
+from src.physics import price_portfolio, terminal_portfolio_payoff
+from src.portfolio_generator import decode_portfolio_batch
+from src.leg_book import LegBook
+from src.pnl_engine import portfolio_payoff
+from src.capital_physics import capital_feasible
+from src.loss import margin_penalty
+
+spot = make_spot_grid(
+    spot=100.0,
+    sigma=0.2,
+    n_std=3.0,
+    n_points=41,
+)
+
+legs = [
+    {"option_type": "put", "strike": 85.0, "weight": 1.0},
+    {"option_type": "put", "strike": 95.0, "weight": -1.0},
+    {"option_type": "call", "strike": 105.0, "weight": -1.0},
+    {"option_type": "call", "strike": 115.0, "weight": 1.0},
+]
+
+book = LegBook.from_legs(legs)
+print("Book:", book, "bytes:", book.nbytes)
+
+# Consumers accept the book directly
+print("Price diff:", (
+    price_portfolio(spot, book, vol=0.2, maturity=1.0)
+    - price_portfolio(spot, legs, vol=0.2, maturity=1.0)
+).abs().max().item())
+print("Payoff diff:", (
+    terminal_portfolio_payoff(spot, book) - terminal_portfolio_payoff(spot, legs)
+).abs().max().item())
+print("PnL at 90:", portfolio_payoff(90.0, book), portfolio_payoff(90.0, legs))
+print("Capital:", capital_feasible(book, 100.0), capital_feasible(legs, 100.0))
+print("Margin penalty:", margin_penalty(book, 100.0), margin_penalty(legs, 100.0))
+
+# Many decoded candidates in one book
+torch.manual_seed(0)
+params = torch.randn(100_000, 5)
+strikes, option_types, weights = decode_portfolio_batch(params, 100.0)
+many = LegBook.from_tensors(strikes, option_types, weights)
+
+print("\nCandidates:", many, "bytes/leg:", many.nbytes / many.n_legs)
+
+# Zero-copy torch view
+s_t, t_t, w_t = many.to_torch()
+print("Zero-copy strikes:", s_t.data_ptr() == many.strikes.ctypes.data)
+
+# Round trips
+restored = LegBook.from_json(many[7].to_json())
+print("JSON round trip:", restored.to_legs() == many[7].to_legs())
+print("Dict round trip:", LegBook.from_legs(legs).to_legs() == legs)
+
+# Ragged books pad with zero-weight legs
+ragged = LegBook.from_structures([legs, legs[:2]])
+print("Padded weights:", ragged.to_padded()[2].tolist())
+print("Per-structure PnL at 90:", portfolio_payoff(90.0, ragged))
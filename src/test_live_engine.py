@@ -0,0 +1,103 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+from run_live_engine import LiveEngine
+from src.real_vol import IncrementalSurface, live_surface_features
+from src.regime_encoder import RegimeEncoder
+from src.portfolio_generator import (
+    PortfolioGenerator,
+    decode_portfolio_tensor,
+    load_checkpoint,
+    save_checkpoint,
+)
+from src.session_logger import LiveSessionLogger
+
+torch.manual_seed(0)
+
+# Small untrained generator checkpoint, so the test needs no training run
+CHECKPOINT = os.path.join(tempfile.mkdtemp(), "generator.pt")
+save_checkpoint(CHECKPOINT, PortfolioGenerator(latent_dim=8), encoder=RegimeEncoder(input_dim=6))
+
+strikes = torch.linspace(5700.0, 5900.0, 41)
+surface = {
+    "spot": 5800.0,
+    "maturities": [0.002, 0.02],
+    "strikes": [strikes, strikes],
+    "implied_vol": [
+        0.15 + 0.4 * (strikes / 5800.0 - 1.0) ** 2,
+        0.14 + 0.3 * (strikes / 5800.0 - 1.0) ** 2,
+    ],
+}
+
+engine = LiveEngine(checkpoint=CHECKPOINT, logger=LiveSessionLogger())
+
+# Bare state_dicts predate the squashed forward and are refused
+legacy = os.path.join(tempfile.mkdtemp(), "generator.pt")
+torch.save(PortfolioGenerator(latent_dim=8).state_dict(), legacy)
+try:
+    LiveEngine(checkpoint=legacy, logger=LiveSessionLogger())
+except ValueError as e:
+    print("Legacy checkpoint:", e.args[0].split(": ", 1)[1])
+
+# So are checkpoints without the encoder the generator was trained with
+no_encoder = os.path.join(tempfile.mkdtemp(), "generator.pt")
+save_checkpoint(no_encoder, PortfolioGenerator(latent_dim=8))
+try:
+    LiveEngine(checkpoint=no_encoder, logger=LiveSessionLogger())
+except ValueError as e:
+    print("No encoder:", e.args[0].split(": ", 1)[1])
+
+# Decisions depend on the checkpoint only, not on the process RNG
+torch.manual_seed(1)
+other = LiveEngine(checkpoint=CHECKPOINT, logger=LiveSessionLogger())
+print("Same legs across engines:", other.propose(surface)[0] == engine.propose(surface)[0])
+
+first = engine.decide(surface)
+second = engine.decide(dict(surface, spot=5801.0))
+print("Stages:", sorted(first["latency_ms"]))
+print("Second decision PnL:", second["pnl"], "| margin cache:", engine.margin_cache.stats)
+
+# propose / assess keep per-call timings, safe to overlap across threads
+with ThreadPoolExecutor(2) as pool:
+    proposals = list(pool.map(engine.propose, [surface] * 20))
+    records = list(pool.map(lambda p: engine.assess(surface, *p), proposals))
+consistent = all(
+    abs(r["latency_ms"]["total"] - sum(v for k, v in r["latency_ms"].items() if k != "total")) < 1e-2
+    for r in records
+)
+print("Concurrent records have consistent totals:", consistent)
+
+# Same decision as building the models inline
+feats = live_surface_features(surface, engine.k_grid).unsqueeze(0)
+legs = decode_portfolio_tensor(engine.generator(engine.encoder(feats))[0], 5800.0)
+print("Legs match inline path:", legs == first["legs"])
+
+# A streamed surface of the same quotes decides like the polled one
+streamed = IncrementalSurface(strikes, 2, 5800.0, engine.k_grid)
+for m, vol in enumerate(surface["implied_vol"]):
+    for i, iv in enumerate(vol.tolist()):
+        streamed.update(m, i, iv)
+streamed_legs, _ = engine.propose(dict(surface, features=streamed.refresh()))
+print("Streamed legs match polled:", streamed_legs == first["legs"])
+
+# Per-decision cost: persistent engine vs rebuild + torch.load every step
+n = 50
+t0 = time.perf_counter()
+for _ in range(n):
+    engine.decide(surface)
+t_engine = (time.perf_counter() - t0) / n
+
+t0 = time.perf_counter()
+for _ in range(n):
+    enc = RegimeEncoder(input_dim=feats.shape[-1])
+    gen = PortfolioGenerator(latent_dim=8)
+    gen.load_state_dict(load_checkpoint(CHECKPOINT)["generator"])
+    decode_portfolio_tensor(gen(enc(feats))[0], 5800.0)
+t_rebuild = (time.perf_counter() - t0) / n
+
+print(f"\nPersistent engine: {t_engine * 1e3:.2f} ms/decision")
+print(f"Rebuild per step:  {t_rebuild * 1e3:.2f} ms/decision")
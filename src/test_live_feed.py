@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+from src.fake_ib import FakeIB
+from src.grids import StrikeWindow
+from src.live_feed import IBKRLiveFeed
+
+LATENCY = 0.02      # qualify round trip
+GREEKS_AFTER = 0.05 # model greeks arrive this long after subscribing
+
+
+def fake_ib(strikes, **kwargs):
+    return FakeIB(strikes, latency=LATENCY, greeks_after=GREEKS_AFTER, **kwargs)
+
+
+strikes = [5700.0 + 5.0 * i for i in range(41)]
+
+# Full chain, all greeks arrive
+ib = fake_ib(strikes)
+feed = IBKRLiveFeed(ib=ib, max_lines=30, msg_rate=200, poll=0.005)
+
+t0 = time.perf_counter()
+df = feed.get_iv_surface("20250101", timeout=5.0)
+elapsed = time.perf_counter() - t0
+
+print(df.head())
+print("Rows:", len(df), "of", 2 * len(strikes), "| qualify calls:", ib.qualify_calls)
+print("Max open lines:", ib.max_open, "(limit 30) | lines left open:", ib.open_lines)
+print("Sorted by strike:", df["strike"].is_monotonic_increasing)
+print(f"Surface refresh: {elapsed * 1e3:.0f} ms "
+      f"(sequential path sleeps {2 * len(strikes) * 0.2:.1f} s)")
+
+# Pacing: msg_rate caps requests per second
+ib = fake_ib(strikes[:15])
+feed = IBKRLiveFeed(ib=ib, max_lines=90, msg_rate=10, poll=0.005)
+df = feed.get_iv_surface("20250101", timeout=5.0)
+print("\nPaced rows:", len(df), "| max requests in any 1 s window:", ib.max_rate(), "(limit 10)")
+
+# Strikes that never return greeks: bounded by timeout, lines cancelled
+ib = fake_ib(strikes[:10], dead_strikes=strikes[:2])
+feed = IBKRLiveFeed(ib=ib, poll=0.005)
+t0 = time.perf_counter()
+df = feed.get_iv_surface("20250101", timeout=0.3)
+print("\nTimeout rows:", len(df), "of 20 in", f"{(time.perf_counter() - t0) * 1e3:.0f} ms",
+      "| lines left open:", ib.open_lines)
+
+# Explicit strike list skips reqSecDefOptParams
+ib = fake_ib(strikes)
+feed = IBKRLiveFeed(ib=ib, poll=0.005)
+df = feed.get_iv_surface("20250101", strikes=[5800.0, 5805.0])
+print("Requested strikes only:", sorted(df["strike"].unique().tolist()))
+
+# Strike window: only strikes around spot are subscribed, spot ticks in first
+chain = [1000.0 + 5.0 * i for i in range(1801)]
+ib = fake_ib(chain, spot=5800.0)
+feed = IBKRLiveFeed(ib=ib, max_lines=90, msg_rate=1000, poll=0.005,
+                    window=StrikeWindow(k_min=-0.1, k_max=0.1, stride=10.0))
+df = feed.get_iv_surface("20250101", timeout=5.0)
+print("\nWindowed lines requested:", ib.requested - 1, "of", 2 * len(chain),
+      "| strikes:", df["strike"].min(), "-", df["strike"].max())
+
+for _ in range(3):
+    feed.get_iv_surface("20250101", timeout=5.0)
+print("Lines left open after repeated windowed refreshes (incl. spot):", ib.open_lines)
@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import torch
+
+from run_live_loop import LiveLoop
+
+strikes = torch.linspace(5700.0, 5900.0, 41)
+
+
+def snapshot(spot, atm=0.15):
+    vol = atm + 0.4 * (strikes / 5800.0 - 1.0) ** 2
+    return {"spot": spot, "maturities": [0.002], "strikes": [strikes], "implied_vol": [vol]}
+
+
+class FakeEngine:
+    """Records what was proposed / assessed; propose (and assess) are slow."""
+
+    def __init__(self, encode_s=0.05, risk_s=0.0):
+        self.encode_s = encode_s
+        self.risk_s = risk_s
+        self.proposed = []
+
+    def propose(self, surface):
+        self.proposed.append(surface["spot"])
+        time.sleep(self.encode_s)
+        return [{"spot": surface["spot"]}], {"encode": self.encode_s}
+
+    def assess(self, surface, legs, timings=None):
+        time.sleep(self.risk_s)
+        return {"spot": surface["spot"], "legs": legs, "latency_ms": dict(timings)}
+
+
+def feed(spots):
+    it = iter([snapshot(s) for s in spots])
+    return lambda: next(it, None)
+
+
+def run(loop, duration):
+    records = []
+    loop.on_decision = records.append
+    asyncio.run(loop.run(duration))
+    return records
+
+
+# 1) Quiet tape: only the first snapshot triggers, no timer within the run
+engine = FakeEngine()
+loop = LiveLoop(engine, feed([5800.0, 5800.5, 5800.2, 5800.9]), poll=0.01, interval=10.0)
+records = run(loop, 0.3)
+print("Quiet tape decisions:", [r["spot"] for r in records])
+
+# 2) Spot jump triggers within one poll, not at the next interval
+engine = FakeEngine(encode_s=0.0)
+loop = LiveLoop(engine, feed([5800.0, 5800.5, 5830.0]), poll=0.01, interval=10.0)
+records = run(loop, 0.3)
+print("Spot jump decisions:", [r["spot"] for r in records])
+
+# 3) IV change alone triggers
+vols = iter([snapshot(5800.0), snapshot(5800.0, atm=0.17)])
+loop = LiveLoop(FakeEngine(encode_s=0.0), lambda: next(vols, None), poll=0.01, interval=10.0)
+records = run(loop, 0.2)
+print("IV change decisions:", len(records))
+
+# 4) Busy tape that never stops: every poll moves spot, encode is slower
+#    than the tick gap. Every finished proposal still reaches risk.
+ticks = iter(range(10 ** 6))
+engine = FakeEngine(encode_s=0.05)
+loop = LiveLoop(engine, lambda: snapshot(5800.0 + next(ticks)), poll=0.005, interval=10.0)
+records = run(loop, 0.5)
+print(f"Busy tape: {len(engine.proposed)} encoded, {loop.decisions} decided, "
+      f"{loop.dropped} dropped")
+print("Decisions track the tape:", records[-1]["spot"] > records[0]["spot"])
+
+# 5) Slow risk stage: proposals finishing while risk is busy are
+#    superseded by the next one, never queued
+ticks = iter(range(10 ** 6))
+engine = FakeEngine(encode_s=0.02, risk_s=0.1)
+loop = LiveLoop(engine, lambda: snapshot(5800.0 + next(ticks)), poll=0.005, interval=10.0)
+records = run(loop, 0.5)
+print(f"Slow risk: {len(engine.proposed)} encoded, {loop.decisions} decided, "
+      f"{loop.dropped} superseded")
+print("Record carries its own encode timing:", records[-1]["latency_ms"]["encode"] == 0.02)
+
+# 6) Timer re-decides an unchanged snapshot
+steady = snapshot(5800.0)
+loop = LiveLoop(FakeEngine(encode_s=0.0), lambda: steady, poll=0.01, interval=0.1)
+records = run(loop, 0.35)
+print("Timer decisions on steady tape (~3-4):", len(records))
+
+# 7) Streamed snapshot with no quote yet at the ATM strike: the IV
+#    trigger reads the nearest quoted strike instead of NaN
+def streamed(atm):
+    s = snapshot(5800.0, atm)
+    s["implied_vol"][0][20] = float("nan")
+    return s
+
+vols = iter([streamed(0.15), streamed(0.17)])
+loop = LiveLoop(FakeEngine(encode_s=0.0), lambda: next(vols, None), poll=0.01, interval=10.0)
+records = run(loop, 0.2)
+print("IV change with NaN ATM decisions:", len(records))
+
+# 8) A failing fetch is reported and polling goes on
+calls = iter([TimeoutError("feed timeout"), snapshot(5800.0), snapshot(5830.0)])
+
+def flaky():
+    item = next(calls, None)
+    if isinstance(item, Exception):
+        raise item
+    return item
+
+errors = []
+loop = LiveLoop(FakeEngine(encode_s=0.0), flaky, poll=0.01, interval=10.0,
+                on_fetch_error=errors.append)
+records = run(loop, 0.2)
+print("After fetch error:", [r["spot"] for r in records], loop.fetch_errors, errors)
+
+# Reaction time vs fixed 60 s sleep
+loop = LiveLoop(FakeEngine(encode_s=0.0), feed([5800.0, 5830.0]), poll=0.01, interval=60.0)
+stamps = []
+loop.on_decision = lambda r: stamps.append(time.perf_counter())
+t0 = time.perf_counter()
+asyncio.run(loop.run(0.2))
+print(f"\nSpot-move reaction: {(stamps[-1] - t0) * 1e3:.1f} ms (fixed loop: up to 60000 ms)")
@@ -0,0 +1,54 @@
+from src.fake_ib import FakeIB
+from src.margin_cache import MarginCache
+from src.capital_physics import capital_feasible
+from src.margin_engine import IBKRMarginEngine
+from src.ibkr_adapter import IBKRContractFactory
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+condor = [
+    {"option_type": "put", "strike": 99.0, "weight": 1},
+    {"option_type": "put", "strike": 99.5, "weight": -1},
+    {"option_type": "call", "strike": 100.5, "weight": -1},
+    {"option_type": "call", "strike": 101.0, "weight": 1},
+]
+
+clock = FakeClock()
+cache = MarginCache(maxsize=2, ttl=60.0, spot_band=0.005, clock=clock)
+
+# Same structure in any leg order hits
+first = capital_feasible(condor, 100.0, cache=cache)
+again = capital_feasible(condor[::-1], 100.1, cache=cache)
+print("Result:", first, "| repeat equal:", first == again, "|", cache.stats)
+
+# Spot leaves the band, then TTL expiry
+capital_feasible(condor, 101.0, cache=cache)
+clock.now = 61.0
+capital_feasible(condor, 101.0, cache=cache)
+print("After spot move and TTL:", cache.stats)
+
+# LRU bound
+for width in (1.0, 2.0, 3.0):
+    legs = [dict(leg, strike=leg["strike"] + width) for leg in condor]
+    capital_feasible(legs, 100.0, cache=cache)
+print("Size bounded:", len(cache) == 2)
+
+# IBKR what-if path: one round trip per leg on a miss, none on a hit
+ib = FakeIB()
+engine = IBKRMarginEngine(ib, cache=MarginCache(clock=clock))
+factory = IBKRContractFactory(ib)
+
+m1 = engine.estimate_legs_margin(factory, condor, "20260112", spot=100.0, equity=25_000.0)
+m2 = engine.estimate_legs_margin(factory, condor, "20260112", spot=100.2, equity=25_000.0)
+print("\nWhat-if margin:", m1, m2, "| round trips:", ib.what_ifs)
+
+engine.estimate_legs_margin(factory, condor, "20260112", spot=100.2, equity=24_000.0)
+engine.estimate_legs_margin(factory, condor, "20260113", spot=100.2, equity=24_000.0)
+print("Equity change and new expiry recompute:", ib.what_ifs, "|", engine.cache.stats)
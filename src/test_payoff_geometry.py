@@ -0,0 +1,60 @@
+import torch
+
+from src.payoff_geometry import (
+    payoff_breakpoints,
+    payoff_at,
+    payoff_extremes,
+    breakevens,
+    payoff_geometry,
+)
+from src.physics import terminal_payoff_legs, legs_to_tensors
+from src.portfolio_generator import decode_portfolio_batch
+
+# Iron condor: exact max loss / gain and breakevens
+legs = [
+    {"option_type": "put", "strike": 90.0, "weight": 1},
+    {"option_type": "put", "strike": 95.0, "weight": -1},
+    {"option_type": "call", "strike": 105.0, "weight": -1},
+    {"option_type": "call", "strike": 110.0, "weight": 1},
+]
+strikes, option_types, weights = legs_to_tensors(legs, dtype=torch.float64)
+
+geometry = payoff_geometry(strikes, option_types, weights)
+print("Iron condor:", {k: v.tolist() for k, v in geometry.items()})
+
+# Decoded structures against a dense spot grid
+torch.manual_seed(0)
+params = torch.randn(2000, 5, dtype=torch.float64)
+strikes, option_types, weights = decode_portfolio_batch(params, 100.0)
+
+spot = torch.linspace(0.0, 300.0, 30001, dtype=torch.float64)
+dense = terminal_payoff_legs(spot, strikes, option_types, weights)
+
+breakpoints = payoff_breakpoints(strikes, option_types, weights)
+min_payoff, max_payoff = payoff_extremes(breakpoints)
+
+print("\npayoff_at max diff:",
+      (payoff_at(spot, breakpoints) - dense).abs().max().item())
+print("All extremes finite:",
+      bool(min_payoff.isfinite().all() and max_payoff.isfinite().all()))
+print("Min payoff max diff:", (min_payoff - dense.min(dim=-1).values).abs().max().item())
+print("Max payoff max diff:", (max_payoff - dense.max(dim=-1).values).abs().max().item())
+
+roots = breakevens(breakpoints)
+at_roots = payoff_at(torch.nan_to_num(roots), breakpoints)
+print("Payoff at breakevens:", at_roots[~roots.isnan()].abs().max().item())
+
+# Every sign change on the dense grid sits next to an exact breakeven
+positive = dense > 1e-9
+crossing = positive[:, 1:] != positive[:, :-1]
+row, col = crossing.nonzero(as_tuple=True)
+gap = (roots[row] - spot[col].unsqueeze(-1)).abs().nan_to_num(float("inf"))
+print("Crossings covered:", bool((gap.min(dim=-1).values <= 1.5 * (spot[1] - spot[0])).all()))
+
+# Naked legs: unbounded tails
+strikes = torch.tensor([[100.0], [100.0]])
+option_types = torch.tensor([[1], [-1]], dtype=torch.int8)
+weights = torch.tensor([[-1.0], [-1.0]])
+
+min_payoff, max_payoff = payoff_extremes(payoff_breakpoints(strikes, option_types, weights))
+print("\nShort call / short put min:", min_payoff.tolist(), "max:", max_payoff.tolist())
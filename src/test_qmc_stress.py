@@ -0,0 +1,96 @@
+import torch
+
+from src.grids import make_spot_grid
+from src.portfolio_generator import decode_portfolio_batch
+from src.stress_engine import aggregate_cvar, aggregate_worst_case
+from src.qmc_stress import (
+    QMCScenarioGenerator,
+    qmc_scenario_values,
+    run_qmc_stress,
+)
+
+spot = make_spot_grid(
+    spot=100.0,
+    sigma=0.2,
+    n_std=3.0,
+    n_points=41,
+).double()
+
+torch.manual_seed(0)
+params = torch.randn(8, 5, dtype=torch.float64)
+strikes, option_types, weights = decode_portfolio_batch(params, 100.0)
+
+correlation = torch.tensor([
+    [1.0, -0.7, 0.3],
+    [-0.7, 1.0, -0.2],
+    [0.3, -0.2, 1.0],
+])
+generator = QMCScenarioGenerator(
+    scale=(0.04, 0.03, 0.05),
+    marginals=("laplace", "normal", "logistic"),
+    correlation=correlation,
+    seed=7,
+)
+
+# Marginals and copula correlation
+shocks = generator.draw(1 << 14)
+x = torch.stack([shocks["spot"], shocks["vol"], shocks["skew"]])
+print("Shock means:", [round(v, 4) for v in x.mean(dim=-1).tolist()])
+print("Shock std / scale:",
+      [round(v, 3) for v in (x.std(dim=-1) / generator.scale).tolist()])
+print("Spot/vol correlation:", round(torch.corrcoef(x)[0, 1].item(), 3))
+
+# Chunks regenerate the same sequence
+chunked = torch.cat([generator.draw(256, start)["spot"] for start in range(0, 1024, 256)])
+print("Chunked draws match:", torch.equal(chunked, generator.draw(1024)["spot"]))
+
+pricing = {"vol": 0.2, "maturity": 7 / 365, "ref_spot": 100.0}
+n_scenarios = 4096
+
+# Reference: every scenario in memory at once
+values = qmc_scenario_values(
+    spot, strikes, option_types, weights, generator.draw(n_scenarios), **pricing
+)
+cvar_ref = aggregate_cvar(values, q=0.05)
+worst_ref = aggregate_worst_case(values)
+
+serial = run_qmc_stress(
+    spot, strikes, option_types, weights, generator, n_scenarios,
+    q=0.05, chunk_size=512, exact=True, **pricing,
+)
+print("\nSerial CVaR diff:", (serial["cvar"] - cvar_ref).abs().max().item())
+print("Serial worst diff:", (serial["worst"] - worst_ref).abs().max().item())
+
+pooled = run_qmc_stress(
+    spot, strikes, option_types, weights, generator, n_scenarios,
+    q=0.05, chunk_size=512, workers=2, exact=True, **pricing,
+)
+print("Pooled CVaR diff:", (pooled["cvar"] - cvar_ref).abs().max().item())
+
+# Exact buffers past max_k are refused up front
+try:
+    run_qmc_stress(
+        spot, strikes, option_types, weights, generator, n_scenarios,
+        q=0.05, exact=True, max_k=1000, **pricing,
+    )
+except ValueError as e:
+    print("Over max_k:", e)
+
+# Fixed-memory estimate (the default), same on the pool
+running = run_qmc_stress(
+    spot, strikes, option_types, weights, generator, n_scenarios,
+    q=0.05, chunk_size=512, **pricing,
+)
+running_pooled = run_qmc_stress(
+    spot, strikes, option_types, weights, generator, n_scenarios,
+    q=0.05, chunk_size=512, workers=2, **pricing,
+)
+print("Running CVaR max rel diff:",
+      ((running["cvar"] - cvar_ref).abs() / cvar_ref.abs().clamp(min=1e-3)).max().item())
+print("Running pooled == serial:", torch.equal(running["cvar"], running_pooled["cvar"]))
+
+# Terminal mode uses spot shocks only
+terminal = run_qmc_stress(
+    spot, strikes, option_types, weights, generator, n_scenarios, q=0.05,
+)
+print("\nTerminal CVaR shape:", tuple(terminal["cvar"].shape))
@@ -0,0 +1,66 @@
+import torch
+
+from src.grids import make_spot_grid
+from src.physics import price_legs, terminal_payoff_legs
+from src.portfolio_generator import decode_portfolio_batch
+from src.stress_engine import (
+    scenario_grid,
+    scenario_cube,
+    spot_shock,
+    vol_level_shift,
+    time_decay,
+    aggregate_worst_case,
+    aggregate_cvar,
+)
+
+spot = make_spot_grid(
+    spot=100.0,
+    sigma=0.2,
+    n_std=3.0,
+    n_points=41,
+).double()
+
+torch.manual_seed(0)
+params = torch.randn(64, 5, dtype=torch.float64)
+strikes, option_types, weights = decode_portfolio_batch(params, 100.0)
+
+spot_shocks = torch.linspace(-0.4, 0.4, 9)
+vol_shifts = torch.tensor([-0.05, 0.0, 0.05, 0.10])
+time_decays = torch.tensor([0.0, 1 / 365, 5 / 365])
+
+# Terminal mode: one pass vs per-shock loop
+cube = scenario_cube(spot, strikes, option_types, weights, spot_shocks)
+loop = torch.stack([
+    terminal_payoff_legs(spot_shock(spot, s.item()), strikes, option_types, weights)
+    for s in spot_shocks
+], dim=1)
+
+print("Terminal cube shape:", tuple(cube.shape))
+print("Terminal max diff:", (cube - loop).abs().max().item())
+
+# Pricing mode: every (spot, vol, time) scenario
+vol, maturity = 0.2, 30 / 365
+
+cube = scenario_cube(
+    spot, strikes, option_types, weights,
+    spot_shocks, vol_shifts, time_decays,
+    vol=vol, maturity=maturity,
+)
+loop = torch.stack([
+    price_legs(
+        spot_shock(spot, s.item()), strikes, option_types, weights,
+        vol=vol_level_shift(torch.tensor(vol), v.item()),
+        maturity=time_decay(maturity, t.item()),
+    )
+    for s, v, t in zip(*scenario_grid(spot_shocks, vol_shifts, time_decays))
+], dim=1)
+
+print("\nPricing cube shape:", tuple(cube.shape))
+print("Pricing max diff:", (cube - loop).abs().max().item())
+
+# Aggregators take the cube directly
+worst = aggregate_worst_case(cube)
+cvar = aggregate_cvar(cube, q=0.1)
+print("\nWorst-case matches loop:",
+      torch.allclose(worst, torch.stack([aggregate_worst_case(list(c)) for c in cube])))
+print("CVaR shape:", tuple(cvar.shape), "CVaR >= worst:", bool((cvar >= worst).all()))
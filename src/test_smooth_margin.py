@@ -0,0 +1,49 @@
+import torch
+
+from src.grids import make_spot_grid
+from src.physics import terminal_payoff_legs
+from src.portfolio_generator import decode_portfolio_batch
+from src.loss import margin_penalty_batched, spread_max_loss
+
+torch.manual_seed(0)
+params = torch.randn(512, 5, dtype=torch.float64)
+strikes, option_types, weights = decode_portfolio_batch(params, 100.0, round_strikes=False)
+
+# Spread max loss vs a dense spot grid
+spot = torch.linspace(1.0, 300.0, 60001, dtype=torch.float64)
+dense = -terminal_payoff_legs(spot, strikes, option_types, weights).min(dim=-1).values
+print("Max loss diff vs dense grid:",
+      (spread_max_loss(strikes, option_types, weights) - dense).abs().max().item())
+
+# Exact spread-capped margin
+naked = margin_penalty_batched(strikes, option_types, weights, 100.0)
+exact = margin_penalty_batched(strikes, option_types, weights, 100.0, spread=True)
+print("Capped at max loss:", torch.allclose(exact, torch.minimum(naked, dense)))
+print("Mean naked vs spread margin:", naked.mean().item(), exact.mean().item())
+
+# Smooth margin converges to the exact one
+for sharpness in (1.0, 10.0, 100.0, 1000.0):
+    smooth = margin_penalty_batched(
+        strikes, option_types, weights, 100.0, spread=True, sharpness=sharpness
+    )
+    print(f"sharpness={sharpness:g} max diff:", (smooth - exact).abs().max().item())
+
+# Gradients w.r.t. strikes and spot
+strikes = strikes.detach().requires_grad_()
+spots = torch.full((512,), 100.0, dtype=torch.float64, requires_grad=True)
+smooth = margin_penalty_batched(
+    strikes, option_types, weights, spots, spread=True, sharpness=10.0
+)
+smooth.sum().backward()
+print("\nFinite strike grads:", bool(strikes.grad.isfinite().all()),
+      "| non-zero rows:", int((strikes.grad.abs().sum(dim=-1) > 0).sum()))
+
+# Naked short call: unbounded loss keeps the naked margin
+strikes = torch.tensor([[105.0]], dtype=torch.float64, requires_grad=True)
+naked_call = margin_penalty_batched(
+    strikes, torch.tensor([[1]], dtype=torch.int8),
+    torch.tensor([[-1.0]], dtype=torch.float64), 100.0,
+    spread=True, sharpness=10.0,
+)
+naked_call.sum().backward()
+print("Naked call margin:", naked_call.item(), "grad:", strikes.grad.item())
@@ -0,0 +1,77 @@
+import math
+from types import SimpleNamespace
+
+import pandas as pd
+import torch
+
+import src.csv_adapter as csv_adapter
+from src.grids import StrikeWindow, delta_moneyness_bounds, expiry_year_fraction
+from src.greeks import leg_greeks
+
+# SPX-like listing: 5-point strikes from 1000 to 10000
+chain = [1000.0 + 5.0 * i for i in range(1801)]
+spot = 5800.0
+
+# Moneyness window + stride
+window = StrikeWindow(k_min=-0.1, k_max=0.1, stride=10.0)
+kept = window.select(chain, spot)
+print("Listed strikes:", len(chain), "| moneyness window, stride 10:", len(kept))
+print("Range:", kept[0], "-", kept[-1],
+      "| inside bounds:", all(-0.1 <= math.log(k / spot) <= 0.1 for k in kept),
+      "| on stride:", all(k % 10.0 == 0 for k in kept))
+
+# Window follows spot
+moved = window.select(chain, 5900.0)
+print("Recomputed at 5900:", moved[0], "-", moved[-1])
+
+# Delta window: kept strikes have call delta within [0.05, 0.95]
+T = 1.0 / 365.0
+dwindow = StrikeWindow(delta=0.05, vol=0.2)
+kept = dwindow.select(chain, spot, T)
+greeks = leg_greeks(
+    torch.tensor([spot], dtype=torch.float64),
+    torch.tensor(kept, dtype=torch.float64),
+    torch.ones(len(kept)),
+    vol=0.2,
+    maturity=T,
+)
+delta = greeks["delta"].squeeze(-1)
+print("\nDelta window strikes:", len(kept), "| bounds:",
+      [round(b, 4) for b in delta_moneyness_bounds(0.05, 0.2, T)])
+print(f"Call delta range: {delta.min().item():.3f} - {delta.max().item():.3f}")
+
+outside = [k for k in chain if k not in set(kept) and abs(k - spot) < 200]
+greeks = leg_greeks(
+    torch.tensor([spot], dtype=torch.float64),
+    torch.tensor(outside, dtype=torch.float64),
+    torch.ones(len(outside)),
+    vol=0.2,
+    maturity=T,
+)
+d_out = greeks["delta"].squeeze(-1)
+print("Nearest excluded strikes outside band:",
+      bool(((d_out < 0.05) | (d_out > 0.95)).all()))
+
+print("Year fraction 0-DTE floor (1 h):",
+      round(expiry_year_fraction("20250101", now=pd.Timestamp("2025-01-01 15:30")) * 365 * 24, 3))
+
+# yfinance chain path (offline stand-in for yf.Ticker)
+class FakeTicker:
+    options = ("2025-01-01",)
+
+    def option_chain(self, expiry):
+        frame = pd.DataFrame({
+            "strike": chain,
+            "impliedVolatility": 0.2,
+            "expiration": expiry,
+        })
+        return SimpleNamespace(calls=frame, puts=frame)
+
+    def history(self, period):
+        return pd.DataFrame({"Close": [spot]})
+
+
+csv_adapter.yf = SimpleNamespace(Ticker=lambda symbol: FakeTicker())
+full = csv_adapter.load_live_spx_chain()
+windowed = csv_adapter.load_live_spx_chain(window)
+print("yfinance chain rows:", len(full), "->", len(windowed))
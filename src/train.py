@@ -10,11 +10,13 @@ import torch.optim as optim
 import pandas as pd
 
 from src.grids import make_moneyness_grid, make_spot_grid
-from src.regime_encoder import RegimeEncoder, multi_maturity_vol_features
-from src.portfolio_generator import PortfolioGenerator, decode_portfolio_tensor, capital_filter
+from src.regime_encoder import RegimeEncoder, multi_maturity_vol_features_batched
+from src.portfolio_generator import PortfolioGenerator, decode_portfolio_batch, save_checkpoint
+from src.capital_physics import capital_feasible_batch
 from src.surface_extractor import extract_surfaces_from_df
-from src.real_vol import resample_vol_surface, normalize_vol_surface
-from src.loss import differentiable_convex_proxy
+from src.real_vol import pad_vol_slices, resample_vol_surfaces, normalize_vol_surface
+from src.constraints import SecondDerivativeStencil
+from src.loss import structural_objective_batched
 
 
 # -------------------------------------------------
@@ -35,6 +37,9 @@ SPOT_FALLBACK = 100.0
 # -------------------------------------------------
 
 k_grid = make_moneyness_grid(-1.0, 1.0, 41)
+unit_spot_grid = make_spot_grid(1.0, 0.2, 3.0, 81)
+
+STRESS_SHOCKS = torch.tensor([-0.4, -0.2, 0.0, 0.2, 0.4])
 
 
 # -------------------------------------------------
@@ -55,6 +60,28 @@ surfaces = list(extract_surfaces_from_df(df, spot=SPOT_FALLBACK))
 if not surfaces:
     raise RuntimeError("No valid vol surfaces extracted")
 
+# Surfaces are fixed: resample every slice once, in one batched call
+strikes, vols, mask = pad_vol_slices(
+    [s["strikes"] for s in surfaces],
+    [s["implied_vol"] for s in surfaces],
+)
+vol_grids = resample_vol_surfaces(
+    strikes=strikes,
+    vol=vols,
+    spot=torch.tensor([s["spot"] for s in surfaces]),
+    k_grid=k_grid,
+    mask=mask,
+)
+
+# Regime features are fixed too: one single-maturity slice per surface
+features = multi_maturity_vol_features_batched(
+    k_grid, normalize_vol_surface(vol_grids).unsqueeze(1)
+)
+
+spots = torch.tensor([s["spot"] for s in surfaces])
+spot_grids = spots.unsqueeze(-1) * unit_spot_grid
+stencil = SecondDerivativeStencil(spot_grids)
+
 
 # -------------------------------------------------
 # Training loop
@@ -62,25 +89,21 @@ if not surfaces:
 
 for step in range(NUM_STEPS):
 
-    surface = surfaces[step % len(surfaces)]
-
     # --- Regime encoding ---
-    vol_grid = resample_vol_surface(surface["strikes"], surface["implied_vol"], surface["spot"], k_grid)
-    vol_norm = normalize_vol_surface(vol_grid)
-
-    features = multi_maturity_vol_features(k_grid, [vol_norm]).unsqueeze(0)
     z = encoder(features)
 
     # --- Generate ---
     raw = generator(z)
-    decoded = decode_portfolio_tensor(raw[0], surface["spot"])
 
-    feasible, _ = capital_filter(decoded, surface["spot"])
-    if not feasible:
+    feasible, _ = capital_feasible_batch(*decode_portfolio_batch(raw.detach(), spots))
+    if not feasible.any():
         continue
 
-    # --- Differentiable convex proxy loss ---
-    loss = differentiable_convex_proxy(raw, surface["spot"])
+    # --- Payoff / smooth stress CVaR / margin objective ---
+    objective = structural_objective_batched(
+        raw, spot_grids, spots, STRESS_SHOCKS, stencil=stencil
+    )
+    loss = -objective[feasible].mean()
 
     optimizer.zero_grad()
     loss.backward()
@@ -92,5 +115,5 @@ for step in range(NUM_STEPS):
 print("Training complete.")
 
 os.makedirs("checkpoints", exist_ok=True)
-torch.save(generator.state_dict(), "checkpoints/generator.pt")
-print("\nSaved trained generator to checkpoints/generator.pt")
+save_checkpoint("checkpoints/generator.pt", generator, encoder=encoder)
+print("\nSaved trained generator (and its encoder) to checkpoints/generator.pt")
@@ -8,9 +8,9 @@ import matplotlib.pyplot as plt
 
 from grids import make_spot_grid, make_moneyness_grid
 from surface_extractor import extract_multi_maturity_surface
-from real_vol import resample_vol_surface, normalize_vol_surface
+from real_vol import pad_vol_slices, resample_vol_surfaces, normalize_vol_surface
 from regime_encoder import RegimeEncoder, multi_maturity_vol_features
-from portfolio_generator import PortfolioGenerator, decode_portfolio_tensor
+from portfolio_generator import PortfolioGenerator, decode_portfolio_tensor, load_checkpoint
 from physics import terminal_portfolio_payoff
 from stress_engine import spot_shock
 
@@ -22,9 +22,7 @@ from stress_engine import spot_shock
 encoder = RegimeEncoder(input_dim=6, hidden_dim=16, latent_dim=8)
 generator = PortfolioGenerator(latent_dim=8, hidden_dim=64)
 
-generator.load_state_dict(
-    torch.load("checkpoints/generator.pt", map_location="cpu")
-)
+generator.load_state_dict(load_checkpoint("checkpoints/generator.pt")["generator"])
 generator.eval()
 
 
@@ -50,16 +48,16 @@ spot_grid = make_spot_grid(
 # Resample all maturities
 # -------------------------------------------------
 
-vol_surfaces = []
+strikes, vol, mask = pad_vol_slices(bundle["strikes"], bundle["implied_vol"])
 
-for strikes, vol in zip(bundle["strikes"], bundle["implied_vol"]):
-    vol_grid = resample_vol_surface(
-        strikes=strikes,
-        vol=vol,
-        spot=bundle["spot"],
-        k_grid=k_grid,
-    )
-    vol_surfaces.append(normalize_vol_surface(vol_grid))
+vol_grids = resample_vol_surfaces(
+    strikes=strikes,
+    vol=vol,
+    spot=bundle["spot"],
+    k_grid=k_grid,
+    mask=mask,
+)
+vol_surfaces = list(normalize_vol_surface(vol_grids))
 
 features = multi_maturity_vol_features(k_grid, vol_surfaces)
 latent = encoder(features)
@@ -10,7 +10,7 @@ from grids import make_spot_grid, make_moneyness_grid
 from csv_adapter import load_vol_surface_from_csv
 from real_vol import resample_vol_surface, normalize_vol_surface
 from regime_encoder import RegimeEncoder, real_vol_features
-from portfolio_generator import PortfolioGenerator, decode_portfolio_tensor
+from portfolio_generator import PortfolioGenerator, decode_portfolio_tensor, load_checkpoint
 from physics import terminal_portfolio_payoff
 from stress_engine import spot_shock
 
@@ -22,9 +22,7 @@ from stress_engine import spot_shock
 encoder = RegimeEncoder(input_dim=3, hidden_dim=16, latent_dim=8)
 generator = PortfolioGenerator(latent_dim=8, hidden_dim=64)
 
-generator.load_state_dict(
-    torch.load("checkpoints/generator.pt", map_location="cpu")
-)
+generator.load_state_dict(load_checkpoint("checkpoints/generator.pt")["generator"])
 generator.eval()
 
 